@@ -3,6 +3,7 @@ from app.models.consultation import Consultation, ConsultationCreate
 from app.core.ipfs import upload_to_ipfs
 from app.core.icp import upload_to_icp
 from datetime import datetime
+import uuid
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -15,7 +16,7 @@ def ask_agent(consult: ConsultationCreate):
     ipfs_hash = upload_to_ipfs(consult.dict())
     icp_tx = upload_to_icp(ipfs_hash)
     new_consult = Consultation(
-        id=len(consultations)+1,
+        id=uuid.uuid4().hex,
         user_id=consult.user_id,
         message=consult.message,
         created_at=datetime.utcnow(),
@@ -0,0 +1,120 @@
+# 상담 작업 큐: /agent/ask 요청을 워커 풀에서 비동기로 처리
+import os
+import queue
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Optional
+
+class QueueFullError(Exception):
+    """대기열이 가득 차서 작업을 받을 수 없을 때 발생"""
+
+class ConsultationJobQueue:
+    """
+    크기가 제한된 세션별 FIFO 작업 큐와 워커 스레드 풀
+    요청 핸들러는 작업을 넣고 즉시 반환하며, 대기열이 가득 차면 지연이 쌓이는 대신 QueueFullError 로 거절합니다.
+    같은 세션(key)의 작업은 들어온 순서대로 한 번에 하나씩만 실행됩니다. 워커는 작업이 있는 세션을 하나 꺼내
+    맨 앞 작업만 처리하고, 남은 작업이 있으면 세션을 준비 큐 뒤에 다시 넣습니다.
+    따라서 한 세션에 작업이 몰려도 워커가 세션 잠금에서 대기하지 않고, 다른 세션 작업이 뒤에 막히지 않습니다.
+    """
+
+    def __init__(self, handler: Callable[[object], None], workers: int = 4, max_pending: int = 100):
+        self._handler = handler
+        self._workers = workers
+        self.max_pending = max_pending
+        # 세션 key -> 대기 중인 작업 (key 가 있으면 준비 큐에 있거나 처리 중)
+        self._pending: Dict[Hashable, Deque[object]] = {}
+        self._ready: "queue.Queue" = queue.Queue()
+        self._depth = 0
+        self._threads = []
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                thread = threading.Thread(target=self._run, name=f"agent-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            key = self._ready.get()
+            with self._lock:
+                job = self._pending[key].popleft()
+                self._depth -= 1
+            try:
+                self._handler(job)
+                succeeded = True
+            except Exception:
+                succeeded = False
+            with self._lock:
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if self._pending[key]:
+                    self._ready.put(key)
+                else:
+                    del self._pending[key]
+
+    def submit(self, job, key: Hashable):
+        """
+        작업을 세션 key 의 대기열 끝에 추가 (전체 대기 작업이 max_pending 이면 QueueFullError)
+        """
+        self._ensure_started()
+        with self._lock:
+            if self._depth >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError("상담 대기열이 가득 찼습니다.")
+            self._depth += 1
+            jobs = self._pending.get(key)
+            if jobs is None:
+                self._pending[key] = deque([job])
+                self._ready.put(key)
+            else:
+                jobs.append(job)
+
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "depth": self._depth,
+                "capacity": self.max_pending,
+                "workers": self._workers,
+                "sessions": len(self._pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+_job_queue: Optional[ConsultationJobQueue] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue(handler: Callable[[object], None]) -> ConsultationJobQueue:
+    """
+    프로세스 전역 작업 큐 (AGENT_QUEUE_WORKERS, AGENT_QUEUE_MAX_PENDING 환경 변수로 설정)
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = ConsultationJobQueue(
+                    handler,
+                    workers=int(os.getenv("AGENT_QUEUE_WORKERS", "4")),
+                    max_pending=int(os.getenv("AGENT_QUEUE_MAX_PENDING", "100")),
+                )
+    return _job_queue
+
+def job_queue_stats() -> Optional[Dict[str, int]]:
+    """
+    작업 큐 통계 (아직 생성되지 않았으면 None)
+    """
+    return _job_queue.stats() if _job_queue is not None else None
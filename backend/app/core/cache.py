@@ -0,0 +1,375 @@
+# 커뮤니티 조회용 read-through 캐시 (프로세스 내 LRU + TTL, 선택적으로 호스트 공유 SQLite)
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+COMMUNITY_CACHE_MAX_ENTRIES = int(os.getenv("COMMUNITY_CACHE_MAX_ENTRIES", "2048"))
+COMMUNITY_CACHE_TTL_SEC = float(os.getenv("COMMUNITY_CACHE_TTL_SEC", "30"))
+# 같은 호스트의 워커 프로세스들이 공유하는 SQLite 파일 (미설정 시 프로세스 내 캐시만 사용)
+COMMUNITY_CACHE_PATH = os.getenv("COMMUNITY_CACHE_PATH") or None
+
+class _SharedStore:
+    """
+    워커 프로세스 간 공유되는 SQLite 저장소 (스레드별 연결, WAL 모드)
+    태그 -> 키 매핑도 함께 저장해 다른 프로세스에서 넣은 항목도 태그로 무효화할 수 있습니다.
+    무효화된 태그는 순번과 함께 기록되어, 다른 프로세스가 자기 L1 에서도 같은 태그를 지울 수 있습니다.
+    로컬 파일의 키 단위 조회/저장만 하므로 이벤트 루프에서 직접 호출합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, tags TEXT NOT NULL, created_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations (seq INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT NOT NULL, origin TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, min_created_at: float) -> Optional[Tuple[Any, float, Tuple[str, ...]]]:
+        row = self._connection().execute(
+            "SELECT value, created_at, tags FROM cache_entries WHERE key = ? AND created_at >= ?", (key, min_created_at)
+        ).fetchone()
+        return (json.loads(row[0]), row[1], tuple(json.loads(row[2]))) if row else None
+
+    def put(self, key: str, value: Any, created_at: float, tags: Iterable[str]):
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, tags, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False, default=str), json.dumps(list(tags)), created_at),
+            )
+            conn.executemany("INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def invalidate_tags(self, tags: List[str], origin: str):
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in tags)
+        now = time.time()
+        conn.execute("BEGIN")
+        try:
+            conn.execute(f"DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))", tags)
+            conn.execute(f"DELETE FROM cache_tags WHERE tag IN ({placeholders})", tags)
+            conn.executemany("INSERT INTO cache_invalidations (tag, origin, created_at) VALUES (?, ?, ?)", [(tag, origin, now) for tag in tags])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update_tagged(self, tag: str, update: Callable[[Any], Any], origin: str):
+        """
+        tag 가 붙은 항목의 값을 update(값) 으로 교체하고, 다른 프로세스가 L1 을 다시 읽도록 무효화 기록을 남김
+        """
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute("SELECT key, value FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (tag,)).fetchall()
+            conn.executemany(
+                "UPDATE cache_entries SET value = ? WHERE key = ?",
+                [(json.dumps(update(json.loads(value)), ensure_ascii=False, default=str), key) for key, value in rows],
+            )
+            conn.execute("INSERT INTO cache_invalidations (tag, origin, created_at) VALUES (?, ?, ?)", (tag, origin, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def last_invalidation(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+
+    def invalidations_since(self, seq: int) -> List[Tuple[int, str, str]]:
+        """
+        seq 이후 기록된 (순번, 태그, 기록한 캐시) 목록
+        """
+        return self._connection().execute("SELECT seq, tag, origin FROM cache_invalidations WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+
+    def prune(self, min_created_at: float):
+        conn = self._connection()
+        # TTL 보다 오래된 무효화 기록은 지워도 됨 (그 이전에 만든 L1 항목은 이미 만료됨)
+        conn.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (min_created_at,))
+        conn.execute("DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_entries WHERE created_at < ?)", (min_created_at,))
+        conn.execute("DELETE FROM cache_entries WHERE created_at < ?", (min_created_at,))
+
+class _Entry:
+    __slots__ = ("value", "created_at", "tags")
+
+    def __init__(self, value: Any, created_at: float, tags: Tuple[str, ...]):
+        self.value = value
+        self.created_at = created_at
+        self.tags = tags
+
+# 계산하던 요청이 취소되어 결과가 없음 -> 기다리던 요청 중 하나가 다시 계산
+_RETRY = object()
+
+class ReadThroughCache:
+    """
+    태그 기반 무효화를 지원하는 read-through 캐시
+    - get_or_load: 적중 시 캐시 값을, 미스 시 키당 한 요청만 loader 를 await 하고 나머지는 그 결과를 함께 받습니다.
+      없는 값(None)과 예외도 공유하므로 같은 키를 동시에 요청해도 loader 는 한 번만 실행됩니다 (stampede 방지)
+    - invalidate: 쓰기 경로에서 관련 태그(예: "post:3", "feed:head")가 붙은 항목만 정확히 제거
+    - update: 값 일부만 바뀌는 쓰기(예: 좋아요 수)는 항목을 지우지 않고 태그가 붙은 값을 제자리에서 교체
+      공유 저장소를 쓰면 다른 프로세스의 무효화도 조회 전에 가져와 이 프로세스의 L1 에 반영합니다.
+    캐시 값은 직렬화된 dict/list 이므로 호출 측에서 수정하지 말고 복사해서 사용해야 합니다.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 30, shared_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = defaultdict(set)  # tag -> keys
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._shared = _SharedStore(shared_path) if shared_path else None
+        # 공유 저장소의 무효화 기록 중 이미 반영한 마지막 순번 (자기가 남긴 기록은 origin 으로 구분)
+        self._origin = uuid.uuid4().hex
+        self._seen_invalidation = self._shared.last_invalidation() if self._shared else 0
+        # 무효화 순번: 태그별 마지막 무효화 순번과 비교해, 계산 중 자기 태그가 무효화된 값만 버림
+        self._epoch = 0
+        self._tag_epochs: Dict[str, int] = {}
+        self._cleared_epoch = 0
+        self._load_epochs: Dict[str, int] = {}  # 계산 중인 키 -> 계산 시작 시점의 순번
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+        self.updates = 0
+        self.evictions = 0
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry.tags:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+    def _remember(self, key: str, value: Any, created_at: float, tags: Tuple[str, ...]):
+        self._forget(key)
+        self._entries[key] = _Entry(value, created_at, tags)
+        for tag in tags:
+            self._tags[tag].add(key)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _lookup(self, key: str, now: float) -> Optional[_Entry]:
+        """
+        캐시 조회 (self._lock 보유 상태에서 호출)
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry.created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._record_hit(now - entry.created_at)
+                return entry
+            self._forget(key)
+        return None
+
+    def _invalidated_since(self, epoch: int, tags: Tuple[str, ...]) -> bool:
+        """
+        epoch 이후 clear() 나 tags 중 하나의 무효화가 있었는지 (self._lock 보유 상태에서 호출)
+        """
+        return self._cleared_epoch > epoch or any(self._tag_epochs.get(tag, 0) > epoch for tag in tags)
+
+    def _prune_tag_epochs(self):
+        """
+        계산 중인 어떤 요청보다도 먼저 기록된 태그 순번은 더 이상 비교할 일이 없으므로 정리
+        """
+        if len(self._tag_epochs) <= self.max_entries:
+            return
+        oldest = min(self._load_epochs.values(), default=self._epoch)
+        self._tag_epochs = {tag: epoch for tag, epoch in self._tag_epochs.items() if epoch > oldest}
+
+    def _record_hit(self, age: float):
+        self.hits += 1
+        self._hit_age_total += age
+        self._hit_age_max = max(self._hit_age_max, age)
+
+    def _sync_shared(self):
+        """
+        다른 프로세스가 공유 저장소에 남긴 무효화를 이 프로세스의 L1 에 반영 (보통 빈 결과의 인덱스 조회 한 번)
+        """
+        if self._shared is None:
+            return
+        rows = self._shared.invalidations_since(self._seen_invalidation)
+        if not rows:
+            return
+        self._seen_invalidation = rows[-1][0]
+        tags = [tag for _, tag, origin in rows if origin != self._origin]
+        if tags:
+            self._invalidate_local(tags)
+            with self._lock:
+                self.remote_invalidations += len(tags)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[Tuple[Any, Iterable[str]]]]]) -> Optional[Any]:
+        """
+        key 의 값을 반환하고, 없으면 await loader() 로 (값, 태그 목록) 을 계산해 저장합니다.
+        loader 가 None 을 반환하면 (예: 없는 게시글) 캐시하지 않고 None 을 반환합니다.
+        """
+        while True:
+            self._sync_shared()
+            now = time.time()
+            with self._lock:
+                entry = self._lookup(key, now)
+                if entry is not None:
+                    return entry.value
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = asyncio.get_running_loop().create_future()
+                    epoch = self._load_epochs[key] = self._epoch
+                    break
+                self.coalesced += 1
+                joined_at = self._epoch
+            # 다른 요청이 같은 키를 계산 중이면 그 결과(None, 예외 포함)를 함께 사용 (기다리던 요청이 취소되어도 계산은 계속)
+            result = await asyncio.shield(pending)
+            if result is _RETRY:
+                continue
+            value, tags, load_epoch = result
+            with self._lock:
+                # 계산 시작 후, 이 요청이 기다리기 전에 값의 태그가 무효화되었다면 이 요청에는 오래된 값 -> 다시 계산
+                if not (joined_at > load_epoch and self._invalidated_since(load_epoch, tags)):
+                    return value
+
+        try:
+            value, tags = await self._load(key, loader, epoch, now)
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # 기다리는 요청이 없어도 "예외가 조회되지 않음" 경고가 나지 않도록
+            raise
+        else:
+            pending.set_result((value, tags, epoch))
+            return value
+        finally:
+            if not pending.done():
+                pending.set_result(_RETRY)
+            with self._lock:
+                del self._loading[key]
+                del self._load_epochs[key]
+                self._prune_tag_epochs()
+
+    async def _load(self, key: str, loader, epoch: int, now: float) -> Tuple[Optional[Any], Tuple[str, ...]]:
+        """
+        공유 저장소 또는 loader 로 값을 계산해 저장 -> (값, 태그) (없는 값이면 (None, ()))
+        """
+        if self._shared is not None:
+            shared = self._shared.get(key, now - self.ttl_seconds)
+            if shared is not None:
+                value, created_at, tags = shared
+                with self._lock:
+                    self.shared_hits += 1
+                    self._record_hit(now - created_at)
+                    if not self._invalidated_since(epoch, tags):
+                        self._remember(key, value, created_at, tags)
+                return value, tags
+
+        with self._lock:
+            self.misses += 1
+        loaded = await loader()
+        if loaded is None:
+            return None, ()
+        value, tags = loaded
+        tags = tuple(tags)
+        created_at = time.time()
+        self._sync_shared()
+        with self._lock:
+            # 계산 중 이 값의 태그가 무효화되었다면 이미 오래된 값일 수 있으므로 저장하지 않음
+            # (다른 태그의 무효화는 이 값과 무관하므로 그대로 저장)
+            if self._invalidated_since(epoch, tags):
+                return value, tags
+            self._remember(key, value, created_at, tags)
+        if self._shared is not None:
+            self._shared.put(key, value, created_at, tags)
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 500:
+                self._puts_since_prune = 0
+                self._shared.prune(created_at - self.ttl_seconds)
+        return value, tags
+
+    def _invalidate_local(self, tags: Iterable[str]):
+        with self._lock:
+            self._epoch += 1
+            for tag in tags:
+                self._tag_epochs[tag] = self._epoch
+                for key in list(self._tags.get(tag, ())):
+                    self._forget(key)
+                    self.invalidations += 1
+
+    def update(self, tag: str, update: Callable[[Any], Any]):
+        """
+        tag 가 붙은 항목의 값을 update(값) 의 반환값으로 교체 (update 는 받은 값을 수정하지 말고 새 값을 반환)
+        계산 중인 같은 태그의 값은 갱신 전 값일 수 있으므로 invalidate 와 같이 저장하지 않습니다.
+        """
+        with self._lock:
+            self._epoch += 1
+            self._tag_epochs[tag] = self._epoch
+            for key in self._tags.get(tag, ()):
+                entry = self._entries[key]
+                self._entries[key] = _Entry(update(entry.value), entry.created_at, entry.tags)
+                self.updates += 1
+        if self._shared is not None:
+            self._shared.update_tagged(tag, update, self._origin)
+
+    def invalidate(self, *tags: str):
+        """
+        태그가 붙은 모든 항목 제거 (create/update/delete 등 쓰기 경로에서 호출)
+        """
+        self._invalidate_local(tags)
+        if self._shared is not None and tags:
+            self._shared.invalidate_tags(list(tags), self._origin)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._cleared_epoch = self._epoch
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced_waits": self.coalesced,
+                "invalidations": self.invalidations,
+                "remote_invalidations": self.remote_invalidations,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "hit_age_avg_sec": round(self._hit_age_total / self.hits, 3) if self.hits else 0.0,
+                "hit_age_max_sec": round(self._hit_age_max, 3),
+            }
+
+community_cache = ReadThroughCache(
+    max_entries=COMMUNITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=COMMUNITY_CACHE_TTL_SEC,
+    shared_path=COMMUNITY_CACHE_PATH,
+)
@@ -0,0 +1,95 @@
+# 상담 모델(model/) 연동 브리지
+import importlib.util
+import os
+import sys
+import threading
+
+MODEL_DIR = os.getenv(
+    "MOTIV_MODEL_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "model")),
+)
+
+_counselor = None
+_counselor_lock = threading.Lock()
+
+def get_counselor():
+    """
+    model/main.py 를 한 번만 로드해 모듈 객체로 반환합니다.
+    backend/main.py 와 모듈 이름이 겹치므로 import 대신 파일 경로로 'motiv_counselor' 라는 이름으로 로드합니다.
+    """
+    global _counselor
+    if _counselor is None:
+        with _counselor_lock:
+            if _counselor is None:
+                if MODEL_DIR not in sys.path:
+                    sys.path.insert(0, MODEL_DIR)  # model/ 내부의 session_memory, agents 등을 import 하기 위함
+                spec = importlib.util.spec_from_file_location("motiv_counselor", os.path.join(MODEL_DIR, "main.py"))
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                _counselor = module
+    return _counselor
+
+def counselor_metrics():
+    """
+    상담 파이프라인의 단계별 지연 히스토그램과 캐시/세션 통계 (모델이 아직 로드되지 않았으면 None)
+    메트릭 조회만으로 모델을 로드하지 않도록 이미 로드된 경우에만 값을 반환합니다.
+    요청별 트레이스는 세션 키와 상담한 전문가가 드러나므로 포함하지 않습니다. (counselor_traces 사용)
+    """
+    if _counselor is None:
+        return None
+    return _counselor.pipeline_metrics()
+
+def counselor_traces(owner: str):
+    """
+    owner(토큰 sub) 본인 세션의 최근 요청별 트레이스
+    """
+    if _counselor is None:
+        return []
+    prefix = f"user_{owner}"
+    return [trace for trace in _counselor.tracer.recent_traces() if trace["trace_id"].rsplit("#", 1)[0] == prefix]
+
+def session_id_for(owner: str, session_id: str = None) -> str:
+    """
+    인증된 사용자(토큰 sub) 기준의 상담 세션 키
+    클라이언트가 보낸 세션 ID 는 항상 소유자 ID 뒤에 붙여, 다른 사용자의 세션 키를 만들 수 없습니다.
+    (세션 ID 에는 '#' 이 들어갈 수 없으므로 마지막 '#' 기준으로 소유자와 세션이 항상 구분됩니다)
+    """
+    return f"user_{owner}#{session_id or 'default'}"
+
+def stream_counselor_reply(session_id: str, message: str, initial_chart: dict = None):
+    """
+    상담사 응답을 청크 단위로 생성하는 제너레이터
+    """
+    return get_counselor().generate_gemini_response_stream(session_id, message, user_initial_chart=initial_chart)
+
+def run_counseling_turn(session_id: str, message: str, initial_chart: dict = None) -> dict:
+    """
+    상담 파이프라인을 한 턴 실행하고 응답, 이번 응답에 실제로 보고서가 반영된 전문가, 위험도를 반환합니다.
+    (첫 턴이나 마감 시간을 넘긴 전문가는 swarm_agents_used 에 포함되지 않습니다)
+    모델 호출이 실패하면 예외가 그대로 전달되고 대화 기록은 저장되지 않습니다.
+    """
+    counselor = get_counselor()
+    ai_response, experts_used = counselor.engine.respond_with_experts(session_id, message, initial_chart)
+    # 위험도는 세션에 배정된 전문가 팀 기준 (이번 턴에 보고서가 누락된 전문가도 포함)
+    team = counselor.load_selected_experts(session_id) or []
+    return {
+        "ai_response": ai_response,
+        "swarm_agents_used": experts_used,
+        "risk_level": assess_risk(message, team),
+    }
+
+# 즉각적인 안전 확인이 필요한 표현
+_HIGH_RISK_TERMS = ("suicide", "kill myself", "self-harm", "hurt myself", "hits me", "hit me", "abuse", "violence", "threaten")
+# 의료/법률 전문가가 필요한 사안은 중간 위험도로 분류
+_MEDIUM_RISK_EXPERTS = ("Psychiatrist", "Lawyer Expert")
+
+def assess_risk(message: str, experts: list) -> str:
+    """
+    키워드와 선택된 전문가 팀 기반의 간단한 위험도 분류 (high / medium / low)
+    """
+    text = message.lower()
+    if any(term in text for term in _HIGH_RISK_TERMS):
+        return "high"
+    if any(expert in experts for expert in _MEDIUM_RISK_EXPERTS):
+        return "medium"
+    return "low"
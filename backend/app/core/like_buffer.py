@@ -0,0 +1,155 @@
+# 좋아요 카운터 쓰기 병합 버퍼 (LIKE_BUFFER_ENABLED=1 일 때 사용)
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.database import AsyncSessionLocal
+from app.models.db_community import Post, Comment
+from app.core.logging import log_user_action
+from app.core.cache import community_cache
+
+LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "0") == "1"
+LIKE_FLUSH_INTERVAL_MS = int(os.getenv("LIKE_FLUSH_INTERVAL_MS", "200"))
+
+_TABLES = {"post": Post.__table__, "comment": Comment.__table__}
+
+class LikeCounterBuffer:
+    """
+    좋아요 증가분을 ID 별로 메모리에 모았다가 flush_interval_ms 마다 한 트랜잭션으로 반영합니다.
+    인기 게시글에 좋아요가 몰려도 요청마다 같은 행의 락을 잡지 않고, 주기당 행별 UPDATE 한 번으로 합쳐집니다.
+    조회 시에는 DB 값에 아직 반영되지 않은 증가분(pending)을 더해 보여줍니다 (프로세스 단위).
+    반영은 이벤트 루프의 백그라운드 태스크가 수행하며, 종료 시 close() 로 남은 증가분을 반영합니다.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, flush_interval_ms: int = 200):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self._pending: Dict[str, Dict[int, int]] = {kind: defaultdict(int) for kind in _TABLES}
+        self._flushing: Dict[str, Dict[int, int]] = {kind: {} for kind in _TABLES}
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="like-flusher")
+
+    def add(self, kind: str, row_id: int, delta: int = 1):
+        """
+        좋아요 증가분 기록 (kind: "post" 또는 "comment", 이벤트 루프에서 호출)
+        """
+        self._ensure_started()
+        with self._lock:
+            self._pending[kind][row_id] += delta
+
+    def pending(self, kind: str, row_id: int) -> int:
+        """
+        아직 DB 에 커밋되지 않은 증가분
+        """
+        with self._lock:
+            return self._pending[kind].get(row_id, 0) + self._flushing[kind].get(row_id, 0)
+
+    def apply_pending(self, obj, kind: str):
+        """
+        조회한 ORM 객체 또는 직렬화된 dict 의 like_count 에 미반영 증가분을 더함
+        ORM 객체는 세션 변경으로 표시되지 않도록 committed 값으로 설정합니다.
+        """
+        if isinstance(obj, dict):
+            delta = self.pending(kind, obj["id"])
+            if delta:
+                obj["like_count"] = (obj["like_count"] or 0) + delta
+        elif obj is not None:
+            delta = self.pending(kind, obj.id)
+            if delta:
+                set_committed_value(obj, "like_count", (obj.like_count or 0) + delta)
+        return obj
+
+    async def flush(self):
+        async with self._flush_lock:
+            with self._lock:
+                batch = {kind: dict(deltas) for kind, deltas in self._pending.items() if deltas}
+                if not batch:
+                    return
+                for kind, deltas in batch.items():
+                    self._flushing[kind] = deltas
+                    self._pending[kind] = defaultdict(int)
+
+            try:
+                async with self._session_factory() as db:
+                    for kind, deltas in batch.items():
+                        table = _TABLES[kind]
+                        stmt = (
+                            update(table)
+                            .where(table.c.id == bindparam("row_id"))
+                            .values(like_count=table.c.like_count + bindparam("delta"))
+                        )
+                        await db.execute(stmt, [{"row_id": row_id, "delta": delta} for row_id, delta in deltas.items()])
+                    await db.commit()
+                # 반영된 카운트가 캐시된 게시글/피드에 보이도록 해당 항목 무효화
+                community_cache.invalidate(*(f"{kind}:{row_id}" for kind, deltas in batch.items() for row_id in deltas))
+                self.flushes += 1
+                self.flushed_rows += sum(len(deltas) for deltas in batch.values())
+            except Exception as e:
+                self.flush_errors += 1
+                # 실패한 증가분은 다음 주기에 다시 시도
+                with self._lock:
+                    for kind, deltas in batch.items():
+                        for row_id, delta in deltas.items():
+                            self._pending[kind][row_id] += delta
+                log_user_action("like_flush_error", wallet_address="unknown", details={"error": str(e)})
+            finally:
+                with self._lock:
+                    for kind in batch:
+                        self._flushing[kind] = {}
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def close(self):
+        """
+        백그라운드 태스크를 멈추고 남은 증가분을 반영 (앱 종료 시 호출)
+        """
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = sum(len(deltas) for deltas in self._pending.values())
+        return {
+            "pending_rows": pending,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "flush_errors": self.flush_errors,
+        }
+
+_like_buffer: Optional[LikeCounterBuffer] = None
+_like_buffer_lock = threading.Lock()
+
+def get_like_buffer() -> Optional[LikeCounterBuffer]:
+    """
+    LIKE_BUFFER_ENABLED=1 이면 프로세스 전역 버퍼를, 아니면 None 을 반환 (좋아요는 요청마다 원자적 UPDATE)
+    """
+    global _like_buffer
+    if not LIKE_BUFFER_ENABLED:
+        return None
+    if _like_buffer is None:
+        with _like_buffer_lock:
+            if _like_buffer is None:
+                _like_buffer = LikeCounterBuffer(flush_interval_ms=LIKE_FLUSH_INTERVAL_MS)
+    return _like_buffer
@@ -1,17 +1,173 @@
+import atexit
 import logging
 import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict
 
 # 로깅 설정 (콘솔에 출력, 필요시 파일로도 가능)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 logger = logging.getLogger("motiv")
+# 사용자 액션 로그 전용 로거: 배치 전체를 한 번에 출력하므로 줄 머리(시각/레벨)는 파이프라인이 직접 붙임
+action_logger = logging.getLogger("motiv.actions")
+action_logger.propagate = False
+if not action_logger.handlers:
+    _action_handler = logging.StreamHandler(sys.stderr)
+    _action_handler.setFormatter(logging.Formatter("%(message)s"))
+    action_logger.addHandler(_action_handler)
+action_logger.setLevel(logging.INFO)
+
+# 대기열 최대 크기 (가득 차면 새 로그는 버리고 카운트만 증가)
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+# 백그라운드 스레드가 한 번에 처리하는 최대 로그 수
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+# 문자열 필드 최대 길이 (게시글/댓글/채팅 본문 등)
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+# 액션별 샘플링 비율, 예: "ipfs_upload=0.1,icp_upload=0.1" (지정하지 않은 액션과 *_error 액션은 항상 기록)
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            action, rate = item.split("=", 1)
+            rates[action.strip()] = float(rate)
+    return rates
+
+def _truncate(value, limit: int):
+    """
+    긴 문자열을 잘라 로그 크기를 페이로드 크기와 무관하게 제한
+    """
+    if isinstance(value, str):
+        return value if len(value) <= limit else f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, dict):
+        return {key: _truncate(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_truncate(item, limit) for item in value]
+    return value
+
+def _line_prefix(logged_at: float) -> str:
+    """
+    basicConfig 형식('%(asctime)s %(levelname)s ')과 같은 줄 머리
+    """
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(logged_at)) + ",%03d INFO " % (logged_at % 1 * 1000)
+
+class AsyncLogPipeline:
+    """
+    log_user_action 용 비동기 로그 파이프라인
+    요청 핸들러는 샘플링 판정 후 대기열에 넣기만 하고, 잘라내기/JSON 직렬화/출력은 백그라운드 스레드가 배치로 처리합니다.
+    따라서 핸들러 지연은 디스크나 stdout 속도와 무관합니다.
+    한 배치는 줄바꿈으로 이어 붙여 핸들러에 한 번만 출력합니다. (레코드마다 핸들러 잠금/쓰기를 반복하지 않음)
+    """
+
+    def __init__(self, max_pending: int = 10000, batch_size: int = 256, max_field_chars: int = 200, sample_rates: Dict[str, float] = None):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.batch_size = batch_size
+        self.max_field_chars = max_field_chars
+        self.sample_rates = sample_rates or {}
+        self._thread = None
+        self._lock = threading.Lock()
+        # 요청 스레드들이 함께 증가시키는 카운터용 잠금 (written/batches/failed 는 기록 스레드만 갱신)
+        self._counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped_full = 0
+        self.dropped_sampled = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, action: str, wallet_address: str, details: dict = None):
+        rate = self.sample_rates.get(action, 1.0)
+        if rate < 1.0 and not action.endswith("_error") and random.random() >= rate:
+            with self._counter_lock:
+                self.dropped_sampled += 1
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((action, wallet_address, details, time.time()))
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped_full += 1
+        else:
+            with self._counter_lock:
+                self.enqueued += 1
+
+    def _write_batch(self, batch):
+        lines = []
+        for action, wallet_address, details, logged_at in batch:
+            try:
+                log_msg = {
+                    "action": action,
+                    "wallet_address": wallet_address,
+                    "details": _truncate(details or {}, self.max_field_chars),
+                    "ts": round(logged_at, 3),
+                }
+                lines.append(_line_prefix(logged_at) + json.dumps(log_msg, ensure_ascii=False, default=str))
+            except Exception:
+                self.failed += 1
+        if lines:
+            try:
+                action_logger.info("\n".join(lines))
+                self.written += len(lines)
+            except Exception:
+                self.failed += len(lines)
+        self.batches += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """
+        대기 중인 로그가 모두 기록될 때까지 최대 timeout 초 대기 (종료 시 사용)
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped_full": self.dropped_full,
+            "dropped_sampled": self.dropped_sampled,
+            "failed": self.failed,
+        }
+
+log_pipeline = AsyncLogPipeline(
+    max_pending=LOG_QUEUE_MAX,
+    batch_size=LOG_BATCH_SIZE,
+    max_field_chars=LOG_MAX_FIELD_CHARS,
+    sample_rates=_parse_sample_rates(LOG_SAMPLE_RATES),
+)
+atexit.register(log_pipeline.flush)
 
 def log_user_action(action: str, wallet_address: str, details: dict = None):
     """
-    사용자 액션 및 에러 로깅 함수
+    사용자 액션 및 에러 로깅 함수 (대기열에 넣고 즉시 반환, 기록은 백그라운드 스레드에서 수행)
     """
-    log_msg = {
-        "action": action,
-        "wallet_address": wallet_address,
-        "details": details or {}
-    }
-    logger.info(json.dumps(log_msg, ensure_ascii=False)) 
\ No newline at end of file
+    log_pipeline.submit(action, wallet_address, details)
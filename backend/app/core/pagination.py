@@ -0,0 +1,45 @@
+# 커서(키셋) 페이지네이션 유틸리티
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+def _encode(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode(cursor: str) -> dict:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    마지막 행의 (created_at, id) 를 불투명한 커서 문자열로 인코딩
+    """
+    return _encode({"c": created_at.isoformat(), "i": row_id})
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    커서 문자열을 (created_at, id) 로 디코딩 (형식이 잘못되면 ValueError)
+    """
+    try:
+        data = _decode(cursor)
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError("잘못된 커서입니다.") from e
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """
+    검색 결과 마지막 행의 (점수, id) 를 커서 문자열로 인코딩
+    """
+    return _encode({"r": rank, "i": row_id})
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    검색 커서를 (점수, id) 로 디코딩 (형식이 잘못되면 ValueError)
+    """
+    try:
+        data = _decode(cursor)
+        return float(data["r"]), int(data["i"])
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError("잘못된 커서입니다.") from e
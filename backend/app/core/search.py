@@ -0,0 +1,230 @@
+# 커뮤니티 전문 검색 - PostgreSQL 이 아닌 DB(SQLite 개발 환경 등) 용 프로세스 내 역색인
+# PostgreSQL 에서는 posts/comments 의 tsvector GIN 인덱스를 사용하므로 이 색인은 비활성화됩니다.
+import asyncio
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+from app.models.db_community import Post, Comment
+
+# auto: PostgreSQL 이면 tsvector, 그 외에는 프로세스 내 역색인 / postgres / memory 로 강제 지정 가능
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# 필드 가중치 (PostgreSQL 의 제목 A / 본문 B 가중치와 같은 방향)
+TITLE_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+COMMENT_WEIGHT = 0.5
+# BM25 파라미터
+_K1 = 1.2
+_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    소문자화 후 단어 단위로 분리 (PostgreSQL 'simple' 설정과 같은 방식)
+    """
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+def use_postgres_search() -> bool:
+    if SEARCH_BACKEND == "auto":
+        return engine.dialect.name == "postgresql"
+    return SEARCH_BACKEND == "postgres"
+
+class InvertedIndex:
+    """
+    게시글 단위 역색인: 단어 -> {게시글 id: 가중 빈도}
+    댓글 본문은 소속 게시글 문서에 COMMENT_WEIGHT 로 합산되어, 댓글만 일치해도 게시글이 검색됩니다.
+    첫 검색 시 DB 에서 한 번 적재하고, 이후에는 CRUD 의 생성/수정/삭제 경로에서 증분 갱신합니다.
+    색인은 프로세스마다 따로 유지되므로 단일 워커 개발 환경용입니다.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.loaded = False
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._post_terms: Dict[int, Counter] = {}
+        self._comment_terms: Dict[int, Tuple[int, Counter]] = {}
+        self._post_comments: Dict[int, Set[int]] = defaultdict(set)
+        self._doc_length: Dict[int, float] = defaultdict(float)
+        self._category: Dict[int, Optional[str]] = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        # 적재 중 삭제된 항목 (적재가 읽은 이전 스냅샷으로 되살리지 않도록)
+        self._removed_posts: Set[int] = set()
+        self._removed_comments: Set[int] = set()
+
+    def _apply(self, post_id: int, terms: Counter, sign: int):
+        for term, weight in terms.items():
+            postings = self._postings[term]
+            value = postings.get(post_id, 0.0) + sign * weight
+            if value > 1e-9:
+                postings[post_id] = value
+            else:
+                postings.pop(post_id, None)
+                if not postings:
+                    del self._postings[term]
+        delta = sign * sum(terms.values())
+        self._doc_length[post_id] += delta
+        self._total_length += delta
+
+    def _weighted_terms(self, weighted_texts: Iterable[Tuple[Optional[str], float]]) -> Counter:
+        terms = Counter()
+        for text, weight in weighted_texts:
+            for token in tokenize(text):
+                terms[token] += weight
+        return terms
+
+    def _index_post(self, post_id: int, title: str, content: str, category: Optional[str]):
+        old = self._post_terms.pop(post_id, None)
+        if old:
+            self._apply(post_id, old, -1)
+        terms = self._weighted_terms([(title, TITLE_WEIGHT), (content, CONTENT_WEIGHT)])
+        self._apply(post_id, terms, 1)
+        self._post_terms[post_id] = terms
+        self._category[post_id] = category
+
+    def _index_comment(self, comment_id: int, post_id: int, content: str):
+        old = self._comment_terms.pop(comment_id, None)
+        if old:
+            self._apply(old[0], old[1], -1)
+            self._post_comments[old[0]].discard(comment_id)
+        terms = self._weighted_terms([(content, COMMENT_WEIGHT)])
+        self._apply(post_id, terms, 1)
+        self._comment_terms[comment_id] = (post_id, terms)
+        self._post_comments[post_id].add(comment_id)
+
+    def _remove_comment(self, comment_id: int):
+        old = self._comment_terms.pop(comment_id, None)
+        if old:
+            self._apply(old[0], old[1], -1)
+            self._post_comments[old[0]].discard(comment_id)
+
+    def _remove_post(self, post_id: int):
+        for comment_id in list(self._post_comments.pop(post_id, ())):
+            self._remove_comment(comment_id)
+        old = self._post_terms.pop(post_id, None)
+        if old:
+            self._apply(post_id, old, -1)
+        self._category.pop(post_id, None)
+        self._total_length -= self._doc_length.pop(post_id, 0.0)
+
+    def post_saved(self, post: Post):
+        """
+        게시글 생성/수정 후 호출
+        """
+        if self.enabled:
+            with self._lock:
+                self._removed_posts.discard(post.id)
+                self._index_post(post.id, post.title, post.content, post.category)
+
+    def post_deleted(self, post_id: int):
+        if self.enabled:
+            with self._lock:
+                self._remove_post(post_id)
+                self._removed_posts.add(post_id)
+
+    def comment_saved(self, comment: Comment):
+        """
+        댓글 생성/수정 후 호출
+        """
+        if self.enabled:
+            with self._lock:
+                self._removed_comments.discard(comment.id)
+                self._index_comment(comment.id, comment.post_id, comment.content)
+
+    def comment_deleted(self, comment_id: int):
+        if self.enabled:
+            with self._lock:
+                self._remove_comment(comment_id)
+                self._removed_comments.add(comment_id)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """
+        첫 검색 시 DB 의 전체 게시글/댓글로 색인 구성 (이후 요청은 바로 반환)
+        """
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            with self._lock:
+                self._removed_posts.clear()
+                self._removed_comments.clear()
+            posts = await db.stream(select(Post.id, Post.title, Post.content, Post.category))
+            async for post_id, title, content, category in posts:
+                with self._lock:
+                    if post_id not in self._removed_posts and post_id not in self._post_terms:
+                        self._index_post(post_id, title, content, category)
+            comments = await db.stream(select(Comment.id, Comment.post_id, Comment.content))
+            async for comment_id, post_id, content in comments:
+                with self._lock:
+                    if comment_id not in self._removed_comments and comment_id not in self._comment_terms:
+                        self._index_comment(comment_id, post_id, content)
+            with self._lock:
+                self._removed_posts.clear()
+                self._removed_comments.clear()
+                self.loaded = True
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 10,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        모든 검색어를 포함하는 게시글을 BM25 점수 내림차순(동점은 id 내림차순)으로 최대 limit 개 반환
+        after: 이전 페이지 마지막 (점수, id) - 이보다 뒤의 결과만 반환
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            doc_count = len(self._category) or 1
+            average_length = (self._total_length / doc_count) or 1.0
+            idfs = [math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            scored = []
+            # 가장 짧은 posting 목록을 기준으로 나머지와 교집합
+            for post_id, first_tf in postings[0].items():
+                if post_id not in self._category:
+                    continue
+                if category is not None and self._category[post_id] != category:
+                    continue
+                norm = _K1 * (1 - _B + _B * self._doc_length[post_id] / average_length)
+                score = 0.0
+                for term_postings, idf in zip(postings, idfs):
+                    tf = term_postings.get(post_id)
+                    if tf is None:
+                        break
+                    score += idf * tf * (_K1 + 1) / (tf + norm)
+                else:
+                    key = (round(score, 6), post_id)
+                    if after is None or key < after:
+                        scored.append(key)
+        return [(post_id, score) for score, post_id in heapq.nlargest(limit, scored)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "loaded": self.loaded,
+                "posts": len(self._category),
+                "comments": len(self._comment_terms),
+                "terms": len(self._postings),
+            }
+
+search_index = InvertedIndex(enabled=not use_postgres_search())
@@ -1,9 +1,51 @@
-from sqlalchemy.orm import Session
-from app.models.db_community import Post, Comment
+import os
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Integer, column, delete, func, literal, select, true, tuple_, union, union_all, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.db_community import Post, Comment, post_search_vector, comment_search_vector, SEARCH_TS_CONFIG
 from app.schemas.community import PostCreate, CommentCreate
-from typing import List
+from app.core.pagination import encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+from app.core.cache import community_cache
+from app.core.search import search_index, use_postgres_search
+from typing import Dict, Iterable, List, Optional, Tuple
 
-def create_post(db: Session, post: PostCreate, author_id: int, author_wallet: str, ipfs_hash: str, icp_tx: str):
+# 댓글 페이지 크기 기본값/상한 (게시글 상세에는 첫 페이지만 포함)
+COMMENT_PAGE_SIZE = int(os.getenv("COMMENT_PAGE_SIZE", "50"))
+COMMENT_PAGE_SIZE_MAX = int(os.getenv("COMMENT_PAGE_SIZE_MAX", "200"))
+
+# 캐시 무효화 태그: 첫 피드 페이지, 게시글(상세 + 그 글이 포함된 피드 페이지), 댓글(그 댓글이 포함된 항목)
+FEED_HEAD_TAG = "feed:head"
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+def comment_tag(comment_id: int) -> str:
+    return f"comment:{comment_id}"
+
+def _row_dict(row) -> Dict:
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+def _post_tags(post: Dict) -> List[str]:
+    return [post_tag(post["id"])] + [comment_tag(comment["id"]) for comment in post.get("comments") or []]
+
+# 목록용 댓글 수 (상관 서브쿼리: LIMIT 으로 고른 행에 대해서만 comments(post_id) 인덱스로 계산)
+_comment_count = (
+    select(func.count(Comment.id))
+    .where(Comment.post_id == Post.id)
+    .correlate(Post)
+    .scalar_subquery()
+    .label("comment_count")
+)
+
+def _summary_select(*columns):
+    """
+    게시글 컬럼 + 댓글 수를 한 쿼리로 조회하는 SELECT (PostSummary 형태의 행)
+    """
+    return select(*Post.__table__.columns, _comment_count, *columns)
+
+async def create_post(db: AsyncSession, post: PostCreate, author_id: int, author_wallet: str, ipfs_hash: str, icp_tx: str):
     """
     게시글 생성 함수
     """
@@ -17,23 +59,138 @@ def create_post(db: Session, post: PostCreate, author_id: int, author_wallet: st
         icp_tx=icp_tx
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    await db.commit()
+    await db.refresh(db_post)
+    set_committed_value(db_post, "comments", [])  # 새 게시글이므로 댓글 조회 없이 빈 목록
+    community_cache.invalidate(FEED_HEAD_TAG)
+    search_index.post_saved(db_post)
     return db_post
 
-def get_post(db: Session, post_id: int):
+async def get_post(db: AsyncSession, post_id: int):
     """
     게시글 단건 조회 함수
     """
-    return db.query(Post).filter(Post.id == post_id).first()
+    return await db.get(Post, post_id)
+
+async def get_posts(db: AsyncSession, limit: int = 10, cursor: Optional[str] = None, category: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    게시글 목록 조회 함수 (최신순 키셋 페이지네이션, 댓글 수 포함, 한 번의 쿼리)
+    (created_at, id) 또는 (category, created_at, id) 인덱스를 커서 위치부터 읽으므로 페이지 깊이와 무관하게 비용이 일정합니다.
+    반환값: (게시글 dict 목록, 다음 페이지 커서 또는 None)
+    """
+    query = _summary_select()
+    if category is not None:
+        query = query.where(Post.category == category)
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        query = query.where(tuple_(Post.created_at, Post.id) < tuple_(created_at, post_id))
+    result = await db.execute(query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1))
+    posts = [dict(row) for row in result.mappings().all()]
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1]["created_at"], posts[-1]["id"])
+    return posts, next_cursor
 
-def get_posts(db: Session, skip: int = 0, limit: int = 10) -> List[Post]:
+async def get_post_detail(db: AsyncSession, post_id: int) -> Optional[Dict]:
     """
-    게시글 목록 조회 함수
+    게시글 상세 (PostResponse 형태의 JSON 호환 dict)
+    댓글은 첫 페이지만 포함하고 나머지는 comments_next_cursor 로 /posts/{post_id}/comments 에서 이어 조회합니다.
     """
-    return db.query(Post).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(_summary_select().where(Post.id == post_id))
+    row = result.mappings().first()
+    if row is None:
+        return None
+    comments, next_cursor = await get_comments(db, post_id, limit=COMMENT_PAGE_SIZE)
+    data = dict(row)
+    data["comments"] = [_row_dict(comment) for comment in comments]
+    data["comments_next_cursor"] = next_cursor
+    return jsonable_encoder(data)
+
+async def get_post_cached(db: AsyncSession, post_id: int) -> Optional[Dict]:
+    """
+    게시글 상세 조회 (read-through 캐시, 직렬화된 dict 반환 - 수정하지 말 것)
+    """
+    async def load():
+        data = await get_post_detail(db, post_id)
+        if data is None:
+            return None
+        return data, _post_tags(data)
+    return await community_cache.get_or_load(post_tag(post_id), load)
+
+async def get_posts_cached(db: AsyncSession, limit: int = 10, cursor: Optional[str] = None, category: Optional[str] = None) -> Dict:
+    """
+    피드 페이지 조회 (read-through 캐시) -> {"items": [...], "next_cursor": ...}
+    """
+    async def load():
+        posts, next_cursor = await get_posts(db, limit=limit, cursor=cursor, category=category)
+        tags = [] if cursor else [FEED_HEAD_TAG]
+        tags.extend(post_tag(post["id"]) for post in posts)
+        return {"items": jsonable_encoder(posts), "next_cursor": next_cursor}, tags
+    if cursor:
+        decode_cursor(cursor)  # 잘못된 커서는 캐시 키를 만들기 전에 ValueError
+    return await community_cache.get_or_load(f"feed:{category or ''}:{limit}:{cursor or ''}", load)
+
+# 게시글 점수에 더해지는 댓글 일치 점수 비율 (프로세스 내 색인의 COMMENT_WEIGHT 와 같은 역할)
+SEARCH_COMMENT_RANK_WEIGHT = 0.5
+
+async def _search_postgres(db: AsyncSession, query: str, category: Optional[str], limit: int, after: Optional[Tuple[float, int]]) -> List[Tuple[Dict, float]]:
+    """
+    tsvector GIN 인덱스로 제목/본문/댓글 검색 후 ts_rank 순으로 정렬
+    후보는 게시글 인덱스와 댓글 인덱스 조회의 합집합이므로, 전체 게시글이 아닌 일치 항목만 점수를 계산합니다.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_TS_CONFIG, query)
+    matches = union(
+        select(Post.id.label("post_id")).where(post_search_vector.op("@@")(ts_query)),
+        select(Comment.post_id.label("post_id")).where(comment_search_vector.op("@@")(ts_query)),
+    ).subquery()
+    comment_ranks = (
+        select(Comment.post_id.label("post_id"), func.max(func.ts_rank(comment_search_vector, ts_query)).label("rank"))
+        .where(comment_search_vector.op("@@")(ts_query))
+        .group_by(Comment.post_id)
+        .subquery()
+    )
+    rank = func.ts_rank(post_search_vector, ts_query) + func.coalesce(comment_ranks.c.rank, 0) * SEARCH_COMMENT_RANK_WEIGHT
+    stmt = (
+        _summary_select(rank.label("rank"))
+        .join(matches, matches.c.post_id == Post.id)
+        .outerjoin(comment_ranks, comment_ranks.c.post_id == Post.id)
+    )
+    if category is not None:
+        stmt = stmt.where(Post.category == category)
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, Post.id) < tuple_(literal(after[0]), literal(after[1])))
+    result = await db.execute(stmt.order_by(rank.desc(), Post.id.desc()).limit(limit))
+    rows = [dict(row) for row in result.mappings().all()]
+    return [(row, float(row.pop("rank"))) for row in rows]
 
-def create_comment(db: Session, post_id: int, comment: CommentCreate, author_id: int, author_wallet: str, ipfs_hash: str, icp_tx: str):
+async def _search_memory(db: AsyncSession, query: str, category: Optional[str], limit: int, after: Optional[Tuple[float, int]]) -> List[Tuple[Dict, float]]:
+    """
+    프로세스 내 역색인으로 검색한 뒤 게시글 행을 한 번에 조회
+    """
+    await search_index.ensure_loaded(db)
+    hits = search_index.search(query, category=category, limit=limit, after=after)
+    if not hits:
+        return []
+    result = await db.execute(_summary_select().where(Post.id.in_([post_id for post_id, _ in hits])))
+    posts = {row["id"]: dict(row) for row in result.mappings().all()}
+    return [(posts[post_id], score) for post_id, score in hits if post_id in posts]
+
+async def search_posts(db: AsyncSession, query: str, category: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    게시글 전문 검색 함수 (제목/본문/댓글, 관련도순 커서 페이지네이션)
+    반환값: (게시글 dict 목록 - 댓글 수 포함, 다음 페이지 커서 또는 None)
+    """
+    after = decode_rank_cursor(cursor) if cursor else None
+    search = _search_postgres if use_postgres_search() else _search_memory
+    rows = await search(db, query, category, limit + 1, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_rank_cursor(rows[-1][1], rows[-1][0]["id"])
+    return [post for post, _ in rows], next_cursor
+
+async def create_comment(db: AsyncSession, post_id: int, comment: CommentCreate, author_id: int, author_wallet: str, ipfs_hash: str, icp_tx: str):
     """
     댓글 생성 함수
     """
@@ -46,84 +203,173 @@ def create_comment(db: Session, post_id: int, comment: CommentCreate, author_id:
         icp_tx=icp_tx
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    community_cache.invalidate(post_tag(post_id))
+    search_index.comment_saved(db_comment)
     return db_comment
 
-def get_comments(db: Session, post_id: int) -> List[Comment]:
+def _comment_page(comments: List[Comment], limit: int) -> Tuple[List[Comment], Optional[str]]:
+    if len(comments) > limit:
+        comments = comments[:limit]
+        return comments, encode_cursor(comments[-1].created_at, comments[-1].id)
+    return comments, None
+
+async def get_comments(db: AsyncSession, post_id: int, limit: int = COMMENT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Comment], Optional[str]]:
     """
-    댓글 목록 조회 함수
+    댓글 목록 조회 함수 (작성순 키셋 페이지네이션, (post_id, created_at, id) 인덱스 사용)
+    반환값: (댓글 목록, 다음 페이지 커서 또는 None)
     """
-    return db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at).all()
+    query = select(Comment).where(Comment.post_id == post_id)
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor)
+        query = query.where(tuple_(Comment.created_at, Comment.id) > tuple_(created_at, comment_id))
+    result = await db.execute(query.order_by(Comment.created_at, Comment.id).limit(limit + 1))
+    return _comment_page(list(result.scalars().all()), limit)
 
-def update_post(db: Session, post_id: int, data: dict):
+def _first_comment_pages(dialect: str, post_ids: List[int], limit: int):
+    """
+    게시글별로 (post_id, created_at, id) 인덱스를 limit + 1 행까지만 읽는 SELECT
+    PostgreSQL 은 게시글 id 목록에 LATERAL 조인, LATERAL 이 없는 SQLite 등은 게시글별 LIMIT 서브쿼리의 UNION ALL
+    """
+    def page(post_id):
+        return select(Comment).where(Comment.post_id == post_id).order_by(Comment.created_at, Comment.id).limit(limit + 1)
+
+    if dialect == "postgresql":
+        ids = values(column("post_id", Integer), name="ids").data([(post_id,) for post_id in post_ids])
+        pages = page(ids.c.post_id).lateral("first_page")
+        return select(aliased(Comment, pages)).select_from(ids).join(pages, true()), pages
+    pages = union_all(*(select(page(post_id).subquery()) for post_id in post_ids)).subquery("first_page")
+    return select(aliased(Comment, pages)), pages
+
+async def get_comments_for_posts(db: AsyncSession, post_ids: Iterable[int], limit: int = COMMENT_PAGE_SIZE) -> Dict[int, Tuple[List[Comment], Optional[str]]]:
+    """
+    여러 게시글의 첫 댓글 페이지를 한 번의 쿼리로 조회 (게시글마다 limit + 1 개까지만 읽음)
+    반환값: {게시글 id: (댓글 목록, 다음 페이지 커서 또는 None)} - 댓글이 없는 게시글도 포함
+    """
+    grouped: Dict[int, List[Comment]] = {post_id: [] for post_id in post_ids}
+    if not grouped:
+        return {}
+    query, pages = _first_comment_pages(db.bind.dialect.name, list(grouped), limit)
+    result = await db.execute(query.order_by(pages.c.post_id, pages.c.created_at, pages.c.id))
+    for comment in result.scalars().all():
+        grouped[comment.post_id].append(comment)
+    return {post_id: _comment_page(comments, limit) for post_id, comments in grouped.items()}
+
+async def update_post(db: AsyncSession, post_id: int, data: dict):
     """
     게시글 수정 함수
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await db.get(Post, post_id)
     if not post:
         return None
     for key, value in data.items():
         setattr(post, key, value)
-    db.commit()
-    db.refresh(post)
-    return post
+    await db.commit()
+    await db.refresh(post)
+    # 카테고리가 바뀌면 해당 카테고리 피드 첫 페이지에도 반영
+    community_cache.invalidate(post_tag(post_id), *([FEED_HEAD_TAG] if "category" in data else []))
+    search_index.post_saved(post)
+    return await get_post_detail(db, post_id)
 
-def delete_post(db: Session, post_id: int):
+async def delete_post(db: AsyncSession, post_id: int):
     """
     게시글 삭제 함수
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await db.get(Post, post_id)
     if not post:
         return False
-    db.delete(post)
-    db.commit()
+    # 댓글 수와 무관하게 한 문장으로 삭제 (댓글을 메모리로 읽지 않음)
+    await db.execute(delete(Comment).where(Comment.post_id == post_id))
+    await db.delete(post)
+    await db.commit()
+    community_cache.invalidate(post_tag(post_id))
+    search_index.post_deleted(post_id)
     return True
 
-def like_post(db: Session, post_id: int):
+def _with_like_count(value: Dict, kind: str, row_id: int, like_count: int) -> Dict:
     """
-    게시글 좋아요 함수
+    캐시된 게시글 상세/피드 페이지에서 해당 게시글(또는 댓글)의 like_count 만 바꾼 사본
+    동시 좋아요의 응답 순서가 뒤바뀌어도 줄어들지 않도록 큰 값을 유지합니다.
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    def patch(row: Dict) -> Dict:
+        return dict(row, like_count=max(row.get("like_count") or 0, like_count)) if row.get("id") == row_id else row
+    if kind == "comment":
+        return dict(value, comments=[patch(comment) for comment in value["comments"]]) if value.get("comments") else value
+    if "items" in value:
+        return dict(value, items=[patch(post) for post in value["items"]])
+    return patch(value)
+
+async def like_post(db: AsyncSession, post_id: int) -> Optional[int]:
+    """
+    게시글 좋아요 함수 -> 증가 후 like_count (게시글이 없으면 None)
+    DB 에서 like_count = like_count + 1 로 원자적으로 증가시켜 동시 요청에서도 증가분이 유실되지 않고,
+    RETURNING 으로 증가된 값을 같은 왕복에서 돌려받습니다. 캐시된 상세/피드는 무효화하지 않고 like_count 만 갱신합니다.
+    """
+    result = await db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(like_count=Post.like_count + 1)
+        .returning(Post.like_count)
+        .execution_options(synchronize_session=False)
+    )
+    like_count = result.scalar_one_or_none()
+    await db.commit()
+    if like_count is None:
         return None
-    post.like_count += 1
-    db.commit()
-    db.refresh(post)
-    return post
+    community_cache.update(post_tag(post_id), lambda value: _with_like_count(value, "post", post_id, like_count))
+    return like_count
 
-def update_comment(db: Session, comment_id: int, data: dict):
+async def update_comment(db: AsyncSession, comment_id: int, data: dict):
     """
     댓글 수정 함수
     """
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await db.get(Comment, comment_id)
     if not comment:
         return None
     for key, value in data.items():
         setattr(comment, key, value)
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    await db.refresh(comment)
+    community_cache.invalidate(comment_tag(comment_id))
+    search_index.comment_saved(comment)
     return comment
 
-def delete_comment(db: Session, comment_id: int):
+async def delete_comment(db: AsyncSession, comment_id: int):
     """
     댓글 삭제 함수
     """
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await db.get(Comment, comment_id)
     if not comment:
         return False
-    db.delete(comment)
-    db.commit()
+    await db.delete(comment)
+    await db.commit()
+    # 게시글 상세의 댓글 목록과 피드의 댓글 수가 바뀜
+    community_cache.invalidate(comment_tag(comment_id), post_tag(comment.post_id))
+    search_index.comment_deleted(comment_id)
     return True
 
-def like_comment(db: Session, comment_id: int):
+async def get_comment(db: AsyncSession, comment_id: int):
     """
-    댓글 좋아요 함수
+    댓글 단건 조회 함수
     """
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
-    if not comment:
+    return await db.get(Comment, comment_id)
+
+async def like_comment(db: AsyncSession, comment_id: int) -> Optional[Dict]:
+    """
+    댓글 좋아요 함수 (like_post 와 같이 DB 에서 원자적으로 증가, RETURNING 으로 갱신된 댓글을 한 번에 반환)
+    """
+    result = await db.execute(
+        update(Comment)
+        .where(Comment.id == comment_id)
+        .values(like_count=Comment.like_count + 1)
+        .returning(*Comment.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.mappings().first()
+    await db.commit()
+    if row is None:
         return None
-    comment.like_count += 1
-    db.commit()
-    db.refresh(comment)
-    return comment 
\ No newline at end of file
+    comment = dict(row)
+    community_cache.update(comment_tag(comment_id), lambda value: _with_like_count(value, "comment", comment_id, comment["like_count"]))
+    return comment
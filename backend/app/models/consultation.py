@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -7,16 +7,19 @@ class ConsultationBase(BaseModel):
     message: str
 
 class ConsultationCreate(ConsultationBase):
-    pass
+    session_id: Optional[str] = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$")  # 상담 세션 ID (없으면 사용자별 기본 세션)
+    initial_chart: Optional[dict] = None  # 첫 상담 시 사용자 초기 정보
 
 class Consultation(ConsultationBase):
-    id: int
+    id: str                          # uuid4 hex
     created_at: datetime
     ai_response: Optional[str] = None
     swarm_agents_used: List[str] = []
     risk_level: Optional[str] = None
     ipfs_hash: Optional[str] = None  # IPFS 해시
     icp_tx: Optional[str] = None     # ICP 트랜잭션 정보
+    status: str = "pending"          # pending / running / completed / failed
+    owner: Optional[str] = Field(default=None, exclude=True)  # 요청한 사용자(토큰 sub), 응답에는 포함하지 않음
 
     class Config:
         from_attributes = True
@@ -1,8 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func, literal_column
 from sqlalchemy.orm import relationship
+import sqlalchemy.dialects.postgresql  # noqa: F401 - func.to_tsvector 등 전문 검색 함수 타입 등록 (식을 만들기 전에 필요)
 from app.database import Base
 import datetime
 
+# 전문 검색 (PostgreSQL): 검색 쿼리와 인덱스가 같은 식을 써야 GIN 인덱스가 사용됩니다.
+# 한국어 형태소 분석 사전이 없으므로 'simple' 설정(소문자화 + 공백/기호 분리)을 사용합니다.
+SEARCH_TS_CONFIG = literal_column("'simple'::regconfig")
+
+def _weighted_vector(column, weight: str):
+    return func.setweight(func.to_tsvector(SEARCH_TS_CONFIG, column), literal_column(f"'{weight}'"))
+
+def _post_vector(title, content):
+    # 제목(A) 이 본문(B) 보다 높은 가중치
+    return _weighted_vector(title, "A").op("||")(_weighted_vector(content, "B"))
+
+def _comment_vector(content):
+    return func.to_tsvector(SEARCH_TS_CONFIG, content)
+
 class Post(Base):
     __tablename__ = "posts"
     id = Column(Integer, primary_key=True, index=True)
@@ -16,7 +31,16 @@ class Post(Base):
     ipfs_hash = Column(String(100), nullable=True)
     icp_tx = Column(String(100), nullable=True)
     like_count = Column(Integer, default=0)
-    comments = relationship("Comment", back_populates="post")
+    # 댓글은 수만 개까지 늘 수 있으므로 암묵적으로 로드하지 않음 (crud 의 get_comments 로 페이지 단위 조회)
+    comments = relationship("Comment", back_populates="post", lazy="raise")
+
+    __table_args__ = (
+        # 피드 키셋 페이지네이션 (created_at DESC, id DESC) 용 복합 인덱스
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # 카테고리별 피드 (category = ? ORDER BY created_at DESC, id DESC)
+        Index("ix_posts_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_posts_search", _post_vector(title, content), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -30,4 +54,13 @@ class Comment(Base):
     ipfs_hash = Column(String(100), nullable=True)
     icp_tx = Column(String(100), nullable=True)
     like_count = Column(Integer, default=0)
-    post = relationship("Post", back_populates="comments") 
\ No newline at end of file
+    post = relationship("Post", back_populates="comments")
+
+    __table_args__ = (
+        # 게시글별 댓글 페이지 (post_id = ? ORDER BY created_at, id) 및 댓글 수 집계
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+        Index("ix_comments_search", _comment_vector(content), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+post_search_vector = _post_vector(Post.title, Post.content)
+comment_search_vector = _comment_vector(Comment.content) 
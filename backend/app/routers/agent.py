@@ -1,20 +1,82 @@
 # 에이전트 라우터
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.models.consultation import Consultation, ConsultationCreate
 from app.core.ipfs import upload_to_ipfs
 from app.core.icp import upload_to_icp
 from app.core.logging import log_user_action
+from app.core.auth import get_current_user
+from app.core.counselor import session_id_for, stream_counselor_reply, run_counseling_turn
+from app.core.agent_queue import get_job_queue, QueueFullError
 from datetime import datetime
+from functools import partial
+from typing import Dict
+import asyncio
+import json
+import threading
+import time
+import uuid
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
-consultations = []
+# 상담 ID -> 상담 기록 (ID 는 추측할 수 없는 uuid4)
+consultations: Dict[str, Consultation] = {}
 
-@router.post("/ask", response_model=Consultation)
-def ask_agent(consult: ConsultationCreate):
+# 요청 본문의 user_id -> 처음 사용한 사용자(토큰 sub)
+# 토큰에는 숫자 user_id 가 없으므로 최초 사용 시 호출자에게 묶고, 이후 다른 사용자가 보내면 거절합니다.
+_user_id_owners: Dict[int, str] = {}
+_user_id_owners_lock = threading.Lock()
+
+def _new_consultation_id() -> str:
+    return uuid.uuid4().hex
+
+def _session_for(consult: ConsultationCreate, current_user: dict) -> str:
+    """
+    호출자 기준 상담 세션 키 (본문의 user_id 가 다른 사용자의 것이면 403)
+    """
+    with _user_id_owners_lock:
+        owner = _user_id_owners.setdefault(consult.user_id, current_user["id"])
+    if owner != current_user["id"]:
+        log_user_action("consultation_forbidden", wallet_address="unknown", details={"user_id": consult.user_id})
+        raise HTTPException(status_code=403, detail="다른 사용자의 user_id 로 상담할 수 없습니다.")
+    return session_id_for(current_user["id"], consult.session_id)
+
+def _run_job(job):
+    """
+    작업 큐 워커에서 실행되는 핸들러 (작업은 인자 없는 호출 가능 객체)
+    """
+    job()
+
+def _process_consultation(consultation: Consultation, session_id: str, initial_chart: dict = None):
     """
-    상담 요청: 사용자의 질문을 IPFS/ICP에 기록하고 모든 주요 단계에 로그를 남김
+    워커 스레드에서 상담 파이프라인을 실행하고 결과를 상담 기록에 채움
     """
+    consultation.status = "running"
+    try:
+        result = run_counseling_turn(session_id, consultation.message, initial_chart)
+        consultation.ai_response = result["ai_response"]
+        consultation.swarm_agents_used = result["swarm_agents_used"]
+        consultation.risk_level = result["risk_level"]
+        consultation.status = "completed"
+        log_user_action("consultation_completed", wallet_address="unknown", details={"consultation_id": consultation.id, "risk_level": consultation.risk_level})
+    except Exception as e:
+        consultation.status = "failed"
+        log_user_action("consultation_error", wallet_address="unknown", details={"consultation_id": consultation.id, "error": str(e)})
+        raise
+
+@router.post("/ask", response_model=Consultation, status_code=202)
+def ask_agent(consult: ConsultationCreate, current_user: dict = Depends(get_current_user)):
+    """
+    상담 요청: 사용자의 질문을 IPFS/ICP에 기록하고 상담 작업을 대기열에 넣은 뒤 즉시 반환
+    결과는 같은 사용자가 GET /agent/consultations/{id} 로 조회합니다. 대기열이 가득 차면 503 을 반환합니다.
+    상담 세션은 인증된 사용자 기준이며, 다른 사용자가 먼저 사용한 user_id 를 보내면 403 을 반환합니다.
+    """
+    session_id = _session_for(consult, current_user)
+    job_queue = get_job_queue(_run_job)
+    # 대기열이 가득 차 있으면 IPFS/ICP 기록 전에 바로 거절
+    if job_queue.depth() >= job_queue.stats()["capacity"]:
+        log_user_action("consultation_rejected", wallet_address="unknown", details={"user_id": consult.user_id})
+        raise HTTPException(status_code=503, detail="상담 요청이 많아 잠시 후 다시 시도해 주세요.", headers={"Retry-After": "5"})
     try:
         log_user_action("consultation_request", wallet_address="unknown", details={"user_id": consult.user_id, "message": consult.message})
         ipfs_hash = upload_to_ipfs(consult.dict())
@@ -22,19 +84,135 @@ def ask_agent(consult: ConsultationCreate):
         icp_tx = upload_to_icp(ipfs_hash)
         log_user_action("icp_upload", wallet_address="unknown", details={"icp_tx": icp_tx})
         new_consult = Consultation(
-            id=len(consultations)+1,
+            id=_new_consultation_id(),
             user_id=consult.user_id,
             message=consult.message,
             created_at=datetime.utcnow(),
-            ai_response=None,  # AI 응답 없음
+            ai_response=None,  # 워커가 채움
             swarm_agents_used=[],
             risk_level=None,
             ipfs_hash=ipfs_hash,
-            icp_tx=icp_tx
+            icp_tx=icp_tx,
+            owner=current_user["id"],
         )
-        consultations.append(new_consult)
+        consultations[new_consult.id] = new_consult
+        try:
+            job_queue.submit(partial(_process_consultation, new_consult, session_id, consult.initial_chart), key=session_id)
+        except QueueFullError:
+            del consultations[new_consult.id]
+            raise
         log_user_action("consultation_saved", wallet_address="unknown", details={"consultation_id": new_consult.id})
         return new_consult
+    except QueueFullError:
+        log_user_action("consultation_rejected", wallet_address="unknown", details={"user_id": consult.user_id})
+        raise HTTPException(status_code=503, detail="상담 요청이 많아 잠시 후 다시 시도해 주세요.", headers={"Retry-After": "5"})
     except Exception as e:
         log_user_action("consultation_error", wallet_address="unknown", details={"error": str(e)})
-        raise HTTPException(status_code=500, detail=f"상담 요청 처리 중 오류 발생: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"상담 요청 처리 중 오류 발생: {str(e)}")
+
+@router.get("/consultations/{consultation_id}", response_model=Consultation)
+async def get_consultation(consultation_id: str, wait: float = Query(0, ge=0, le=30), current_user: dict = Depends(get_current_user)):
+    """
+    상담 결과 조회: wait 초 동안 완료를 기다리는 롱폴링 지원
+    다른 사용자의 상담은 존재 여부도 드러나지 않도록 404 로 응답합니다.
+    """
+    consultation = consultations.get(consultation_id)
+    if consultation is None or consultation.owner != current_user["id"]:
+        raise HTTPException(status_code=404, detail="해당 상담을 찾을 수 없습니다.")
+    deadline = time.monotonic() + wait
+    while consultation.status in ("pending", "running") and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+    return consultation
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class _StreamRelay:
+    """
+    작업 큐 워커에서 생성한 상담 응답 청크를 이벤트 루프의 SSE 응답으로 전달
+    클라이언트 연결이 끊기면 cancel() 로 알려, 워커가 다음 청크에서 생성을 멈추고 세션을 놓습니다.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._events: "asyncio.Queue" = asyncio.Queue()
+        self.cancelled = False
+
+    def _send(self, kind: str, value=None):
+        try:
+            self._loop.call_soon_threadsafe(self._events.put_nowait, (kind, value))
+        except RuntimeError:
+            # 이벤트 루프가 이미 닫힘 (서버 종료 중)
+            self.cancelled = True
+
+    def run(self, session_id: str, message: str, initial_chart: dict = None):
+        """
+        워커 스레드에서 실행: 청크마다 이벤트 루프로 전달하고 끝나면 end, 실패하면 error 전달
+        """
+        chunks = stream_counselor_reply(session_id, message, initial_chart)
+        try:
+            for chunk in chunks:
+                if self.cancelled:
+                    return
+                self._send("chunk", chunk)
+            self._send("end")
+        except Exception as e:
+            self._send("error", e)
+            raise
+        finally:
+            chunks.close()
+
+    async def get(self):
+        return await self._events.get()
+
+    def cancel(self):
+        self.cancelled = True
+
+@router.post("/ask/stream")
+async def ask_agent_stream(consult: ConsultationCreate, current_user: dict = Depends(get_current_user)):
+    """
+    상담 요청(스트리밍): 상담사 응답을 Server-Sent Events 로 토큰 단위 전송
+    파이프라인은 /agent/ask 와 같은 작업 큐 워커에서 실행되므로 대기열이 가득 차면 503 을 반환합니다.
+    스트림이 끝난 뒤에만 상담 기록이 저장됩니다.
+    """
+    session_id = _session_for(consult, current_user)
+    log_user_action("consultation_stream_request", wallet_address="unknown", details={"user_id": consult.user_id, "session_id": session_id})
+    relay = _StreamRelay(asyncio.get_running_loop())
+    try:
+        get_job_queue(_run_job).submit(partial(relay.run, session_id, consult.message, consult.initial_chart), key=session_id)
+    except QueueFullError:
+        log_user_action("consultation_rejected", wallet_address="unknown", details={"user_id": consult.user_id})
+        raise HTTPException(status_code=503, detail="상담 요청이 많아 잠시 후 다시 시도해 주세요.", headers={"Retry-After": "5"})
+
+    async def event_stream():
+        chunks = []
+        try:
+            while True:
+                kind, value = await relay.get()
+                if kind == "chunk":
+                    chunks.append(value)
+                    yield _sse("message", {"delta": value})
+                elif kind == "error":
+                    log_user_action("consultation_stream_error", wallet_address="unknown", details={"error": str(value)})
+                    yield _sse("error", {"detail": f"상담 응답 스트리밍 중 오류 발생: {str(value)}"})
+                    return
+                else:
+                    break
+            new_consult = Consultation(
+                id=_new_consultation_id(),
+                user_id=consult.user_id,
+                message=consult.message,
+                created_at=datetime.utcnow(),
+                ai_response="".join(chunks),
+                swarm_agents_used=[],
+                risk_level=None,
+                status="completed",
+                owner=current_user["id"],
+            )
+            consultations[new_consult.id] = new_consult
+            log_user_action("consultation_stream_saved", wallet_address="unknown", details={"consultation_id": new_consult.id})
+            yield _sse("done", {"consultation_id": new_consult.id})
+        finally:
+            relay.cancel()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,28 +1,44 @@
 # 커뮤니티 라우터
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.schemas.community import PostCreate, PostResponse, CommentCreate, CommentResponse
-from app.crud.community import create_post, get_post, get_posts, create_comment, get_comments, update_post, delete_post, like_post, update_comment, delete_comment, like_comment
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.schemas.community import PostCreate, PostResponse, PostPage, CommentCreate, CommentResponse, CommentPage, PostCommentPage
+from app.crud.community import COMMENT_PAGE_SIZE, COMMENT_PAGE_SIZE_MAX, create_post, get_post_cached, get_posts_cached, search_posts, create_comment, get_comments, get_comments_for_posts, get_comment, update_post, delete_post, like_post, update_comment, delete_comment, like_comment
 from app.core.ipfs import upload_to_ipfs
 from app.core.icp import upload_to_icp
 from app.core.logging import log_user_action
-from typing import List
+from app.core.like_buffer import get_like_buffer
+from typing import List, Optional
 from app.core.auth import get_current_user
 
 router = APIRouter(prefix="/community", tags=["community"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _with_pending_likes(rows, kind: str):
+    """
+    좋아요 버퍼 사용 시 아직 반영되지 않은 증가분을 조회 결과에 더함
+    """
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        for row in rows:
+            like_buffer.apply_pending(row, kind)
+    return rows
+
+def _post_with_pending_likes(post: dict) -> dict:
+    """
+    게시글 dict 에 미반영 좋아요 증가분을 더한 사본 (캐시 값은 수정하지 않음)
+    """
+    like_buffer = get_like_buffer()
+    if like_buffer is None:
+        return post
+    post = like_buffer.apply_pending(dict(post), "post")
+    if "comments" in post:
+        post["comments"] = [like_buffer.apply_pending(dict(comment), "comment") for comment in post["comments"] or []]
+    return post
 
 @router.post("/posts", response_model=PostResponse)
-def create_community_post(
+async def create_community_post(
     post: PostCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         log_user_action("community_post_create", wallet_address="unknown", details={"title": post.title, "content": post.content})
@@ -36,7 +52,7 @@ def create_community_post(
             icp_tx = upload_to_icp(ipfs_hash)
         except Exception:
             icp_tx = None
-        db_post = create_post(db, post, author_id, author_wallet, ipfs_hash, icp_tx)
+        db_post = await create_post(db, post, author_id, author_wallet, ipfs_hash, icp_tx)
         log_user_action("community_post_saved", wallet_address="unknown", details={"post_id": db_post.id})
         return db_post
     except Exception as e:
@@ -44,26 +60,53 @@ def create_community_post(
         raise HTTPException(status_code=500, detail=f"게시글 생성 중 오류 발생: {str(e)}")
 
 @router.get("/posts/{post_id}", response_model=PostResponse)
-def read_post(post_id: int, db: Session = Depends(get_db)):
-    db_post = get_post(db, post_id)
+async def read_post(post_id: int, db: AsyncSession = Depends(get_db)):
+    db_post = await get_post_cached(db, post_id)
     if not db_post:
         log_user_action("community_post_not_found", wallet_address="unknown", details={"post_id": post_id})
         raise HTTPException(status_code=404, detail="해당 게시글을 찾을 수 없습니다.")
     log_user_action("community_post_read", wallet_address="unknown", details={"post_id": post_id})
-    return db_post
+    return _post_with_pending_likes(db_post)
 
-@router.get("/posts", response_model=List[PostResponse])
-def list_posts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/posts", response_model=PostPage)
+async def list_posts(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    category: Optional[str] = Query(None, description="카테고리 필터"),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        posts = get_posts(db, skip=skip, limit=limit)
-        log_user_action("community_post_list", wallet_address="unknown", details={"count": len(posts)})
-        return posts
+        page = await get_posts_cached(db, limit=limit, cursor=cursor, category=category)
+        posts = [_post_with_pending_likes(post) for post in page["items"]]
+        log_user_action("community_post_list", wallet_address="unknown", details={"category": category, "count": len(posts)})
+        return {"items": posts, "next_cursor": page["next_cursor"]}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         log_user_action("community_post_list_error", wallet_address="unknown", details={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"게시글 목록 조회 중 오류 발생: {str(e)}")
 
+@router.get("/search", response_model=PostPage)
+async def search_community_posts(
+    q: str = Query(..., min_length=1, max_length=200, description="검색어 (제목, 본문, 댓글)"),
+    category: Optional[str] = Query(None, description="카테고리 필터"),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        posts, next_cursor = await search_posts(db, q, category=category, limit=limit, cursor=cursor)
+        posts = [_post_with_pending_likes(post) for post in posts]
+        log_user_action("community_search", wallet_address="unknown", details={"query": q, "category": category, "count": len(posts)})
+        return {"items": posts, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log_user_action("community_search_error", wallet_address="unknown", details={"error": str(e)})
+        raise HTTPException(status_code=500, detail=f"게시글 검색 중 오류 발생: {str(e)}")
+
 @router.post("/posts/{post_id}/comments", response_model=CommentResponse)
-def create_post_comment(post_id: int, comment: CommentCreate, db: Session = Depends(get_db)):
+async def create_post_comment(post_id: int, comment: CommentCreate, db: AsyncSession = Depends(get_db)):
     try:
         log_user_action("community_comment_create", wallet_address="unknown", details={"post_id": post_id, "content": comment.content})
         author_id = 1
@@ -76,35 +119,69 @@ def create_post_comment(post_id: int, comment: CommentCreate, db: Session = Depe
             icp_tx = upload_to_icp(ipfs_hash)
         except Exception:
             icp_tx = None
-        db_comment = create_comment(db, post_id, comment, author_id, author_wallet, ipfs_hash, icp_tx)
+        db_comment = await create_comment(db, post_id, comment, author_id, author_wallet, ipfs_hash, icp_tx)
         log_user_action("community_comment_saved", wallet_address="unknown", details={"comment_id": db_comment.id})
         return db_comment
     except Exception as e:
         log_user_action("community_comment_error", wallet_address="unknown", details={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"댓글 생성 중 오류 발생: {str(e)}")
 
-@router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
-def list_post_comments(post_id: int, db: Session = Depends(get_db)):
+@router.get("/posts/{post_id}/comments", response_model=CommentPage)
+async def list_post_comments(
+    post_id: int,
+    limit: int = Query(COMMENT_PAGE_SIZE, ge=1, le=COMMENT_PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor (또는 게시글 상세의 comments_next_cursor)"),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        comments = get_comments(db, post_id)
+        comments, next_cursor = await get_comments(db, post_id, limit=limit, cursor=cursor)
+        comments = _with_pending_likes(comments, "comment")
         log_user_action("community_comment_list", wallet_address="unknown", details={"post_id": post_id, "count": len(comments)})
-        return comments
+        return {"items": comments, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         log_user_action("community_comment_list_error", wallet_address="unknown", details={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"댓글 목록 조회 중 오류 발생: {str(e)}")
 
+# 배치 조회 시 한 번에 요청할 수 있는 최대 게시글 수
+COMMENT_BATCH_MAX_POSTS = 100
+
+@router.get("/comments", response_model=List[PostCommentPage])
+async def list_comments_for_posts(
+    post_ids: List[int] = Query(..., description="게시글 id 목록 (예: ?post_ids=1&post_ids=2)"),
+    limit: int = Query(5, ge=1, le=COMMENT_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    여러 게시글의 첫 댓글 페이지를 한 번의 쿼리로 조회 (요청한 순서대로, 이후 페이지는 next_cursor 로 게시글별 조회)
+    """
+    post_ids = list(dict.fromkeys(post_ids))
+    if len(post_ids) > COMMENT_BATCH_MAX_POSTS:
+        raise HTTPException(status_code=400, detail=f"게시글은 한 번에 최대 {COMMENT_BATCH_MAX_POSTS}개까지 조회할 수 있습니다.")
+    try:
+        pages = await get_comments_for_posts(db, post_ids, limit=limit)
+        log_user_action("community_comment_batch", wallet_address="unknown", details={"post_count": len(post_ids)})
+        return [
+            {"post_id": post_id, "items": _with_pending_likes(comments, "comment"), "next_cursor": next_cursor}
+            for post_id, (comments, next_cursor) in pages.items()
+        ]
+    except Exception as e:
+        log_user_action("community_comment_batch_error", wallet_address="unknown", details={"error": str(e)})
+        raise HTTPException(status_code=500, detail=f"댓글 일괄 조회 중 오류 발생: {str(e)}")
+
 @router.put("/posts/{post_id}", response_model=PostResponse)
-def update_community_post(post_id: int, data: dict = Body(...), db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    post = update_post(db, post_id, data)
+async def update_community_post(post_id: int, data: dict = Body(...), db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    post = await update_post(db, post_id, data)
     if not post:
         log_user_action("community_post_update_not_found", wallet_address="unknown", details={"post_id": post_id})
         raise HTTPException(status_code=404, detail="해당 게시글을 찾을 수 없습니다.")
     log_user_action("community_post_updated", wallet_address="unknown", details={"post_id": post_id})
-    return post
+    return _post_with_pending_likes(post)
 
 @router.delete("/posts/{post_id}")
-def delete_community_post(post_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    result = delete_post(db, post_id)
+async def delete_community_post(post_id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    result = await delete_post(db, post_id)
     if not result:
         log_user_action("community_post_delete_not_found", wallet_address="unknown", details={"post_id": post_id})
         raise HTTPException(status_code=404, detail="해당 게시글을 찾을 수 없습니다.")
@@ -112,17 +189,29 @@ def delete_community_post(post_id: int, db: Session = Depends(get_db), current_u
     return {"result": "success"}
 
 @router.post("/posts/{post_id}/like", response_model=PostResponse)
-def like_community_post(post_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    post = like_post(db, post_id)
+async def like_community_post(post_id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        # 버퍼 모드: 증가분만 기록하고 주기적으로 일괄 반영
+        post = await get_post_cached(db, post_id)
+        if post:
+            like_buffer.add("post", post_id)
+    else:
+        # UPDATE ... RETURNING 으로 존재 확인과 증가를 한 번에 하고, 응답 본문은 like_count 가 갱신된 캐시 상세를 사용
+        # (캐시 적중 시 DB 왕복은 UPDATE 한 번)
+        like_count = await like_post(db, post_id)
+        post = await get_post_cached(db, post_id) if like_count is not None else None
+        if post:
+            post = dict(post, like_count=like_count)
     if not post:
         log_user_action("community_post_like_not_found", wallet_address="unknown", details={"post_id": post_id})
         raise HTTPException(status_code=404, detail="해당 게시글을 찾을 수 없습니다.")
     log_user_action("community_post_liked", wallet_address="unknown", details={"post_id": post_id})
-    return post
+    return _post_with_pending_likes(post)
 
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
-def update_post_comment(comment_id: int, data: dict = Body(...), db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    comment = update_comment(db, comment_id, data)
+async def update_post_comment(comment_id: int, data: dict = Body(...), db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    comment = await update_comment(db, comment_id, data)
     if not comment:
         log_user_action("community_comment_update_not_found", wallet_address="unknown", details={"comment_id": comment_id})
         raise HTTPException(status_code=404, detail="해당 댓글을 찾을 수 없습니다.")
@@ -130,8 +219,8 @@ def update_post_comment(comment_id: int, data: dict = Body(...), db: Session = D
     return comment
 
 @router.delete("/comments/{comment_id}")
-def delete_post_comment(comment_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    result = delete_comment(db, comment_id)
+async def delete_post_comment(comment_id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    result = await delete_comment(db, comment_id)
     if not result:
         log_user_action("community_comment_delete_not_found", wallet_address="unknown", details={"comment_id": comment_id})
         raise HTTPException(status_code=404, detail="해당 댓글을 찾을 수 없습니다.")
@@ -139,8 +228,15 @@ def delete_post_comment(comment_id: int, db: Session = Depends(get_db), current_
     return {"result": "success"}
 
 @router.post("/comments/{comment_id}/like", response_model=CommentResponse)
-def like_post_comment(comment_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    comment = like_comment(db, comment_id)
+async def like_post_comment(comment_id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        comment = await get_comment(db, comment_id)
+        if comment:
+            like_buffer.add("comment", comment_id)
+            like_buffer.apply_pending(comment, "comment")
+    else:
+        comment = await like_comment(db, comment_id)
     if not comment:
         log_user_action("community_comment_like_not_found", wallet_address="unknown", details={"comment_id": comment_id})
         raise HTTPException(status_code=404, detail="해당 댓글을 찾을 수 없습니다.")
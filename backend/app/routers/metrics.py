@@ -0,0 +1,37 @@
+# 메트릭 라우터
+from fastapi import APIRouter, Depends
+from app.core.auth import get_current_user
+from app.core.counselor import counselor_metrics, counselor_traces
+from app.core.agent_queue import job_queue_stats
+from app.core.logging import log_pipeline
+from app.core.like_buffer import get_like_buffer
+from app.core.cache import community_cache
+from app.core.search import search_index
+from app.database import pool_stats
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    상담 파이프라인 단계별 지연(라우터, 전문가 호출, 프롬프트 조립, 최종 생성, 기록 저장), 작업 큐 및 로그 파이프라인 상태 조회
+    집계값만 반환하며 세션별 정보는 포함하지 않습니다.
+    """
+    like_buffer = get_like_buffer()
+    return {
+        "counselor": counselor_metrics(),
+        "agent_queue": job_queue_stats(),
+        "log_pipeline": log_pipeline.stats(),
+        "like_buffer": like_buffer.stats() if like_buffer else None,
+        "community_cache": community_cache.stats(),
+        "db_pool": pool_stats(),
+        "search_index": search_index.stats(),
+    }
+
+@router.get("/metrics/traces")
+def get_my_traces(current_user: dict = Depends(get_current_user)):
+    """
+    로그인한 사용자 본인 상담 세션의 최근 요청별 트레이스(단계별 span) 조회
+    트레이스에는 세션 키와 상담한 전문가가 포함되므로 다른 사용자의 트레이스는 반환하지 않습니다.
+    """
+    return {"recent_traces": counselor_traces(current_user["id"])}
@@ -18,7 +18,9 @@ class PostResponse(PostBase):
     updated_at: datetime
     ipfs_hash: Optional[str]
     icp_tx: Optional[str]
-    comments: Optional[List['CommentResponse']] = []
+    comments: Optional[List['CommentResponse']] = []  # 첫 페이지 (COMMENT_PAGE_SIZE 개까지)
+    comments_next_cursor: Optional[str] = None  # 다음 댓글 페이지 커서 (/posts/{post_id}/comments?cursor=)
+    comment_count: int = 0
     like_count: int
 
     class Config:
@@ -44,4 +46,32 @@ class CommentResponse(CommentBase):
     class Config:
         orm_mode = True
 
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
+class PostCommentPage(CommentPage):
+    post_id: int
+
+class PostSummary(PostBase):
+    """
+    피드/검색 목록용 게시글 (댓글 목록 대신 댓글 수만 포함)
+    """
+    id: int
+    author_id: Optional[int]
+    author_wallet: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    ipfs_hash: Optional[str]
+    icp_tx: Optional[str]
+    like_count: int
+    comment_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+class PostPage(BaseModel):
+    items: List[PostSummary]
+    next_cursor: Optional[str] = None  # 다음 페이지 요청 시 cursor 로 전달 (마지막 페이지면 None)
+
 PostResponse.update_forward_refs() 
\ No newline at end of file
@@ -1,7 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import community, auth, chat, anonymous_note, agent
+from app.routers import community, auth, chat, anonymous_note, agent, metrics
+from app.core.like_buffer import get_like_buffer
+from app.database import engine
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 종료 시 남은 좋아요 증가분을 반영하고 커넥션 풀 정리
+    like_buffer = get_like_buffer()
+    if like_buffer is not None:
+        await like_buffer.close()
+    await engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 # 각 도메인별 라우터 등록
 app.include_router(community.router)
@@ -9,6 +21,7 @@ app.include_router(auth.router)
 app.include_router(chat.router)
 app.include_router(anonymous_note.router)
 app.include_router(agent.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
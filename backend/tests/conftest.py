@@ -0,0 +1,102 @@
+# 테스트 공통 설정: 외부 DB/Gemini 없이 app 패키지와 상담 모델(model/)을 로드
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODEL_DIR = os.path.abspath(os.path.join(BACKEND_DIR, "..", "model"))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, MODEL_DIR)
+
+# app.database 가 import 시점에 엔진을 만들므로 import 전에 설정
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='motiv-test-'), 'test.db')}")
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+@pytest.fixture
+def counselor(monkeypatch):
+    """
+    Gemini 호출을 benchmark.py 의 결정적 스텁으로 대체한 상담 모델 모듈
+    """
+    import google.generativeai as genai
+    from benchmark import StubGenerativeModel
+    from concurrency import TokenBucket
+    from resilience import GeminiCallGuard
+    from app.core.counselor import get_counselor
+
+    monkeypatch.setattr(genai, "GenerativeModel", StubGenerativeModel)
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    StubGenerativeModel.reset(latency_mean=0, response_chars=120, error_rate=0.0)
+    module = get_counselor()
+    module.model_pool.clear()
+    module.report_cache.clear()
+    monkeypatch.setattr(module, "_gemini_rate_limiter", TokenBucket(0))
+    # 테스트마다 새 가드 (재시도 대기 없이, 이전 테스트의 회로 차단 상태가 남지 않도록)
+    monkeypatch.setattr(module, "_gemini_guard", GeminiCallGuard(max_retries=0))
+    yield module
+    StubGenerativeModel.reset(error_rate=0.0)
+
+@pytest.fixture
+def current_user():
+    """
+    인증된 사용자 (테스트에서 id 를 바꿔 다른 사용자로 요청 가능)
+    """
+    return {"id": "0xtester", "wallet_address": "0xtester"}
+
+@pytest.fixture
+def agent_client(counselor, current_user):
+    from app.core.auth import get_current_user
+    from app.routers import agent
+
+    app = FastAPI()
+    app.include_router(agent.router)
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def community_client(current_user):
+    """
+    빈 테이블로 시작하는 커뮤니티 API 클라이언트 (httpx.AsyncClient)
+    """
+    from app.core.auth import get_current_user
+    from app.core.cache import community_cache
+    from app.database import Base, engine
+    from app.routers import community
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    community_cache.clear()
+    app = FastAPI()
+    app.include_router(community.router)
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    # 커넥션이 테스트마다 다른 이벤트 루프에 묶이지 않도록 풀 정리
+    await engine.dispose()
+
+@pytest.fixture
+def sql_statements():
+    """
+    실행된 SQL 문 목록 (쿼리 수 검증용)
+    """
+    from app.database import engine
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,87 @@
+# /agent/ask 상담 요청과 결과 조회 테스트
+import pytest
+
+from app.routers import agent
+
+@pytest.fixture
+def idle_queue(monkeypatch):
+    """
+    워커를 띄우지 않는 작업 큐 (상담이 pending 상태로 남음)
+    """
+    class IdleQueue:
+        def depth(self):
+            return 0
+        def stats(self):
+            return {"capacity": 100}
+        def submit(self, job, key):
+            pass
+    monkeypatch.setattr(agent, "get_job_queue", lambda handler: IdleQueue())
+
+def test_consultation_requires_authentication(counselor):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.include_router(agent.router)
+    client = TestClient(app)
+    assert client.post("/agent/ask", json={"user_id": 1, "message": "hi"}).status_code == 401
+    assert client.get("/agent/consultations/unknown").status_code == 401
+
+def test_consultation_is_visible_only_to_its_owner(agent_client, current_user, idle_queue):
+    created = agent_client.post("/agent/ask", json={"user_id": 201, "message": "hi"})
+    assert created.status_code == 202
+    consultation_id = created.json()["id"]
+    assert "owner" not in created.json()
+
+    assert agent_client.get(f"/agent/consultations/{consultation_id}").json()["id"] == consultation_id
+    current_user["id"] = "0xsomeone-else"
+    assert agent_client.get(f"/agent/consultations/{consultation_id}").status_code == 404
+
+def test_rejected_request_does_not_shift_other_consultations(agent_client, monkeypatch):
+    from app.core.agent_queue import QueueFullError
+
+    class FlakyQueue:
+        def __init__(self):
+            self.calls = 0
+        def depth(self):
+            return 0
+        def stats(self):
+            return {"capacity": 100}
+        def submit(self, job, key):
+            self.calls += 1
+            if self.calls == 2:
+                raise QueueFullError("full")
+    job_queue = FlakyQueue()
+    monkeypatch.setattr(agent, "get_job_queue", lambda handler: job_queue)
+
+    first = agent_client.post("/agent/ask", json={"user_id": 202, "message": "first"}).json()
+    assert agent_client.post("/agent/ask", json={"user_id": 202, "message": "rejected"}).status_code == 503
+    third = agent_client.post("/agent/ask", json={"user_id": 202, "message": "third"}).json()
+
+    assert first["id"] != third["id"]
+    assert agent_client.get(f"/agent/consultations/{first['id']}").json()["message"] == "first"
+    assert agent_client.get(f"/agent/consultations/{third['id']}").json()["message"] == "third"
+
+def test_session_is_keyed_by_the_caller_not_the_body(agent_client, current_user, monkeypatch):
+    submitted = []
+
+    class RecordingQueue:
+        def depth(self):
+            return 0
+        def stats(self):
+            return {"capacity": 100}
+        def submit(self, job, key):
+            submitted.append(key)
+    monkeypatch.setattr(agent, "get_job_queue", lambda handler: RecordingQueue())
+
+    current_user["id"] = "0xvictim"
+    assert agent_client.post("/agent/ask", json={"user_id": 301, "message": "mine"}).status_code == 202
+    current_user["id"] = "0xattacker"
+    # 다른 사용자의 user_id 는 거절
+    assert agent_client.post("/agent/ask", json={"user_id": 301, "message": "theirs"}).status_code == 403
+    # 자기 user_id 로 같은 session_id 를 보내도 피해자의 세션과는 다른 키
+    assert agent_client.post("/agent/ask", json={"user_id": 302, "session_id": "default", "message": "x"}).status_code == 202
+    # 세션 ID 에 구분자를 넣어 키를 위조할 수 없음
+    assert agent_client.post("/agent/ask", json={"user_id": 302, "session_id": "a#b", "message": "x"}).status_code == 422
+
+    assert submitted == ["user_0xvictim#default", "user_0xattacker#default"]
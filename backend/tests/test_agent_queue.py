@@ -0,0 +1,81 @@
+# 세션별 FIFO 상담 작업 큐 테스트
+import threading
+import time
+
+import pytest
+
+from app.core.agent_queue import ConsultationJobQueue, QueueFullError
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "시간 초과"
+        time.sleep(0.01)
+
+class _Recorder:
+    """
+    세션별 실행 순서와 동시 실행 여부를 기록하는 핸들러 (gates 의 작업은 Event 가 설정될 때까지 대기)
+    """
+
+    def __init__(self, gates=None):
+        self.gates = gates or {}
+        self.done = []
+        self.running = set()
+        self.overlap = False
+        self._lock = threading.Lock()
+
+    def __call__(self, job):
+        session, name = job
+        with self._lock:
+            self.overlap |= session in self.running
+            self.running.add(session)
+        if name in self.gates:
+            self.gates[name].wait(5)
+        with self._lock:
+            self.running.discard(session)
+            self.done.append(name)
+
+def test_busy_session_does_not_block_other_sessions():
+    gate = threading.Event()
+    handler = _Recorder({"a1": gate})
+    job_queue = ConsultationJobQueue(handler, workers=2)
+    for name in ("a1", "a2", "a3"):
+        job_queue.submit(("a", name), key="a")
+    job_queue.submit(("b", "b1"), key="b")
+
+    # a1 이 워커 하나를 점유하는 동안 a2/a3 가 두 번째 워커를 막지 않고 b1 이 먼저 끝남
+    _wait_until(lambda: "b1" in handler.done)
+    assert handler.done == ["b1"]
+    gate.set()
+    _wait_until(lambda: len(handler.done) == 4)
+
+    assert [name for name in handler.done if name.startswith("a")] == ["a1", "a2", "a3"]
+    assert not handler.overlap
+    assert job_queue.stats()["completed"] == 4 and job_queue.stats()["sessions"] == 0
+
+def test_failed_job_does_not_stall_its_session():
+    def handler(job):
+        if job == "boom":
+            raise RuntimeError(job)
+        done.append(job)
+    done = []
+    job_queue = ConsultationJobQueue(handler, workers=1)
+    for job in ("boom", "after"):
+        job_queue.submit(job, key="s")
+
+    _wait_until(lambda: done == ["after"])
+    assert job_queue.stats()["failed"] == 1
+
+def test_capacity_counts_jobs_across_sessions():
+    gate = threading.Event()
+    job_queue = ConsultationJobQueue(_Recorder({"a1": gate}), workers=1, max_pending=2)
+    try:
+        job_queue.submit(("a", "a1"), key="a")
+        _wait_until(lambda: job_queue.depth() == 0)
+        job_queue.submit(("a", "a2"), key="a")
+        job_queue.submit(("b", "b1"), key="b")
+        with pytest.raises(QueueFullError):
+            job_queue.submit(("c", "c1"), key="c")
+        assert job_queue.stats()["rejected"] == 1
+    finally:
+        gate.set()
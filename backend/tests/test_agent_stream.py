@@ -0,0 +1,96 @@
+# /agent/ask/stream 스트리밍 상담 테스트
+import json
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_stream_sends_chunks_then_saves_consultation(agent_client, counselor):
+    chart = {"Main Conflict Source": "money"}
+    response = agent_client.post("/agent/ask/stream", json={"user_id": 101, "session_id": "first", "message": "hello", "initial_chart": chart})
+
+    assert response.status_code == 200
+    events = _events(response.text)
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done", events[-1]
+    assert set(kinds[:-1]) == {"message"}
+    reply = "".join(data["delta"] for kind, data in events if kind == "message")
+    assert reply == "x" * 120
+
+    consultation = agent_client.get(f"/agent/consultations/{events[-1][1]['consultation_id']}").json()
+    assert consultation["ai_response"] == reply
+
+def test_stream_follow_up_turn_records_trace(agent_client, counselor):
+    for message in ("first", "second"):
+        response = agent_client.post("/agent/ask/stream", json={"user_id": 102, "session_id": "follow-up", "message": message, "initial_chart": {}})
+        assert _events(response.text)[-1][0] == "done"
+
+    trace = [t for t in counselor.tracer.recent_traces() if t["trace_id"] == "user_0xtester#follow-up"][-1]
+    names = {span["name"] for span in trace["spans"]}
+    assert {"expert_swarm", "final_generation", "history_persist"} <= names
+    assert len(counselor.load_history("user_0xtester#follow-up")) == 4
+
+def test_stream_failure_sends_error_event_and_saves_nothing(agent_client, counselor):
+    from benchmark import StubGenerativeModel
+
+    StubGenerativeModel.reset(error_rate=1.0)
+    response = agent_client.post("/agent/ask/stream", json={"user_id": 103, "session_id": "failing", "message": "hello", "initial_chart": {}})
+
+    events = _events(response.text)
+    assert [kind for kind, _ in events] == ["error"]
+    assert len(counselor.load_history("user_0xtester#failing")) == 0
+
+def test_stream_runs_on_a_job_queue_worker(agent_client, monkeypatch):
+    import threading
+
+    from app.routers import agent
+
+    threads = []
+    def fake_reply(session_id, message, initial_chart=None):
+        threads.append(threading.current_thread().name)
+        yield "hi"
+    monkeypatch.setattr(agent, "stream_counselor_reply", fake_reply)
+
+    response = agent_client.post("/agent/ask/stream", json={"user_id": 104, "session_id": "queued", "message": "hello"})
+    assert [kind for kind, _ in _events(response.text)] == ["message", "done"]
+    assert threads and threads[0].startswith("agent-worker-")
+
+def test_stream_is_rejected_when_the_queue_is_full(agent_client, monkeypatch):
+    from app.core.agent_queue import QueueFullError
+    from app.routers import agent
+
+    class FullQueue:
+        def submit(self, job, key):
+            raise QueueFullError("full")
+    monkeypatch.setattr(agent, "get_job_queue", lambda handler: FullQueue())
+
+    response = agent_client.post("/agent/ask/stream", json={"user_id": 105, "message": "hello"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+def test_cancelled_relay_stops_generation_and_closes_the_stream(monkeypatch):
+    import asyncio
+
+    from app.routers import agent
+
+    closed = []
+    def reply():
+        try:
+            for i in range(100):
+                yield str(i)
+        finally:
+            closed.append(True)
+    monkeypatch.setattr(agent, "stream_counselor_reply", lambda *args: reply())
+
+    async def main():
+        relay = agent._StreamRelay(asyncio.get_running_loop())
+        # 클라이언트 연결이 끊긴 뒤 워커가 시작된 경우
+        relay.cancel()
+        await asyncio.to_thread(relay.run, "s", "m")
+        return relay._events.qsize()
+
+    assert asyncio.run(main()) == 0
+    assert closed == [True]
@@ -0,0 +1,238 @@
+# ReadThroughCache (read-through + 태그 무효화) 테스트
+import asyncio
+
+from app.core.cache import ReadThroughCache
+
+def _loader(calls, value, tags=("post:1",), started=None, release=None):
+    async def load():
+        calls.append(value)
+        if started is not None:
+            started.set()
+        if release is not None:
+            await release.wait()
+        return value, tags
+    return load
+
+def test_hit_after_first_load():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        first = await cache.get_or_load("k", _loader(calls, {"v": 1}))
+        second = await cache.get_or_load("k", _loader(calls, {"v": 2}))
+        return first, second
+
+    assert asyncio.run(run()) == ({"v": 1}, {"v": 1})
+    assert calls == [{"v": 1}]
+    assert cache.stats()["hits"] == 1
+
+def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(cache.get_or_load("k", _loader(calls, "v", release=release))) for _ in range(20)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(run()) == ["v"] * 20
+    assert len(calls) == 1
+    assert cache.stats()["coalesced_waits"] == 19
+
+def test_none_is_not_cached():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def missing():
+        calls.append(1)
+        return None
+
+    async def run():
+        assert await cache.get_or_load("k", missing) is None
+        assert await cache.get_or_load("k", missing) is None
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_concurrent_misses_share_a_missing_result():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def missing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", missing) for _ in range(5)))
+
+    assert asyncio.run(run()) == [None] * 5
+    assert len(calls) == 1
+
+def test_concurrent_misses_share_the_loader_error():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", broken) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 1
+
+def test_cancelled_load_is_taken_over_by_a_waiter():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        leader = asyncio.create_task(cache.get_or_load("k", _loader(calls, "first", started=started, release=release)))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load("k", _loader(calls, "second")))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == "second"
+    assert calls == ["first", "second"]
+
+def test_waiter_joining_after_an_invalidation_reloads():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        early = asyncio.create_task(cache.get_or_load("post", _loader(calls, "stale", started=started, release=release)))
+        await started.wait()
+        before = asyncio.create_task(cache.get_or_load("post", _loader(calls, "unused")))
+        await asyncio.sleep(0)
+        cache.invalidate("post:1")
+        after = asyncio.create_task(cache.get_or_load("post", _loader(calls, "fresh")))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(early, before, after)
+
+    # 무효화 이전에 합류한 요청은 진행 중이던 결과를, 이후에 합류한 요청은 새 값을 받음
+    assert asyncio.run(run()) == ["stale", "stale", "fresh"]
+    assert calls == ["stale", "fresh"]
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        await cache.get_or_load("post", _loader(calls, "post", tags=("post:1",)))
+        await cache.get_or_load("feed", _loader(calls, "feed", tags=("feed:head",)))
+        cache.invalidate("post:1")
+        await cache.get_or_load("post", _loader(calls, "post again", tags=("post:1",)))
+        await cache.get_or_load("feed", _loader(calls, "feed again", tags=("feed:head",)))
+
+    asyncio.run(run())
+    assert calls == ["post", "feed", "post again"]
+
+def test_load_racing_its_own_invalidation_is_not_stored():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        task = asyncio.create_task(cache.get_or_load("post", _loader(calls, "stale", tags=("post:1",), started=started, release=release)))
+        await started.wait()
+        cache.invalidate("post:1")
+        release.set()
+        assert await task == "stale"
+        return await cache.get_or_load("post", _loader(calls, "fresh", tags=("post:1",)))
+
+    assert asyncio.run(run()) == "fresh"
+
+def test_unrelated_invalidation_does_not_discard_a_load():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        task = asyncio.create_task(cache.get_or_load("post", _loader(calls, "v", tags=("post:1",), started=started, release=release)))
+        await started.wait()
+        cache.invalidate("post:2", "feed:head")
+        release.set()
+        await task
+        return await cache.get_or_load("post", _loader(calls, "reloaded", tags=("post:1",)))
+
+    assert asyncio.run(run()) == "v"
+    assert calls == ["v"]
+
+def test_clear_during_load_discards_it():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        task = asyncio.create_task(cache.get_or_load("post", _loader(calls, "old", started=started, release=release)))
+        await started.wait()
+        cache.clear()
+        release.set()
+        await task
+        return await cache.get_or_load("post", _loader(calls, "new"))
+
+    assert asyncio.run(run()) == "new"
+
+def test_expired_entries_are_reloaded():
+    cache = ReadThroughCache(ttl_seconds=0)
+    calls = []
+
+    async def run():
+        await cache.get_or_load("k", _loader(calls, 1))
+        await asyncio.sleep(0.01)
+        return await cache.get_or_load("k", _loader(calls, 2))
+
+    assert asyncio.run(run()) == 2
+
+def test_lru_bound_and_tag_epochs_are_pruned():
+    cache = ReadThroughCache(max_entries=4)
+
+    async def run():
+        for i in range(20):
+            await cache.get_or_load(f"k{i}", _loader([], i, tags=(f"post:{i}",)))
+            cache.invalidate(f"post:{i + 100}")
+
+    asyncio.run(run())
+    assert cache.stats()["entries"] == 4
+    assert len(cache._tag_epochs) <= 5
+
+def test_shared_store_is_invalidated_across_caches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a, worker_b = ReadThroughCache(shared_path=path), ReadThroughCache(shared_path=path)
+    calls = []
+
+    async def run():
+        await worker_a.get_or_load("post", _loader(calls, "v1"))
+        assert await worker_b.get_or_load("post", _loader(calls, "unused")) == "v1"
+        # B 의 L1 에 남아 있던 항목도 A 의 무효화를 따라 바로 사라짐
+        worker_a.invalidate("post:1")
+        return await worker_b.get_or_load("post", _loader(calls, "v2"))
+
+    assert asyncio.run(run()) == "v2"
+    assert calls == ["v1", "v2"]
+    assert worker_b.stats()["shared_hits"] == 1
+    assert worker_b.stats()["remote_invalidations"] == 1
+
+def test_update_replaces_tagged_values_across_caches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a, worker_b = ReadThroughCache(shared_path=path), ReadThroughCache(shared_path=path)
+    calls = []
+
+    async def run():
+        await worker_a.get_or_load("post", _loader(calls, {"likes": 1}))
+        await worker_b.get_or_load("post", _loader(calls, "unused"))
+        worker_a.update("post:1", lambda value: dict(value, likes=2))
+        return await worker_a.get_or_load("post", _loader(calls, "unused")), await worker_b.get_or_load("post", _loader(calls, "unused"))
+
+    assert asyncio.run(run()) == ({"likes": 2}, {"likes": 2})
+    assert calls == [{"likes": 1}]
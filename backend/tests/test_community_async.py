@@ -0,0 +1,50 @@
+# 비동기 엔진 설정과 커뮤니티 라우트 전체 흐름 테스트
+import asyncio
+
+import pytest
+
+from app.database import async_database_url, create_engine_from_url
+
+def test_plain_urls_use_async_drivers():
+    assert async_database_url("postgresql://u:p@db/motiv") == "postgresql+asyncpg://u:p@db/motiv"
+    assert async_database_url("postgres://u:p@db/motiv") == "postgresql+asyncpg://u:p@db/motiv"
+    assert async_database_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+    assert async_database_url("postgresql+psycopg://u:p@db/motiv") == "postgresql+psycopg://u:p@db/motiv"
+
+@pytest.mark.anyio
+async def test_sqlite_engine_is_async_and_quiet():
+    engine = create_engine_from_url("sqlite://")
+    try:
+        assert engine.dialect.driver == "aiosqlite"
+        assert engine.echo is False
+    finally:
+        await engine.dispose()
+
+@pytest.mark.anyio
+async def test_post_and_comment_lifecycle(community_client):
+    post = (await community_client.post("/community/posts", json={"title": "첫 글", "content": "본문", "category": "money"})).json()
+    post_id = post["id"]
+
+    comment = (await community_client.post(f"/community/posts/{post_id}/comments", json={"content": "댓글"})).json()
+    updated = await community_client.put(f"/community/comments/{comment['id']}", json={"content": "수정된 댓글"})
+    assert updated.json()["content"] == "수정된 댓글"
+
+    detail = (await community_client.get(f"/community/posts/{post_id}")).json()
+    assert [c["content"] for c in detail["comments"]] == ["수정된 댓글"]
+
+    assert (await community_client.put(f"/community/posts/{post_id}", json={"title": "고친 글"})).json()["title"] == "고친 글"
+    assert (await community_client.get(f"/community/posts/{post_id}")).json()["title"] == "고친 글"
+
+    assert (await community_client.delete(f"/community/comments/{comment['id']}")).status_code == 200
+    assert (await community_client.get(f"/community/posts/{post_id}")).json()["comments"] == []
+    assert (await community_client.delete(f"/community/posts/{post_id}")).status_code == 200
+    assert (await community_client.get(f"/community/posts/{post_id}")).status_code == 404
+    assert (await community_client.delete(f"/community/posts/{post_id}")).status_code == 404
+
+@pytest.mark.anyio
+async def test_concurrent_requests_share_the_event_loop(community_client):
+    created = await asyncio.gather(*(community_client.post("/community/posts", json={"title": f"글 {i}", "content": "본문"}) for i in range(20)))
+    assert all(response.status_code == 200 for response in created)
+
+    pages = await asyncio.gather(*(community_client.get("/community/posts", params={"limit": 5}) for _ in range(10)))
+    assert all(len(page.json()["items"]) == 5 for page in pages)
@@ -0,0 +1,69 @@
+# 댓글 페이지네이션과 여러 게시글의 첫 댓글 페이지 일괄 조회 테스트
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud.community import get_comments_for_posts
+from app.database import AsyncSessionLocal
+from app.models.db_community import Comment, Post
+
+pytestmark = pytest.mark.anyio
+
+async def _seed(comment_counts):
+    """
+    게시글마다 지정한 수의 댓글 생성 (created_at 이 겹치는 댓글 포함) -> 게시글 id 목록
+    """
+    base = datetime(2026, 1, 1)
+    async with AsyncSessionLocal() as db:
+        posts = [Post(title=f"post {i}", content="content") for i in range(len(comment_counts))]
+        db.add_all(posts)
+        await db.commit()
+        for post, count in zip(posts, comment_counts):
+            db.add_all(Comment(post_id=post.id, content=f"{post.id}-{i}", created_at=base + timedelta(seconds=i // 3)) for i in range(count))
+        await db.commit()
+        return [post.id for post in posts]
+
+async def test_batch_returns_first_page_per_post_in_request_order(community_client, sql_statements):
+    busy, quiet, empty = await _seed([40, 3, 0])
+
+    sql_statements.clear()
+    response = await community_client.get("/community/comments", params=[("post_ids", quiet), ("post_ids", busy), ("post_ids", empty), ("post_ids", quiet), ("limit", 5)])
+
+    assert response.status_code == 200
+    pages = response.json()
+    assert [page["post_id"] for page in pages] == [quiet, busy, empty]
+    assert [len(page["items"]) for page in pages] == [3, 5, 0]
+    assert [page["next_cursor"] is not None for page in pages] == [False, True, False]
+    assert [item["content"] for item in pages[1]["items"]] == [f"{busy}-{i}" for i in range(5)]
+    assert len([s for s in sql_statements if s.lstrip().upper().startswith("SELECT")]) == 1
+
+async def test_batch_cursor_continues_with_the_per_post_endpoint(community_client):
+    (busy,) = await _seed([40])
+    page = (await community_client.get("/community/comments", params={"post_ids": busy, "limit": 7})).json()[0]
+    seen = [item["id"] for item in page["items"]]
+    cursor = page["next_cursor"]
+    while cursor:
+        page = (await community_client.get(f"/community/posts/{busy}/comments", params={"limit": 6, "cursor": cursor})).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    assert len(seen) == len(set(seen)) == 40
+
+async def test_batch_reads_at_most_limit_plus_one_rows_per_post(community_client):
+    ids = await _seed([30, 30])
+    async with AsyncSessionLocal() as db:
+        pages = await get_comments_for_posts(db, ids, limit=4)
+        assert await get_comments_for_posts(db, [], limit=4) == {}
+    assert {post_id: len(comments) for post_id, (comments, _) in pages.items()} == {ids[0]: 4, ids[1]: 4}
+
+async def test_batch_rejects_too_many_posts(community_client):
+    response = await community_client.get("/community/comments", params=[("post_ids", i) for i in range(101)])
+    assert response.status_code == 400
+
+def test_postgres_query_uses_a_lateral_join():
+    from sqlalchemy.dialects import postgresql
+
+    from app.crud.community import _first_comment_pages
+
+    query, _ = _first_comment_pages("postgresql", [1, 2], 5)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "JOIN LATERAL" in sql and "LIMIT" in sql and "row_number" not in sql.lower()
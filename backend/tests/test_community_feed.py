@@ -0,0 +1,85 @@
+# 커뮤니티 피드 (created_at, id) 커서 페이지네이션, 카테고리 필터, 댓글 수 테스트
+import datetime
+
+import pytest
+
+from app.database import AsyncSessionLocal
+from app.models.db_community import Comment, Post
+
+pytestmark = pytest.mark.anyio
+
+async def _seed_posts(created_ats, category=None):
+    async with AsyncSessionLocal() as db:
+        posts = [Post(title=f"post {i}", content="content", category=category, created_at=created_at) for i, created_at in enumerate(created_ats)]
+        db.add_all(posts)
+        await db.commit()
+        return [post.id for post in posts]
+
+async def _walk(client, **params):
+    """
+    next_cursor 를 따라 끝까지 읽은 (게시글 목록, 페이지 수)
+    """
+    items, pages, cursor = [], 0, None
+    while True:
+        response = await client.get("/community/posts", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+async def test_cursor_pages_cover_the_feed_newest_first(community_client):
+    start = datetime.datetime(2024, 1, 1)
+    ids = await _seed_posts([start + datetime.timedelta(minutes=i) for i in range(7)])
+
+    items, pages = await _walk(community_client, limit=3)
+    assert [post["id"] for post in items] == ids[::-1]
+    assert pages == 3
+
+async def test_posts_sharing_a_timestamp_are_neither_skipped_nor_repeated(community_client):
+    same = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    ids = await _seed_posts([same] * 5 + [same - datetime.timedelta(seconds=1)])
+
+    items, _ = await _walk(community_client, limit=2)
+    # 같은 created_at 안에서는 id 내림차순으로 고정
+    assert [post["id"] for post in items] == sorted(ids[:5], reverse=True) + [ids[5]]
+
+async def test_new_posts_do_not_shift_later_pages(community_client):
+    start = datetime.datetime(2024, 1, 1)
+    ids = await _seed_posts([start + datetime.timedelta(minutes=i) for i in range(4)])
+    first = (await community_client.get("/community/posts", params={"limit": 2})).json()
+
+    await community_client.post("/community/posts", json={"title": "newest", "content": "content"})
+    second = (await community_client.get("/community/posts", params={"limit": 2, "cursor": first["next_cursor"]})).json()
+    assert [post["id"] for post in second["items"]] == [ids[1], ids[0]]
+
+async def test_malformed_cursor_is_rejected(community_client):
+    response = await community_client.get("/community/posts", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+async def test_category_feed_pages_only_that_category(community_client):
+    start = datetime.datetime(2024, 1, 1)
+    money = await _seed_posts([start + datetime.timedelta(minutes=2 * i) for i in range(5)], category="money")
+    await _seed_posts([start + datetime.timedelta(minutes=2 * i + 1) for i in range(5)], category="family")
+
+    items, pages = await _walk(community_client, limit=2, category="money")
+    assert [post["id"] for post in items] == money[::-1]
+    assert {post["category"] for post in items} == {"money"} and pages == 3
+
+async def test_comment_counts_come_from_the_feed_query(community_client, sql_statements):
+    ids = await _seed_posts([datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2)])
+    async with AsyncSessionLocal() as db:
+        db.add_all([Comment(post_id=ids[0], content=f"comment {i}") for i in range(3)])
+        await db.commit()
+
+    sql_statements.clear()
+    items = (await community_client.get("/community/posts")).json()["items"]
+    assert [(post["id"], post["comment_count"]) for post in items] == [(ids[1], 0), (ids[0], 3)]
+    assert len(sql_statements) == 1
+
+    # 댓글 작성 후 목록의 댓글 수도 갱신됨
+    await community_client.post(f"/community/posts/{ids[1]}/comments", json={"content": "first"})
+    items = (await community_client.get("/community/posts")).json()["items"]
+    assert [post["comment_count"] for post in items] == [1, 3]
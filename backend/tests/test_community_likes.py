@@ -0,0 +1,82 @@
+# 게시글 좋아요 (UPDATE ... RETURNING) 테스트
+import asyncio
+
+import pytest
+
+from app.database import AsyncSessionLocal
+from app.models.db_community import Comment, Post
+
+pytestmark = pytest.mark.anyio
+
+async def _seed_post() -> int:
+    async with AsyncSessionLocal() as db:
+        post = Post(title="title", content="content")
+        db.add(post)
+        await db.commit()
+        return post.id
+
+async def test_like_returns_the_incremented_count(community_client):
+    post_id = await _seed_post()
+    counts = [(await community_client.post(f"/community/posts/{post_id}/like")).json()["like_count"] for _ in range(3)]
+    assert counts == [1, 2, 3]
+    detail = (await community_client.get(f"/community/posts/{post_id}")).json()
+    assert detail["like_count"] == 3
+
+async def test_like_on_a_cached_post_is_a_single_round_trip(community_client, sql_statements):
+    post_id = await _seed_post()
+    await community_client.get(f"/community/posts/{post_id}")
+
+    sql_statements.clear()
+    response = await community_client.post(f"/community/posts/{post_id}/like")
+
+    assert response.status_code == 200
+    assert response.json()["title"] == "title"
+    assert len(sql_statements) == 1
+    assert "RETURNING" in sql_statements[0].upper()
+
+async def test_consecutive_likes_keep_the_cache_and_take_one_statement_each(community_client, sql_statements):
+    post_id = await _seed_post()
+    await community_client.get(f"/community/posts/{post_id}")
+    await community_client.get("/community/posts")
+
+    for expected in (1, 2, 3):
+        sql_statements.clear()
+        response = await community_client.post(f"/community/posts/{post_id}/like")
+        assert response.json()["like_count"] == expected
+        assert len(sql_statements) == 1 and "RETURNING" in sql_statements[0].upper()
+
+    # 상세와 피드 캐시는 무효화되지 않고 like_count 만 갱신됨
+    sql_statements.clear()
+    assert (await community_client.get(f"/community/posts/{post_id}")).json()["like_count"] == 3
+    assert (await community_client.get("/community/posts")).json()["items"][0]["like_count"] == 3
+    assert sql_statements == []
+
+async def test_comment_like_is_one_statement_and_updates_the_cached_post(community_client, sql_statements):
+    post_id = await _seed_post()
+    async with AsyncSessionLocal() as db:
+        comment = Comment(post_id=post_id, content="comment")
+        db.add(comment)
+        await db.commit()
+        comment_id = comment.id
+    await community_client.get(f"/community/posts/{post_id}")
+
+    sql_statements.clear()
+    response = await community_client.post(f"/community/comments/{comment_id}/like")
+    assert response.status_code == 200
+    assert response.json()["like_count"] == 1 and response.json()["content"] == "comment"
+    assert len(sql_statements) == 1 and "RETURNING" in sql_statements[0].upper()
+
+    sql_statements.clear()
+    assert (await community_client.get(f"/community/posts/{post_id}")).json()["comments"][0]["like_count"] == 1
+    assert sql_statements == []
+    assert (await community_client.post("/community/comments/999/like")).status_code == 404
+
+async def test_concurrent_likes_are_not_lost(community_client):
+    post_id = await _seed_post()
+    responses = await asyncio.gather(*(community_client.post(f"/community/posts/{post_id}/like") for _ in range(10)))
+    assert sorted(r.json()["like_count"] for r in responses) == list(range(1, 11))
+
+async def test_like_missing_post_is_404(community_client, sql_statements):
+    response = await community_client.post("/community/posts/999/like")
+    assert response.status_code == 404
+    assert len(sql_statements) == 1
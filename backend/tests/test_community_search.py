@@ -0,0 +1,156 @@
+# 커뮤니티 검색 테스트 (프로세스 내 BM25 색인, /community/search 라우트, PostgreSQL tsvector 쿼리)
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.core.search import InvertedIndex
+from app.crud import community as crud_community
+from app.models.db_community import Comment, Post
+
+class _Row:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+def _index(posts, comments=()):
+    index = InvertedIndex()
+    for post in posts:
+        index.post_saved(_Row(category=None, **post))
+    for comment in comments:
+        index.comment_saved(_Row(**comment))
+    return index
+
+def test_more_relevant_posts_rank_first():
+    index = _index([
+        {"id": 1, "title": "chores", "content": "who does the dishes"},
+        {"id": 2, "title": "money money", "content": "money fights every month"},
+        {"id": 3, "title": "weekend", "content": "we argued about money once"},
+    ])
+    assert [post_id for post_id, _ in index.search("money")] == [2, 3]
+    # 모든 검색어를 포함하는 글만
+    assert [post_id for post_id, _ in index.search("money weekend")] == [3]
+    assert index.search("nothing") == [] and index.search("   ") == []
+
+def test_title_matches_outrank_content_matches():
+    index = _index([
+        {"id": 1, "title": "notes", "content": "trust issues"},
+        {"id": 2, "title": "trust", "content": "notes"},
+    ])
+    assert [post_id for post_id, _ in index.search("trust")] == [2, 1]
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats():
+    index = _index([{"id": i, "title": "money", "content": "word " * i} for i in range(1, 8)])
+    seen, after = [], None
+    while True:
+        page = index.search("money", limit=3, after=after)
+        if not page:
+            break
+        seen.extend(post_id for post_id, _ in page)
+        after = page[-1][1], page[-1][0]
+    assert sorted(seen) == list(range(1, 8)) and len(seen) == 7
+    assert seen == [post_id for post_id, _ in index.search("money", limit=10)]
+
+def test_category_filter():
+    index = InvertedIndex()
+    index.post_saved(_Row(id=1, title="money", content="", category="finance"))
+    index.post_saved(_Row(id=2, title="money", content="", category="family"))
+    assert [post_id for post_id, _ in index.search("money", category="family")] == [2]
+
+def test_comment_only_matches_find_the_post():
+    index = _index(
+        [{"id": 1, "title": "hello", "content": "first post"}, {"id": 2, "title": "other", "content": "text"}],
+        [{"id": 10, "post_id": 1, "content": "have you tried counseling"}],
+    )
+    assert [post_id for post_id, _ in index.search("counseling")] == [1]
+
+def test_updates_and_deletes_keep_the_index_consistent():
+    index = _index(
+        [{"id": 1, "title": "money", "content": ""}, {"id": 2, "title": "money", "content": ""}],
+        [{"id": 10, "post_id": 1, "content": "budget"}],
+    )
+    index.post_saved(_Row(id=1, title="chores", content="", category=None))
+    assert [post_id for post_id, _ in index.search("money")] == [2]
+    assert [post_id for post_id, _ in index.search("chores")] == [1]
+
+    index.comment_saved(_Row(id=10, post_id=1, content="savings"))
+    assert index.search("budget") == [] and [p for p, _ in index.search("savings")] == [1]
+
+    index.post_deleted(1)
+    assert index.search("savings") == [] and index.search("chores") == []
+    assert index.stats()["posts"] == 1 and index.stats()["comments"] == 0
+    index.post_deleted(2)
+    # 모든 가중치가 빠지면 단어와 문서 길이도 남지 않음
+    assert index.stats()["terms"] == 0 and index._total_length == pytest.approx(0)
+
+@pytest.fixture
+def search_index(monkeypatch):
+    """
+    테스트마다 빈 색인 (community_client 가 테이블을 다시 만들므로 이전 테스트의 게시글 id 가 남지 않도록)
+    """
+    index = InvertedIndex()
+    monkeypatch.setattr(crud_community, "search_index", index)
+    monkeypatch.setattr(crud_community, "use_postgres_search", lambda: False)
+    return index
+
+@pytest.mark.anyio
+async def test_search_route_pages_filters_and_follows_writes(community_client, search_index):
+    created = []
+    for i, category in enumerate(["money", "money", "family"]):
+        response = await community_client.post("/community/posts", json={"title": f"budget talk {i}", "content": "budget " * (i + 1), "category": category})
+        created.append(response.json()["id"])
+    await community_client.post(f"/community/posts/{created[2]}/comments", json={"content": "therapy helped"})
+
+    first = (await community_client.get("/community/search", params={"q": "budget", "limit": 2})).json()
+    second = (await community_client.get("/community/search", params={"q": "budget", "limit": 2, "cursor": first["next_cursor"]})).json()
+    ids = [post["id"] for post in first["items"] + second["items"]]
+    assert sorted(ids) == sorted(created) and second["next_cursor"] is None
+
+    money = (await community_client.get("/community/search", params={"q": "budget", "category": "money"})).json()
+    assert {post["id"] for post in money["items"]} == set(created[:2])
+
+    by_comment = (await community_client.get("/community/search", params={"q": "therapy"})).json()["items"]
+    assert [(post["id"], post["comment_count"]) for post in by_comment] == [(created[2], 1)]
+
+    await community_client.put(f"/community/posts/{created[0]}", json={"title": "renamed", "content": "nothing here"})
+    await community_client.delete(f"/community/posts/{created[1]}")
+    remaining = (await community_client.get("/community/search", params={"q": "budget"})).json()["items"]
+    assert [post["id"] for post in remaining] == [created[2]]
+
+@pytest.mark.anyio
+async def test_search_route_rejects_a_bad_cursor(community_client, search_index):
+    response = await community_client.get("/community/search", params={"q": "budget", "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+class _CapturingSession:
+    """
+    실행할 SELECT 를 기록만 하고 빈 결과를 돌려주는 세션 (PostgreSQL 없이 쿼리 형태만 검증)
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return []
+
+@pytest.mark.anyio
+async def test_postgres_query_uses_the_gin_index_expressions():
+    db = _CapturingSession()
+    assert await crud_community._search_postgres(db, "money fights", "finance", 11, (0.5, 7)) == []
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+
+    assert "websearch_to_tsquery('simple'::regconfig" in sql
+    assert sql.count("@@") >= 2 and "ts_rank" in sql
+    assert "posts.category = " in sql
+    assert "ORDER BY" in sql and "LIMIT" in sql
+    # WHERE 의 tsvector 식이 GIN 인덱스 식과 같아야 인덱스를 사용함
+    for table, name in ((Post.__table__, "ix_posts_search"), (Comment.__table__, "ix_comments_search")):
+        index = next(index for index in table.indexes if index.name == name)
+        ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        expression = ddl[ddl.index("USING gin (") + len("USING gin ("):ddl.rindex(")")]
+        assert expression in sql.replace(f"{table.name}.", "")
@@ -0,0 +1,31 @@
+# 상담 파이프라인 브리지(run_counseling_turn) 테스트
+import pytest
+from benchmark import StubGenerativeModel
+
+from app.core.counselor import run_counseling_turn
+
+def test_first_turn_uses_no_experts(counselor):
+    result = run_counseling_turn("counselor_first", "hello", {"Main Conflict Source": "money"})
+    assert result["ai_response"]
+    assert result["swarm_agents_used"] == []
+
+def test_follow_up_reports_experts_whose_reports_were_used(counselor):
+    run_counseling_turn("counselor_follow_up", "hello", {})
+    result = run_counseling_turn("counselor_follow_up", "again")
+    assert result["swarm_agents_used"] == counselor.load_selected_experts("counselor_follow_up")
+
+def test_experts_that_miss_the_deadline_are_not_reported(counselor, monkeypatch):
+    run_counseling_turn("counselor_deadline", "hello", {})
+    counselor._wait_for_routing("counselor_deadline")
+    assert counselor.load_selected_experts("counselor_deadline")
+
+    monkeypatch.setattr(counselor, "EXPERT_TURN_DEADLINE_SEC", 0.05)
+    StubGenerativeModel.reset(latency_mean=0.3, latency_sigma=0.0)
+    result = run_counseling_turn("counselor_deadline", "again")
+    assert result["swarm_agents_used"] == []
+
+def test_model_failure_raises_instead_of_returning_text(counselor):
+    StubGenerativeModel.reset(error_rate=1.0)
+    with pytest.raises(RuntimeError):
+        run_counseling_turn("counselor_failure", "hello", {})
+    assert len(counselor.load_history("counselor_failure")) == 0
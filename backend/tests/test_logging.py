@@ -0,0 +1,69 @@
+# 비동기 로그 파이프라인 테스트 (배치 단위 출력, 카운터)
+import json
+import logging
+import threading
+
+from app.core.logging import AsyncLogPipeline, action_logger
+
+class _Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def _capture():
+    recorder = _Recorder()
+    action_logger.addHandler(recorder)
+    return recorder
+
+def test_batch_is_written_with_one_handler_call():
+    recorder = _capture()
+    try:
+        pipeline = AsyncLogPipeline(batch_size=64)
+        pipeline._write_batch([("action", "0xabc", {"i": i, "body": "x" * 500}, 1700000000.0 + i) for i in range(5)])
+    finally:
+        action_logger.removeHandler(recorder)
+
+    assert len(recorder.messages) == 1
+    lines = recorder.messages[0].split("\n")
+    assert len(lines) == 5
+    for i, line in enumerate(lines):
+        prefix, payload = line.split(" INFO ", 1)
+        record = json.loads(payload)
+        assert record["details"]["i"] == i
+        assert len(record["details"]["body"]) < 500
+    assert pipeline.stats()["written"] == 5 and pipeline.stats()["batches"] == 1
+
+def test_unserializable_record_is_counted_and_skipped():
+    recorder = _capture()
+    try:
+        pipeline = AsyncLogPipeline()
+        # JSON 키로 쓸 수 없는 값 -> 직렬화 실패
+        pipeline._write_batch([("ok", "w", None, 1700000000.0), ("bad", "w", {1j: "value"}, 1700000000.0)])
+    finally:
+        action_logger.removeHandler(recorder)
+    assert pipeline.stats()["written"] == 1 and pipeline.stats()["failed"] == 1
+    assert len(recorder.messages) == 1
+
+def test_counters_are_exact_under_concurrent_submits():
+    pipeline = AsyncLogPipeline(max_pending=100, sample_rates={"sampled": 0.0})
+    # 기록 스레드가 대기열을 비우지 않도록 시작된 것으로 표시
+    pipeline._thread = threading.current_thread()
+
+    def worker():
+        for _ in range(1000):
+            pipeline.submit("sampled", "w")
+            pipeline.submit("kept", "w")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pipeline.stats()
+    assert stats["dropped_sampled"] == 8000
+    assert stats["enqueued"] == 100
+    assert stats["dropped_full"] == 7900
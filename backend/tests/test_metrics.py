@@ -0,0 +1,43 @@
+# /metrics 공개 메트릭과 본인 트레이스 조회 테스트
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def metrics_client(current_user):
+    from app.core.auth import get_current_user
+    from app.routers import metrics
+
+    app = FastAPI()
+    app.include_router(metrics.router)
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    with TestClient(app) as client:
+        yield client
+
+def _record_turn(counselor, session_id):
+    with counselor.tracer.trace(session_id):
+        with counselor.tracer.span("expert", expert="Psychiatrist"):
+            pass
+
+def test_public_metrics_have_no_traces(metrics_client, counselor):
+    _record_turn(counselor, "user_0xtester#default")
+    body = metrics_client.get("/metrics", params={"traces": "true"}).json()
+    assert "recent_traces" not in body["counselor"]
+    assert "user_0xtester" not in str(body) and "Psychiatrist" not in str(body)
+
+def test_traces_require_login(counselor):
+    from app.routers import metrics
+
+    app = FastAPI()
+    app.include_router(metrics.router)
+    assert TestClient(app).get("/metrics/traces").status_code == 401
+
+def test_traces_only_include_the_callers_sessions(metrics_client, counselor, current_user):
+    current_user["id"] = "0xowner"
+    _record_turn(counselor, "user_0xowner#default")
+    _record_turn(counselor, "user_0xowner#b")
+    _record_turn(counselor, "user_0xowner#evil#default")
+    _record_turn(counselor, "user_0xother#default")
+
+    traces = metrics_client.get("/metrics/traces").json()["recent_traces"]
+    assert {trace["trace_id"] for trace in traces} == {"user_0xowner#default", "user_0xowner#b"}
@@ -134,4 +134,16 @@ Your response MUST be ONLY a Python-style list of strings of the expert names. D
 
 Example Response:
 ["CBT Expert", "EFT Expert", "Psychiatrist"]
-""" 
\ No newline at end of file
+""" 
+# --- Single-call Expert Panel ---
+
+MULTI_EXPERT_SYSTEM_PROMPT_TEMPLATE = """
+You are a panel of expert colleagues who each analyze the same counseling conversation independently.
+Each expert's own instructions are given in their section below.
+
+{expert_sections}
+
+Write every expert's report exactly as that expert's instructions require.
+Your response MUST be ONLY a JSON object whose keys are exactly these expert names: {expert_names}
+and whose values are each expert's report as a single string. Do not add any other text.
+"""
@@ -0,0 +1,298 @@
+# theraphy_ai/benchmark.py
+"""
+Offline benchmark for the counseling pipeline.
+
+Replaces genai.GenerativeModel with a deterministic local stub (configurable latency, error rate and
+response size), drives N concurrent synthetic sessions through the first turn and follow-up turns, and
+reports per-stage latency percentiles, calls and prompt bytes per turn, and the bytes retained by the session store.
+
+    python benchmark.py --sessions 20 --turns 5
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+_MARKER = re.compile(r"\[bench:(s\d+):t(\d+)\]")
+_PANEL_NAMES = re.compile(r"expert names: (\[.*?\])")
+
+SAMPLE_QUESTIONS = [
+    "We keep arguing about money and I feel like he never listens to me.",
+    "I'm exhausted from doing all the housework while we both work full time.",
+    "Since the baby arrived we barely talk and I feel lonely in the marriage.",
+    "Whenever I bring up a problem she shuts down and leaves the room.",
+    "I found out about a large debt he hid from me and I don't know if I can trust him.",
+]
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Drop-in stand-in for genai.GenerativeModel; behaviour is controlled by the class-level `config`."""
+
+    config = {"latency_mean": 0.5, "latency_sigma": 0.3, "error_rate": 0.0, "response_chars": 600, "seed": 7}
+    _rng = random.Random(7)
+    _rng_lock = threading.Lock()
+    recorder = None
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    @classmethod
+    def reset(cls, **config):
+        cls.config = dict(cls.config, **config)
+        cls._rng = random.Random(cls.config["seed"])
+
+    def _stage(self, generation_config) -> str:
+        if self.system_instruction is None:
+            return "router"
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            return "panel"
+        if self.system_instruction.lstrip().startswith("You are 'Dr. Helen'"):
+            return "final" if self.model_name == "gemini-2.5-flash" else "first_reply"
+        return "expert"
+
+    def _sample(self):
+        with self._rng_lock:
+            mean, sigma = self.config["latency_mean"], self.config["latency_sigma"]
+            # Log-normal latency with the requested mean; sigma controls the tail.
+            latency = self._rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma) if mean > 0 else 0.0
+            failed = self._rng.random() < self.config["error_rate"]
+        return latency, failed
+
+    def _text(self, stage: str) -> str:
+        if stage == "router":
+            return '["CBT Expert", "EFT Expert", "Gottman Method Expert"]'
+        if stage == "panel":
+            names = json.loads(_PANEL_NAMES.search(self.system_instruction).group(1))
+            return json.dumps({name: "x" * self.config["response_chars"] for name in names})
+        return "x" * self.config["response_chars"]
+
+    def generate_content(self, prompt, stream: bool = False, generation_config=None, **kwargs):
+        stage = self._stage(generation_config)
+        latency, failed = self._sample()
+        time.sleep(latency)
+        if self.recorder is not None:
+            self.recorder.record_call(stage, str(prompt), latency, failed)
+        if failed:
+            raise RuntimeError("stub: simulated API error")
+        text = self._text(stage)
+        if stream:
+            return iter([_StubResponse(text[i:i + 40]) for i in range(0, len(text), 40)])
+        return _StubResponse(text)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_latency: Dict[str, List[float]] = defaultdict(list)
+        self.stage_errors: Dict[str, int] = defaultdict(int)
+        self.turn_calls: Dict[tuple, int] = defaultdict(int)
+        self.turn_prompt_bytes: Dict[tuple, int] = defaultdict(int)
+        self.turn_latency: Dict[str, List[float]] = defaultdict(list)
+
+    def record_call(self, stage: str, prompt: str, latency: float, failed: bool):
+        # Prompts also carry markers of earlier turns (history, profile); the current turn is the newest one.
+        markers = [(session, int(turn)) for session, turn in _MARKER.findall(prompt)]
+        with self._lock:
+            self.stage_latency[stage].append(latency)
+            if failed:
+                self.stage_errors[stage] += 1
+            if markers:
+                key = max(markers, key=lambda marker: marker[1])
+                self.turn_calls[key] += 1
+                self.turn_prompt_bytes[key] += len(prompt.encode("utf-8"))
+
+    def record_turn(self, kind: str, seconds: float):
+        with self._lock:
+            self.turn_latency[kind].append(seconds)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(math.ceil(p / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+    }
+
+
+def _retained_bytes(root) -> int:
+    """Deep size of everything reachable from root (skipping code, modules and classes shared with the process)."""
+    shared = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.CodeType)
+    seen = set()
+    pending = [root]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, shared):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return total
+
+
+def session_script(seed: int, index: int, turns: int) -> List[str]:
+    """Chart conflict followed by one question per turn for session `index`; each session has its own RNG,
+    so the script does not depend on how the worker threads interleave."""
+    rng = random.Random(seed + index)
+    return [rng.choice(SAMPLE_QUESTIONS) for _ in range(turns + 1)]
+
+
+def run_benchmark(sessions: int, turns: int, stub_config: Dict) -> Dict:
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+
+    import google.generativeai as genai
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure = lambda **kwargs: None
+
+    import main
+    import session_memory
+    from concurrency import TokenBucket
+    from session_store import InMemorySessionStore
+
+    main.model_pool.clear()
+    main.report_cache.clear()
+    main.tracer.reset()
+    main._gemini_rate_limiter = TokenBucket(0)
+    if os.environ["SESSION_STORE_BACKEND"] == "memory":
+        session_memory.set_store(InMemorySessionStore())
+
+    recorder = Recorder()
+    StubGenerativeModel.recorder = recorder
+    StubGenerativeModel.reset(**stub_config)
+    seed = stub_config.get("seed", 7)
+
+    def run_session(index: int):
+        session_id = f"s{index}"
+        conflict, *questions = session_script(seed, index, turns)
+        chart = {"Main Conflict Source": conflict, "Session": f"[bench:{session_id}:t0]"}
+        for turn in range(turns):
+            question = f"{questions[turn]} [bench:{session_id}:t{turn}]"
+            started = time.perf_counter()
+            try:
+                main.generate_gemini_response(session_id, question, user_initial_chart=chart if turn == 0 else None)
+            except Exception:
+                recorder.record_turn("failed_turn", time.perf_counter() - started)
+                continue
+            recorder.record_turn("first_turn" if turn == 0 else "follow_up_turn", time.perf_counter() - started)
+
+    store = session_memory.get_store()
+    store_bytes_before = _retained_bytes(store)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(run_session, range(sessions)))
+    wall_seconds = time.perf_counter() - started
+    store_bytes = _retained_bytes(store) - store_bytes_before
+
+    follow_up_keys = [key for key in recorder.turn_calls if key[1] > 0]
+    first_keys = [key for key in recorder.turn_calls if key[1] == 0]
+
+    def mean(values):
+        values = list(values)
+        return round(sum(values) / len(values), 2) if values else 0.0
+
+    return {
+        "config": {"sessions": sessions, "turns": turns, **stub_config, "mode": main.EXPERT_EXECUTION_MODE},
+        "wall_seconds": round(wall_seconds, 3),
+        "turns": {kind: _summarize(samples) for kind, samples in recorder.turn_latency.items()},
+        "stages": {stage: dict(_summarize(samples), errors=recorder.stage_errors[stage]) for stage, samples in recorder.stage_latency.items()},
+        "calls_per_turn": {"first_turn": mean(recorder.turn_calls[k] for k in first_keys), "follow_up_turn": mean(recorder.turn_calls[k] for k in follow_up_keys)},
+        "prompt_bytes_per_turn": {"first_turn": mean(recorder.turn_prompt_bytes[k] for k in first_keys), "follow_up_turn": mean(recorder.turn_prompt_bytes[k] for k in follow_up_keys)},
+        "pipeline_spans": {
+            name: {"count": span["count"], "mean_ms": round(span["sum_ms"] / max(1, span["count"]), 1), **span["outcomes"]}
+            for name, span in main.tracer.snapshot().items()
+        },
+        "session_memory": {"retained_bytes": store_bytes, "bytes_per_session": store_bytes // max(1, sessions), **store.stats()},
+    }
+
+
+def _flatten(report: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in report.items():
+        if key == "config":
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(current: Dict, baseline: Dict) -> str:
+    """Side-by-side table of every numeric metric against the saved baseline."""
+    now, before = _flatten(current), _flatten(baseline)
+    lines = [f"{'metric':<45} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for name in sorted(set(now) | set(before)):
+        old, new = before.get(name), now.get(name)
+        if old is None or new is None:
+            change = "n/a"
+        elif old == 0:
+            change = "0.0%" if new == 0 else "new"
+        else:
+            change = f"{(new - old) / old * 100:+.1f}%"
+        lines.append(f"{name:<45} {str(old):>12} {str(new):>12} {change:>9}")
+    return "\n".join(lines)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the counseling pipeline (no Gemini calls).")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent synthetic sessions")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session, including the first turn")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="mean stub latency per call in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="log-normal sigma of the stub latency (tail weight)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls that raise")
+    parser.add_argument("--response-chars", type=int, default=600, help="size of each stub response")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", help="compare against this saved report")
+    parser.add_argument("--save-baseline", help="write this run's report to the given path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.sessions,
+        args.turns,
+        {
+            "latency_mean": args.latency_mean,
+            "latency_sigma": args.latency_sigma,
+            "error_rate": args.error_rate,
+            "response_chars": args.response_chars,
+            "seed": args.seed,
+        },
+    )
+
+    print(json.dumps(report, indent=2), file=sys.stderr if args.baseline else sys.stdout)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(report, json.load(f)))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,129 @@
+# theraphy_ai/concurrency.py
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every caller that talks to the same API.
+    Tokens refill continuously at `rate` per second up to `capacity` (the burst size).
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Takes `tokens` if they are available right now; never blocks."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, deadline: Optional[float] = None) -> bool:
+        """
+        Blocks until `tokens` are available, then takes them and returns True.
+        With a `deadline` (time.monotonic()), returns False without waiting once the tokens cannot arrive before it.
+        """
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+                if deadline is not None and now + wait >= deadline:
+                    return False
+            time.sleep(wait)
+
+
+class LatencyWindow:
+    """Sliding window of recent call durations (seconds) for percentile estimates."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile (0-100) of the window, or None while it is empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, int(round(p / 100 * len(samples))) - 1))
+        return samples[rank]
+
+
+class KeyedLock:
+    """
+    One mutex per key (e.g. session ID), created on demand and dropped once nobody holds or waits for it,
+    so the table stays as small as the number of keys currently in use.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, list] = {}  # key -> [lock, holders + waiters]
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            # threading.Lock may be released from another thread, which streaming responses rely on.
+            entry[0].release()
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class AsyncKeyedLock:
+    """asyncio counterpart of KeyedLock: waiting coroutines park on the event loop instead of a worker thread."""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
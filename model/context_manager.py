@@ -1,20 +1,128 @@
 # theraphy_ai/context_manager.py
-from typing import List, Dict
+import logging
+import re
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
 
-def get_recent_history(history: List[Dict[str, str]], max_turns: int) -> List[Dict[str, str]]:
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for English text with Gemini's tokenizer; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+# Hangul, kana and CJK ideographs cost about one token per character, not a quarter of one.
+_WIDE_CHARS = re.compile(r"[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+# Longest excerpt kept per message in the running summary
+SUMMARY_EXCERPT_CHARS = 200
+# Topic terms kept from summary lines that were compressed away
+SUMMARY_TOPIC_TERMS = 24
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+_TERM = re.compile(r"\w{2,}")
+_STOPWORDS = frozenset(
+    "the and but for are was were you your yours our ours they them their this that these those with have has had "
+    "not can could would should will just about what when where which who how why there here been being into from "
+    "than then also very really some any all its it's i'm don't user model".split()
+)
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate (no tokenizer call): one token per CJK/Hangul char, CHARS_PER_TOKEN chars per token otherwise."""
+    if text.isascii():
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    """Longest prefix of text whose estimate fits in token_budget."""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    low, high = 0, min(len(text), token_budget * CHARS_PER_TOKEN)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+def message_text(message: Dict) -> str:
+    """Plain text of a history message."""
+    return " ".join(str(part) for part in message["parts"])
+
+def _summary_line(message: Dict) -> str:
+    """Leading whole sentences of the message, up to SUMMARY_EXCERPT_CHARS."""
+    text = " ".join(message_text(message).split())
+    excerpt = ""
+    for sentence in _SENTENCE_END.split(text):
+        if excerpt and len(excerpt) + 1 + len(sentence) > SUMMARY_EXCERPT_CHARS:
+            break
+        excerpt = f"{excerpt} {sentence}" if excerpt else sentence
+    if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+        excerpt = excerpt[:SUMMARY_EXCERPT_CHARS].rstrip() + "..."
+    return f"- {message['role']}: {excerpt}"
+
+def _topic_line(topics: Dict[str, float]) -> str:
+    return f"- earlier topics: {', '.join(topics)}" if topics else ""
+
+def _compress_line(topics: Counter, line: str):
+    """Adds the content words of a summary line to the topic counts, keeping the top SUMMARY_TOPIC_TERMS."""
+    for term in _TERM.findall(line.split(":", 1)[-1].lower()):
+        if term not in _STOPWORDS and not term.isdigit():
+            topics[term] += 1
+    for term, _ in topics.most_common()[SUMMARY_TOPIC_TERMS:]:
+        del topics[term]
+
+def summary_text(summary_state: Optional[Dict]) -> str:
+    """Prompt text of the running summary: the compressed topics of the oldest turns, then the recent excerpts."""
+    if not summary_state:
+        return ""
+    topic_line = _topic_line(summary_state.get("topics") or {})
+    return "\n".join(([topic_line] if topic_line else []) + summary_state["lines"])
+
+def fold_into_summary(summary_state: Optional[Dict], evicted: List[Dict], summary_token_budget: int) -> Dict:
     """
-    Returns only the most recent N 'turns' from the full conversation history.
-    A "turn" consists of one user message and one model response.
+    Folds newly evicted messages into the running summary. Only the new messages are processed;
+    when the summary exceeds its budget the oldest excerpt lines are compressed into a bounded list of
+    topic terms instead of being dropped, so every summarized turn still leaves a trace.
     """
-    # 1 turn consists of 2 messages (user, model).
-    max_messages = max_turns * 2
-    
-    # If the total history is less than the max messages, return it as is.
-    if len(history) <= max_messages:
-        print(f"[ContextManager] History length ({len(history)}) is within the limit ({max_messages}). Returning full history.")
-        return history
-    
-    # If the max messages are exceeded, slice and return only the recent history.
-    recent_history = history[-max_messages:]
-    print(f"[ContextManager] Truncating history from {len(history)} to the last {len(recent_history)} messages.")
-    return recent_history 
\ No newline at end of file
+    state = summary_state or {"lines": [], "summarized_upto": 0}
+    lines = state["lines"] + [_summary_line(message) for message in evicted]
+    topics = Counter(state.get("topics") or {})
+    total = sum(estimate_tokens(line) for line in lines)
+    while len(lines) > 1 and total + estimate_tokens(_topic_line(topics)) > summary_token_budget:
+        oldest = lines.pop(0)
+        total -= estimate_tokens(oldest)
+        _compress_line(topics, oldest)
+    return {
+        "lines": lines,
+        # most frequent first; a plain dict so the state stays JSON-serializable in the session store
+        "topics": dict(topics.most_common()),
+        "summarized_upto": state["summarized_upto"] + len(evicted),
+    }
+
+def build_context_window(
+    history: List[Dict],
+    transcript,
+    token_budget: int,
+    summary_state: Optional[Dict] = None,
+    summary_token_budget: int = 600,
+    max_messages: Optional[int] = None,
+) -> Tuple[str, Dict]:
+    """
+    Packs the newest messages into `token_budget` estimated tokens and folds everything older into
+    the running summary. `transcript` is the session's Transcript (the serialized form of `history`).
+    Returns (history_str, summary_state); render the summary with summary_text(state).
+    The newest message is always kept, truncated if it alone exceeds the budget.
+    """
+    summarized_upto = summary_state["summarized_upto"] if summary_state else 0
+    total = len(transcript)
+    start = transcript.window_start(token_budget, floor=summarized_upto, max_messages=max_messages)
+    if start == total and total > summarized_upto:
+        start = total - 1
+        history_str = truncate_to_tokens(transcript.line(start), token_budget)
+    else:
+        history_str = transcript.render(start)
+
+    evicted = history[summarized_upto:start]
+    if evicted:
+        logger.debug(f"[ContextManager] Folding {len(evicted)} older messages into the running summary.")
+        summary_state = fold_into_summary(summary_state, evicted, summary_token_budget)
+    return history_str, summary_state or {"lines": [], "summarized_upto": 0}
@@ -0,0 +1,103 @@
+# theraphy_ai/history.py
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+# Optional per-session cap on retained messages (0 keeps everything). Older messages are dropped ring-buffer
+# style; keep it at least 2 * MAX_CONVERSATION_TURNS + 2 so every dropped message was already folded into
+# the running summary.
+HISTORY_MAX_MESSAGES = int(os.getenv("SESSION_HISTORY_MAX_MESSAGES", "0"))
+
+ROLES = ("user", "model")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+
+class Message:
+    """
+    Read-only view of one history message. Supports message["role"] / message["parts"] so code written
+    for the old {'role': ..., 'parts': [...]} dicts keeps working.
+    """
+
+    __slots__ = ("role", "text")
+
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.text = text
+
+    def __getitem__(self, key: str):
+        if key == "role":
+            return self.role
+        if key == "parts":
+            return [self.text]
+        raise KeyError(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "parts": [self.text]}
+
+
+class History:
+    """
+    Compact append-only conversation history: one byte of role code and one string per message instead of a
+    dict and a list. Indices are absolute over the whole session, also after the ring-buffer cap has dropped
+    old messages; `first_index` is the oldest index still held.
+    """
+
+    __slots__ = ("_roles", "_texts", "first_index", "max_messages")
+
+    def __init__(self, max_messages: int = HISTORY_MAX_MESSAGES):
+        self._roles = bytearray()
+        self._texts: List[str] = []
+        self.first_index = 0
+        self.max_messages = max_messages
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Dict], max_messages: int = HISTORY_MAX_MESSAGES) -> "History":
+        history = cls(max_messages)
+        history.extend((message["role"], " ".join(str(part) for part in message["parts"])) for message in messages)
+        return history
+
+    def append(self, role: str, text: str):
+        self._roles.append(_ROLE_CODES[role])
+        self._texts.append(text)
+        if self.max_messages and len(self._texts) > self.max_messages:
+            drop = len(self._texts) - self.max_messages
+            del self._roles[:drop]
+            del self._texts[:drop]
+            self.first_index += drop
+
+    def extend(self, items: Iterable[Tuple[str, str]]):
+        for role, text in items:
+            self.append(role, text)
+
+    def __len__(self) -> int:
+        return self.first_index + len(self._texts)
+
+    def _message(self, position: int) -> Message:
+        return Message(ROLES[self._roles[position]], self._texts[position])
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            start = max(start, self.first_index)
+            return [self._message(i - self.first_index) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not self.first_index <= index < len(self):
+            raise IndexError("history index out of range (message dropped or not yet written)")
+        return self._message(index - self.first_index)
+
+    def __iter__(self) -> Iterator[Message]:
+        for position in range(len(self._texts)):
+            yield self._message(position)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"first_index": self.first_index, "roles": "".join(str(code) for code in self._roles), "texts": list(self._texts)}
+
+    @classmethod
+    def from_json(cls, data: Union[Dict[str, Any], List[Dict]]) -> "History":
+        if isinstance(data, list):  # rows written before the compact format
+            return cls.from_messages(data)
+        history = cls()
+        history._roles = bytearray(int(code) for code in data["roles"])
+        history._texts = list(data["texts"])
+        history.first_index = data["first_index"]
+        return history
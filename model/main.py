@@ -1,15 +1,23 @@
 import os
+import asyncio
+import logging
+import threading
 import google.generativeai as genai
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple, Callable, Iterator, TypeVar
 from dotenv import load_dotenv
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from functools import partial
 import time
 import ast
+import json
 
 from session_memory import (
-    load_history, save_history, 
+    load_history, append_turn,
     load_user_profile, save_user_profile,
     load_counseling_state, save_counseling_state,
-    load_selected_experts, save_selected_experts
+    load_selected_experts, save_selected_experts,
+    load_context_summary, save_context_summary,
+    get_store
 )
 from agents import (
     COUNSELOR_SYSTEM_PROMPT, 
@@ -22,9 +30,21 @@ from agents import (
     OBGYN_EXPERT_PROMPT,
     UROLOGIST_EXPERT_PROMPT,
     LAWYER_EXPERT_PROMPT,
-    ROUTER_PROMPT_TEMPLATE
+    ROUTER_PROMPT_TEMPLATE,
+    MULTI_EXPERT_SYSTEM_PROMPT_TEMPLATE
 )
-from context_manager import get_recent_history
+from context_manager import build_context_window, summary_text
+from concurrency import TokenBucket, LatencyWindow, KeyedLock, AsyncKeyedLock
+from model_pool import model_pool, get_model
+from resilience import DeadlinePassed, GeminiCallGuard
+from report_cache import ReportCache, report_key
+from transcript import TranscriptCache
+from triage import TriageClassifier, TeamDecisionCache, normalize_profile, profile_text
+from tracing import Tracer, submit_in_context
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 # Load .env file at the start of the script
 load_dotenv()
@@ -32,6 +52,64 @@ load_dotenv()
 # Configure how many turns of conversation history to maintain
 MAX_CONVERSATION_TURNS = 10 
 
+# Token budgets for the conversation window in prompts; older turns are folded into a running summary
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "600"))
+
+# Expert swarm execution: "parallel" fans the experts out on a thread pool, "sequential" runs them one by one,
+# "single_call" asks for every expert's report in one structured request
+EXPERT_EXECUTION_MODE = os.getenv("EXPERT_EXECUTION_MODE", "parallel")
+EXPERT_MAX_CONCURRENCY = int(os.getenv("EXPERT_MAX_CONCURRENCY", "5"))
+# Turns that may fan out at once; the expert pool holds a full team for each of them
+EXPERT_CONCURRENT_SESSIONS = int(os.getenv("EXPERT_CONCURRENT_SESSIONS", "8"))
+
+# Shared rate limit for every Gemini call made by this process (replaces the old fixed sleep)
+GEMINI_REQUESTS_PER_SECOND = float(os.getenv("GEMINI_REQUESTS_PER_SECOND", "5"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", str(EXPERT_MAX_CONCURRENCY)))
+
+_gemini_rate_limiter = TokenBucket(GEMINI_REQUESTS_PER_SECOND, GEMINI_BURST)
+
+# Every Gemini call goes through this guard: AIMD concurrency limit, backoff with jitter on 429/transient
+# errors, and a circuit breaker per model name that fails fast while the model keeps failing
+_gemini_guard = GeminiCallGuard(
+    initial_concurrency=float(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+    max_concurrency=float(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+    backoff_base=float(os.getenv("GEMINI_BACKOFF_BASE_SEC", "0.5")),
+    backoff_max=float(os.getenv("GEMINI_BACKOFF_MAX_SEC", "8")),
+    failure_threshold=int(os.getenv("GEMINI_CIRCUIT_FAILURES", "5")),
+    reset_timeout=float(os.getenv("GEMINI_CIRCUIT_RESET_SEC", "30")),
+)
+# Actual API concurrency is bounded by the guard and the token bucket; the pools only need enough threads
+# that one turn's experts never queue behind another turn's. Hedges get their own pool so a busy primary
+# pool cannot hold back the duplicate requests meant to cut its tail.
+_expert_executor = ThreadPoolExecutor(max_workers=EXPERT_MAX_CONCURRENCY * EXPERT_CONCURRENT_SESSIONS, thread_name_prefix="expert")
+_hedge_executor = ThreadPoolExecutor(max_workers=EXPERT_MAX_CONCURRENCY, thread_name_prefix="expert-hedge")
+
+# Per-turn latency budget for the expert swarm; experts that miss it are left out of the final prompt
+EXPERT_TURN_DEADLINE_SEC = float(os.getenv("EXPERT_TURN_DEADLINE_SEC", "15"))
+# Hedging: re-issue an expert call once it has run longer than this percentile of recent expert latencies
+EXPERT_HEDGE_ENABLED = os.getenv("EXPERT_HEDGE_ENABLED", "0") == "1"
+EXPERT_HEDGE_PERCENTILE = float(os.getenv("EXPERT_HEDGE_PERCENTILE", "95"))
+EXPERT_HEDGE_MIN_SAMPLES = 20
+# Floor for the per-request timeout derived from the remaining deadline
+MIN_REQUEST_TIMEOUT_SEC = 0.5
+
+_expert_latency = LatencyWindow()
+
+# Content-addressed cache of expert reports (REPORT_CACHE_PATH shares it across worker processes via SQLite)
+report_cache = ReportCache(
+    max_bytes=int(os.getenv("REPORT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("REPORT_CACHE_TTL_SEC", "600")),
+    disk_path=os.getenv("REPORT_CACHE_PATH") or None,
+)
+
+ANALYSIS_ERROR_PREFIX = "Error during analysis"
+
+# Expert routing: local triage answers confident cases, the LLM router the ambiguous ones
+DEFAULT_EXPERT_TEAM = ["CBT Expert", "EFT Expert", "Psychiatrist"]
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "1") == "1"
+
 ALL_EXPERTS = {
     "CBT Expert": CBT_EXPERT_PROMPT,
     "EFT Expert": EFT_EXPERT_PROMPT,
@@ -44,26 +122,221 @@ ALL_EXPERTS = {
     "Lawyer Expert": LAWYER_EXPERT_PROMPT,
 }
 
-def _run_single_expert_analysis(expert_name: str, expert_prompt: str, context_str: str) -> Dict[str, str]:
+_triage = TriageClassifier(ALL_EXPERTS, core_team=["CBT Expert", "EFT Expert", "Gottman Method Expert"])
+_team_cache = TeamDecisionCache(max_entries=int(os.getenv("TEAM_CACHE_MAX_ENTRIES", "1024")))
+
+# First-turn routing runs in the background, overlapping the first counselor reply; turn 2 waits for it
+_routing_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ROUTING_MAX_CONCURRENCY", "4")), thread_name_prefix="routing")
+_pending_routing: Dict[str, Future] = {}
+_pending_routing_lock = threading.Lock()
+
+# Serialized conversation per session, shared by the expert and final prompt builders
+_transcripts = TranscriptCache(max_sessions=int(os.getenv("SESSION_MAX_RESIDENT", "1000")))
+
+# Per-stage latency histograms; TRACE_DUMP_PATH additionally appends every turn's spans as JSON lines
+tracer = Tracer(
+    recent_traces=int(os.getenv("TRACE_BUFFER_SIZE", "50")),
+    dump_path=os.getenv("TRACE_DUMP_PATH") or None,
+)
+
+def warm_up_models():
+    """Builds every static (model, system prompt) client up front so the first turns skip construction."""
+    model_pool.configure()
+    model_pool.warm_up(
+        [('gemini-1.5-flash', prompt) for prompt in ALL_EXPERTS.values()]
+        + [('gemini-1.5-flash', None), ('gemini-1.5-flash', COUNSELOR_SYSTEM_PROMPT), ('gemini-2.5-flash', COUNSELOR_SYSTEM_PROMPT)]
+    )
+
+def _call_gemini(model_name: str, request: Callable[[], T], deadline: Optional[float] = None) -> T:
+    """
+    Runs one Gemini request under the shared rate limit and call guard. With a `deadline`, no attempt
+    starts after it: neither a retry nor a call still waiting for a rate-limit token (DeadlinePassed).
+    """
+    def attempt():
+        if not _gemini_rate_limiter.acquire(deadline=deadline):
+            raise DeadlinePassed("turn deadline passed while waiting for the rate limiter")
+        return request()
+    return _gemini_guard.call(model_name, attempt, deadline=deadline)
+
+def _request_options(deadline: float) -> Dict[str, float]:
+    """Per-request timeout that ends the HTTP call at the turn deadline instead of the SDK's default."""
+    return {"timeout": max(MIN_REQUEST_TIMEOUT_SEC, deadline - time.monotonic())}
+
+def _model_name(model: genai.GenerativeModel) -> str:
+    return model.model_name.split("/")[-1]  # the SDK reports "models/<name>"
+
+def _run_single_expert_analysis(expert_name: str, expert_prompt: str, context_str: str, deadline: float) -> Dict[str, str]:
     """Internal function to run a single expert analysis and return the result."""
+    with tracer.span("expert", expert=expert_name, prompt_chars=len(context_str)) as span:
+        if time.monotonic() >= deadline:
+            # Queued past the deadline: its report would be discarded, so skip the call.
+            span.outcome = "skipped"
+            return {"name": expert_name, "report": f"{ANALYSIS_ERROR_PREFIX}: turn deadline passed"}
+        try:
+            model = get_model('gemini-1.5-flash', expert_prompt)
+            started = time.monotonic()
+            response = _call_gemini(
+                'gemini-1.5-flash',
+                lambda: model.generate_content(context_str, request_options=_request_options(deadline)),
+                deadline=deadline,
+            )
+            _expert_latency.record(time.monotonic() - started)
+            return {"name": expert_name, "report": response.text}
+        except Exception as e:
+            span.outcome = "error"
+            return {"name": expert_name, "report": f"{ANALYSIS_ERROR_PREFIX}: {e}"}
+
+def _run_cached_expert_analysis(expert_name: str, expert_prompt: str, context_str: str, deadline: float) -> Dict[str, str]:
+    """Serves a repeated (expert, context) pair from the report cache; failed analyses are never cached."""
+    key = report_key(expert_name, context_str)
+    cached = report_cache.get(key)
+    if cached is not None:
+        with tracer.span("expert", expert=expert_name) as span:
+            span.outcome = "cached"
+        return {"name": expert_name, "report": cached}
+    result = _run_single_expert_analysis(expert_name, expert_prompt, context_str, deadline)
+    if not result["report"].startswith(ANALYSIS_ERROR_PREFIX):
+        report_cache.put(key, result["report"])
+    return result
+
+def _hedge_delay() -> Optional[float]:
+    """Seconds after which a straggling expert call gets a duplicate request, or None when hedging is off."""
+    if not EXPERT_HEDGE_ENABLED or len(_expert_latency) < EXPERT_HEDGE_MIN_SAMPLES:
+        return None
+    return _expert_latency.percentile(EXPERT_HEDGE_PERCENTILE)
+
+def _fan_out_expert_analysis(experts: Dict[str, str], context_str: str, deadline: float) -> Dict[str, str]:
+    """Runs one request per expert on the shared pool and returns the reports that arrive before `deadline`."""
+    reports = {}
+    # Fan out on the shared pool; the token bucket paces the actual API calls.
+    started = time.monotonic()
+    owners = {}  # future -> expert name (a hedged expert has two futures)
+    for name, prompt in experts.items():
+        logger.debug(f"- Starting {name} analysis...")
+        owners[submit_in_context(_expert_executor, _run_cached_expert_analysis, name, prompt, context_str, deadline)] = name
+
+    hedge_delay = _hedge_delay()
+    hedged = set()
+    outstanding = set(owners)
+    while outstanding:
+        now = time.monotonic()
+        wake_at = deadline
+        if hedge_delay is not None and len(hedged) < len(experts):
+            wake_at = min(wake_at, started + hedge_delay)
+        done, outstanding = wait(outstanding, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            name = owners[future]
+            report = future.result()["report"]
+            # A failed call counts as missed, like a late one; a pending hedge may still answer.
+            if name not in reports and not report.startswith(ANALYSIS_ERROR_PREFIX):
+                reports[name] = report
+                logger.debug(f"- {name} analysis complete.")
+        outstanding = {future for future in outstanding if owners[future] not in reports}
+
+        now = time.monotonic()
+        if now >= deadline:
+            for future in outstanding:
+                future.cancel()  # drops calls still queued; running ones end at their request timeout
+            break
+        if hedge_delay is not None and now >= started + hedge_delay:
+            for name in {owners[future] for future in outstanding} - hedged:
+                logger.debug(f"- {name} is straggling; sending a hedged request.")
+                hedge = submit_in_context(_hedge_executor, _run_cached_expert_analysis, name, experts[name], context_str, deadline)
+                owners[hedge] = name
+                outstanding.add(hedge)
+                hedged.add(name)
+            hedged.update(experts)  # hedge each turn's stragglers at most once
+    return reports
+
+def _parse_panel_reports(text: str, expected: List[str]) -> Dict[str, str]:
+    """Validates the panel's JSON answer against the requested team; malformed or missing sections are dropped."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=expert_prompt)
-        response = model.generate_content(context_str)
-        return {"name": expert_name, "report": response.text}
-    except Exception as e:
-        return {"name": expert_name, "report": f"Error during analysis: {e}"}
+        payload = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    return {name: payload[name].strip() for name in expected if isinstance(payload.get(name), str) and payload[name].strip()}
 
-def run_expert_analysis(session_id: str, short_history: list, user_question: str) -> Dict[str, str]:
-    """Runs the selected expert agents to receive analysis reports."""
-    print("\n[Swarm] Starting expert analysis for the selected team...")
+def _run_combined_expert_analysis(experts: Dict[str, str], context_str: str, deadline: float) -> Dict[str, str]:
+    """Asks for every expert's report in a single structured request."""
+    system_prompt = MULTI_EXPERT_SYSTEM_PROMPT_TEMPLATE.format(
+        expert_sections="\n\n".join(f"### {name}\n{prompt.strip()}" for name, prompt in experts.items()),
+        expert_names=json.dumps(list(experts)),
+    )
+    with tracer.span("expert_panel", experts=len(experts), prompt_chars=len(system_prompt) + len(context_str)) as span:
+        try:
+            model = get_model('gemini-1.5-flash', system_prompt)
+            response = _call_gemini(
+                'gemini-1.5-flash',
+                lambda: model.generate_content(
+                    context_str,
+                    generation_config={"response_mime_type": "application/json"},
+                    request_options=_request_options(deadline),
+                ),
+                deadline=deadline,
+            )
+            reports = _parse_panel_reports(response.text, list(experts))
+        except Exception as e:
+            logger.warning(f"[Swarm] Panel request failed: {e}")
+            span.outcome = "error"
+            return {}
+        if len(reports) < len(experts):
+            span.outcome = "partial"
+        return reports
+
+def _run_panel_analysis(experts: Dict[str, str], context_str: str, deadline: float) -> Dict[str, str]:
+    """
+    Single-call mode: cached reports are reused, the remaining experts share one panel request,
+    and any section missing from the panel's answer falls back to that expert's own request.
+    """
+    reports = {}
+    for name in experts:
+        cached = report_cache.get(report_key(name, context_str))
+        if cached is not None:
+            reports[name] = cached
+    pending = {name: prompt for name, prompt in experts.items() if name not in reports}
+    if not pending:
+        return reports
+
+    logger.debug(f"- Starting panel analysis for {list(pending)}...")
+    future = submit_in_context(_expert_executor, _run_combined_expert_analysis, pending, context_str, deadline)
+    try:
+        panel_reports = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        panel_reports = {}
+    for name, report in panel_reports.items():
+        report_cache.put(report_key(name, context_str), report)
+        reports[name] = report
+        logger.debug(f"- {name} analysis complete.")
+
+    missing = {name: prompt for name, prompt in pending.items() if name not in reports}
+    if missing and time.monotonic() < deadline:
+        logger.debug(f"- Panel answer lacked {list(missing)}; falling back to individual requests.")
+        reports.update(_fan_out_expert_analysis(missing, context_str, deadline))
+    return reports
+
+def run_expert_analysis(
+    session_id: str,
+    history_str: str,
+    user_question: str,
+    summary: str = ""
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Runs the selected expert agents to receive analysis reports within the per-turn deadline.
+    Returns (reports, missed): reports that arrived in time, in selection order, and the experts that did not
+    (late or failed; error text never reaches the prompt).
+    """
+    logger.debug("[Swarm] Starting expert analysis for the selected team...")
 
+    _wait_for_routing(session_id, timeout=EXPERT_TURN_DEADLINE_SEC)
     selected_expert_names = load_selected_experts(session_id)
     if not selected_expert_names:
-        print("[Error] No selected experts found for this session. Aborting analysis.")
-        return {}
+        logger.warning("[Error] No selected experts found for this session. Aborting analysis.")
+        return {}, []
     
-    history_str = "\n".join([f"{msg['role']}: {msg['parts']}" for msg in short_history])
-    context_to_analyze = f"""
+    summary_section = f"\n[Summary of Earlier Conversation]\n{summary}\n" if summary else ""
+    context_to_analyze = f"""{summary_section}
 [Previous Conversation]
 {history_str}
 
@@ -72,98 +345,194 @@ def run_expert_analysis(session_id: str, short_history: list, user_question: str
 """
     
     experts_to_run = {name: ALL_EXPERTS[name] for name in selected_expert_names if name in ALL_EXPERTS}
+    deadline = time.monotonic() + EXPERT_TURN_DEADLINE_SEC
     
-    analysis_results = {}
-    for name, prompt in experts_to_run.items():
-        print(f"- Starting {name} analysis...")
-        result = _run_single_expert_analysis(name, prompt, context_to_analyze)
-        analysis_results[result["name"]] = result["report"]
-        print(f"- {name} analysis complete.")
-        time.sleep(1) # To avoid rate limiting
-            
-    return analysis_results
-
-def select_expert_team(user_profile: Dict) -> List[str]:
-    """Uses a router agent to select the most relevant team of experts."""
-    print("\n[Router] Selecting expert team based on initial user info...")
-    
+    reports = {}
+    with tracer.span("expert_swarm", mode=EXPERT_EXECUTION_MODE, experts=len(experts_to_run)) as span:
+        if EXPERT_EXECUTION_MODE == "sequential":
+            for name, prompt in experts_to_run.items():
+                if time.monotonic() >= deadline:
+                    break
+                logger.debug(f"- Starting {name} analysis...")
+                result = _run_cached_expert_analysis(name, prompt, context_to_analyze, deadline)
+                if not result["report"].startswith(ANALYSIS_ERROR_PREFIX):
+                    reports[result["name"]] = result["report"]
+                    logger.debug(f"- {name} analysis complete.")
+        elif EXPERT_EXECUTION_MODE == "single_call":
+            reports = _run_panel_analysis(experts_to_run, context_to_analyze, deadline)
+        else:
+            reports = _fan_out_expert_analysis(experts_to_run, context_to_analyze, deadline)
+
+        # Collect in selection order so reports_str is deterministic regardless of completion order.
+        analysis_results = {name: reports[name] for name in experts_to_run if name in reports}
+        missed = [name for name in experts_to_run if name not in reports]
+        span.attrs["missed"] = len(missed)
+        if missed:
+            span.outcome = "deadline"
+            logger.warning(f"[Swarm] No report within {EXPERT_TURN_DEADLINE_SEC}s (failed or late); continuing without: {missed}")
+    return analysis_results, missed
+
+def _route_with_llm(user_profile: Dict) -> Optional[List[str]]:
+    """Asks the LLM router for a team; returns None when its answer cannot be parsed."""
     router_prompt = ROUTER_PROMPT_TEMPLATE.format(
         user_initial_chart=user_profile,
         expert_list="\n".join([f"- {name}" for name in ALL_EXPERTS.keys()])
     )
     
-    router_model = genai.GenerativeModel('gemini-1.5-flash')
-    router_response = router_model.generate_content(router_prompt)
-    
+    router_model = get_model('gemini-1.5-flash')
+    try:
+        router_response = _call_gemini('gemini-1.5-flash', lambda: router_model.generate_content(router_prompt))
+    except Exception as e:
+        logger.warning(f"[Router] Routing call failed: {e}. Defaulting to standard team.")
+        return None
+
     try:
         selected_experts = ast.literal_eval(router_response.text)
-        print(f"[Router] Selected team: {selected_experts}")
+        logger.debug(f"[Router] Selected team: {selected_experts}")
         return selected_experts
     except (ValueError, SyntaxError) as e:
-        print(f"[Router] Error parsing expert list: {e}. Defaulting to standard team.")
-        return ["CBT Expert", "EFT Expert", "Psychiatrist"] # Fallback
+        logger.warning(f"[Router] Error parsing expert list: {e}. Defaulting to standard team.")
+        return None
 
-def generate_gemini_response(
+def select_expert_team(user_profile: Dict) -> List[str]:
+    """
+    Selects the most relevant team of experts. Decisions are cached by normalized profile; a local
+    triage classifier answers confident cases without a network call, and the LLM router handles the rest.
+    """
+    logger.debug("[Router] Selecting expert team based on initial user info...")
+
+    with tracer.span("router") as span:
+        cache_key = normalize_profile(user_profile)
+        cached_team = _team_cache.get(cache_key)
+        if cached_team:
+            logger.debug(f"[Router] Reusing cached team: {cached_team}")
+            span.outcome = "cache"
+            return cached_team
+
+        if TRIAGE_ENABLED:
+            local_team = _triage.select(profile_text(user_profile))
+            if local_team:
+                logger.debug(f"[Router] Local triage selected team: {local_team}")
+                span.outcome = "local"
+                _team_cache.put(cache_key, local_team)
+                return local_team
+
+        span.outcome = "llm"
+        selected_experts = _route_with_llm(user_profile)
+        if not selected_experts:
+            span.outcome = "fallback"
+            return list(DEFAULT_EXPERT_TEAM) # Fallback
+        _team_cache.put(cache_key, selected_experts)
+        return selected_experts
+
+def _route_session(session_id: str, user_profile: Dict) -> List[str]:
+    """Selects and saves the session's expert team; any failure falls back to the default team."""
+    try:
+        team = select_expert_team(user_profile)
+    except Exception as e:
+        logger.warning(f"[Router] Team selection failed: {e}. Defaulting to standard team.")
+        team = list(DEFAULT_EXPERT_TEAM)
+    save_selected_experts(session_id, team)
+    return team
+
+def _forget_routing(session_id: str, future: Future):
+    with _pending_routing_lock:
+        if _pending_routing.get(session_id) is future:
+            del _pending_routing[session_id]
+
+def _start_routing(session_id: str, user_profile: Dict) -> Future:
+    """Starts team selection in the background and registers it so the next turn can wait for it."""
+    with _pending_routing_lock:
+        future = _routing_executor.submit(_route_session, session_id, user_profile)
+        _pending_routing[session_id] = future
+    future.add_done_callback(partial(_forget_routing, session_id))
+    return future
+
+def _wait_for_routing(session_id: str, timeout: Optional[float] = None):
+    """Blocks until this session's background team selection (if any) has saved its team."""
+    with _pending_routing_lock:
+        future = _pending_routing.get(session_id)
+    if future is None:
+        return
+    with tracer.span("routing_wait"):
+        try:
+            future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            logger.warning(f"[Router] Team selection for session '{session_id}' is still running after {timeout}s.")
+
+def _prepare_turn(
     session_id: str,
     user_question: str,
     user_initial_chart: Optional[Dict] = None
-) -> str:
+) -> Tuple[genai.GenerativeModel, str, Callable[[str], None], List[str]]:
     """
-    [Multi-agent Swarm & Phased Counseling with Fixed Team] Generates a final response.
+    Runs every stage that precedes the final counselor generation (routing, state update, expert analysis)
+    and returns (model, prompt, finalize, experts_used). `finalize(ai_response)` persists the turn once the
+    reply is complete; `experts_used` names the experts whose reports made it into the prompt.
     """
-    print(f"\n--- Starting Final Response Generation (Session ID: {session_id}) ---")
-    try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not found.")
-        genai.configure(api_key=api_key)
+    model_pool.configure()
 
-        history = load_history(session_id)
-        
-        # --- First Turn: Routing and Simple Response ---
-        if not history:
-            # 1a. Save user profile
-            user_profile = user_initial_chart or {}
-            save_user_profile(session_id, user_profile)
-            
-            # 1b. Select and save expert team
-            selected_team = select_expert_team(user_profile)
-            save_selected_experts(session_id, selected_team)
-
-            # 1c. Generate simple first response without expert analysis
-            model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=COUNSELOR_SYSTEM_PROMPT)
-            print("[State] Generating simple first response...")
-            prompt = f"[User Information]\n{user_profile}\n\n[First Question]\n{user_question}"
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            
-            updated_history = [{'role': 'user', 'parts': [prompt]}, {'role': 'model', 'parts': [ai_response]}]
-            save_counseling_state(session_id, "Exploration", 1)
-            save_history(session_id, updated_history)
-            return ai_response
-
-        # --- Subsequent Turns ---
-        user_profile = load_user_profile(session_id)
-        phase, turn_count = load_counseling_state(session_id)
-
-        # 2. Update counseling phase
-        turn_count += 1
-        # Modified for a faster 5-turn conclusion
-        if 1 <= turn_count < 3: phase = "Exploration"
-        elif 3 <= turn_count < 5: phase = "Insight"
-        else: phase = "Action"
-        save_counseling_state(session_id, phase, turn_count)
-
-        # 3. Run expert analysis with the fixed team
-        short_history = get_recent_history(history, max_turns=MAX_CONVERSATION_TURNS)
-        analysis_reports = run_expert_analysis(session_id, short_history, user_question)
+    history = load_history(session_id)
+    
+    # --- First Turn: Routing and Simple Response ---
+    if not history:
+        # 1a. Save user profile
+        user_profile = user_initial_chart or {}
+        save_user_profile(session_id, user_profile)
         
+        # 1b. Select and save the expert team in the background; the first reply does not need it
+        _start_routing(session_id, user_profile)
+
+        # 1c. Generate simple first response without expert analysis
+        model = get_model('gemini-1.5-flash', COUNSELOR_SYSTEM_PROMPT)
+        logger.debug("[State] Generating simple first response...")
+        prompt = f"[User Information]\n{user_profile}\n\n[First Question]\n{user_question}"
+
+        def finalize_first_turn(ai_response: str):
+            with tracer.span("history_persist"):
+                save_counseling_state(session_id, "Exploration", 1)
+                append_turn(session_id, prompt, ai_response)
+
+        return model, prompt, finalize_first_turn, []
+
+    # --- Subsequent Turns ---
+    user_profile = load_user_profile(session_id)
+    phase, turn_count = load_counseling_state(session_id)
+
+    # 2. Update counseling phase
+    turn_count += 1
+    # Modified for a faster 5-turn conclusion
+    if 1 <= turn_count < 3: phase = "Exploration"
+    elif 3 <= turn_count < 5: phase = "Insight"
+    else: phase = "Action"
+    save_counseling_state(session_id, phase, turn_count)
+
+    # 3. Run expert analysis with the fixed team
+    with tracer.span("context_window", messages=len(history)):
+        transcript = _transcripts.get(session_id, history)
+        history_str, summary_state = build_context_window(
+            history,
+            transcript,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            summary_state=load_context_summary(session_id),
+            summary_token_budget=SUMMARY_TOKEN_BUDGET,
+            max_messages=MAX_CONVERSATION_TURNS * 2,
+        )
+        save_context_summary(session_id, summary_state)
+    summary = summary_text(summary_state)
+    analysis_reports, missed_experts = run_expert_analysis(session_id, history_str, user_question, summary)
+    
+    with tracer.span("prompt_assembly", reports=len(analysis_reports)) as span:
         if analysis_reports:
             reports_str = "\n\n".join([f"--- {name} Report ---\n{report}" for name, report in analysis_reports.items()])
         else:
             reports_str = "[Expert Reports]\nNo expert reports were generated for this turn."
+        if missed_experts:
+            reports_str += f"\n\n(Not received in time this turn: {', '.join(missed_experts)}. Do not speculate about their perspectives.)"
 
-        history_str_for_prompt = "\n".join([f"{msg['role']}: {msg['parts']}" for msg in short_history])
+        history_str_for_prompt = history_str
+        if summary:
+            history_str_for_prompt = f"(Summary of earlier turns)\n{summary}\n\n(Recent turns)\n{history_str_for_prompt}"
 
         # 4. Construct final prompt
         phase_instruction = ""
@@ -200,27 +569,135 @@ Your primary task is to perform the role corresponding to the **current counseli
 - **Brevity:** Keep the entire response concise, within 5-6 sentences.
 - **Tone and Attitude:** Naturally weave the expert analyses into your own insights, and always maintain the warm, empathetic tone of 'Dr. Helen'.
 """
-        # 5. Generate final response
-        final_model = genai.GenerativeModel('gemini-2.5-flash', system_instruction=COUNSELOR_SYSTEM_PROMPT)
-        final_response = final_model.generate_content(final_prompt)
-        ai_response = final_response.text
-        
+        span.attrs["prompt_chars"] = len(final_prompt)
+    final_model = get_model('gemini-2.5-flash', COUNSELOR_SYSTEM_PROMPT)
+
+    def finalize_turn(ai_response: str):
         # 6. Save history
-        updated_history = history + [
-            {'role': 'user', 'parts': [user_question]},
-            {'role': 'model', 'parts': [ai_response]}
-        ]
-        save_history(session_id, updated_history)
+        with tracer.span("history_persist"):
+            append_turn(session_id, user_question, ai_response)
 
-        return ai_response
+    return final_model, final_prompt, finalize_turn, list(analysis_reports)
 
-    except (ValueError, KeyError) as e:
-        return f"Error: {e}"
-    except Exception as e:
-        return f"An error occurred while calling the model: {e}"
+def _generate_response(
+    session_id: str,
+    user_question: str,
+    user_initial_chart: Optional[Dict] = None
+) -> Tuple[str, List[str]]:
+    """
+    [Multi-agent Swarm & Phased Counseling with Fixed Team] Generates a final response.
+    Returns (reply, experts_used); errors propagate and a failed turn is not added to the history.
+    Not synchronized; callers go through CounselingEngine.
+    """
+    logger.debug(f"--- Starting Final Response Generation (Session ID: {session_id}) ---")
+    model, prompt, finalize, experts_used = _prepare_turn(session_id, user_question, user_initial_chart)
+
+    # 5. Generate final response
+    with tracer.span("final_generation", prompt_chars=len(prompt)):
+        response = _call_gemini(_model_name(model), lambda: model.generate_content(prompt))
+        ai_response = response.text
+
+    finalize(ai_response)
+    return ai_response, experts_used
+
+def _generate_response_stream(
+    session_id: str,
+    user_question: str,
+    user_initial_chart: Optional[Dict] = None
+) -> Iterator[str]:
+    """
+    Streaming variant of _generate_response: yields the counselor reply chunk by chunk.
+    History is saved only after the stream completes, so an aborted or failed stream leaves no partial turn
+    behind; errors propagate to the consumer (also after some chunks were sent).
+    """
+    logger.debug(f"--- Starting Streaming Response Generation (Session ID: {session_id}) ---")
+    model, prompt, finalize, _ = _prepare_turn(session_id, user_question, user_initial_chart)
+
+    chunks = []
+    # Includes the time the client takes to consume the stream.
+    with tracer.span("final_generation", prompt_chars=len(prompt), stream=True):
+        # The guard covers opening the stream; a failure after chunks were sent cannot be retried.
+        stream = _call_gemini(_model_name(model), lambda: iter(model.generate_content(prompt, stream=True)))
+        for chunk in stream:
+            text = chunk.text
+            if text:
+                chunks.append(text)
+                yield text
+
+    finalize("".join(chunks))
+
+class CounselingEngine:
+    """
+    Thread-safe entry point for serving many sessions at once.
+    Turns of the same session are serialized (each turn reads, updates and rewrites the session's state),
+    while different sessions run fully in parallel. Async callers wait on the event loop, not on a worker thread.
+    """
+
+    def __init__(self):
+        self._session_locks = KeyedLock()
+        self._async_session_locks = AsyncKeyedLock()
+
+    def respond(self, session_id: str, user_question: str, user_initial_chart: Optional[Dict] = None) -> str:
+        return self.respond_with_experts(session_id, user_question, user_initial_chart)[0]
+
+    def respond_with_experts(
+        self, session_id: str, user_question: str, user_initial_chart: Optional[Dict] = None
+    ) -> Tuple[str, List[str]]:
+        """Like respond(), but also returns the experts whose reports were used for this reply."""
+        with self._session_locks.hold(session_id), tracer.trace(session_id):
+            return _generate_response(session_id, user_question, user_initial_chart)
+
+    def respond_stream(self, session_id: str, user_question: str, user_initial_chart: Optional[Dict] = None) -> Iterator[str]:
+        # The session stays locked until the stream is exhausted or closed.
+        with self._session_locks.hold(session_id):
+            yield from tracer.trace_stream(session_id, _generate_response_stream(session_id, user_question, user_initial_chart))
+
+    async def respond_async(self, session_id: str, user_question: str, user_initial_chart: Optional[Dict] = None) -> str:
+        async with self._async_session_locks.hold(session_id):
+            return await asyncio.to_thread(self.respond, session_id, user_question, user_initial_chart)
+
+    def active_sessions(self) -> int:
+        return len(self._session_locks)
+
+
+engine = CounselingEngine()
+
+def generate_gemini_response(
+    session_id: str,
+    user_question: str,
+    user_initial_chart: Optional[Dict] = None
+) -> str:
+    """Generates the counselor's reply for one turn (serialized per session)."""
+    return engine.respond(session_id, user_question, user_initial_chart)
+
+def generate_gemini_response_stream(
+    session_id: str,
+    user_question: str,
+    user_initial_chart: Optional[Dict] = None
+) -> Iterator[str]:
+    """Streams the counselor's reply for one turn chunk by chunk (serialized per session)."""
+    return engine.respond_stream(session_id, user_question, user_initial_chart)
+
+def pipeline_metrics(include_traces: bool = False) -> Dict:
+    """Per-stage latency histograms plus the pipeline's cache, pool and session-store counters."""
+    metrics = {
+        "stages": tracer.snapshot(),
+        "model_pool": model_pool.stats(),
+        "gemini_guard": _gemini_guard.stats(),
+        "report_cache": report_cache.stats(),
+        "team_cache": _team_cache.stats(),
+        "session_store": get_store().stats(),
+        "active_sessions": engine.active_sessions(),
+        "pending_routing": len(_pending_routing),
+    }
+    if include_traces:
+        metrics["recent_traces"] = tracer.recent_traces()
+    return metrics
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
     session_id = f"user_{os.getpid()}"
+    warm_up_models()
     
     print("="*50)
     print("Welcome to the AI Relationship Counselor 'Dr. Helen'.")
@@ -272,11 +749,14 @@ if __name__ == "__main__":
             print("\nCounseling session ended. Please feel free to return anytime.")
             break
 
-        if is_first_turn:
-            response = generate_gemini_response(session_id, user_question, user_initial_chart=user_info)
-            is_first_turn = False
-        else:
-            response = generate_gemini_response(session_id, user_question)
+        try:
+            if is_first_turn:
+                response = generate_gemini_response(session_id, user_question, user_initial_chart=user_info)
+                is_first_turn = False
+            else:
+                response = generate_gemini_response(session_id, user_question)
+        except Exception as e:
+            response = f"An error occurred while calling the model: {e}"
         
         print(f"\n\033[94mDr. Helen:\033[0m {response}")
 
@@ -0,0 +1,76 @@
+# theraphy_ai/model_pool.py
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import google.generativeai as genai
+
+
+class ModelPool:
+    """
+    Process-wide registry of GenerativeModel clients keyed by (model name, system instruction).
+    Each pair is built once and shared; the clients are stateless, so concurrent callers can reuse them.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, Optional[str]], genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+        self._configured_key: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, api_key: Optional[str] = None):
+        """Configures the Gemini SDK once per API key instead of on every request."""
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not found.")
+        if api_key == self._configured_key:
+            return
+        with self._lock:
+            if api_key != self._configured_key:
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+
+    def get(self, model_name: str, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+        """Returns the shared client for the pair, building it on first use."""
+        key = (model_name, system_instruction)
+        # One short lock per lookup keeps the hit/miss counters exact under concurrent turns.
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.hits += 1
+                return model
+            self.misses += 1
+            # Looked up at call time so tests and benchmarks can swap genai.GenerativeModel.
+            model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+            self._models[key] = model
+            return model
+
+    def warm_up(self, specs: Iterable[Tuple[str, Optional[str]]]):
+        """Builds the given (model name, system instruction) pairs ahead of the first request."""
+        for model_name, system_instruction in specs:
+            self.get(model_name, system_instruction)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            models, hits, misses = len(self._models), self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "models": models,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+model_pool = ModelPool()
+
+def get_model(model_name: str, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """Shortcut for model_pool.get()."""
+    return model_pool.get(model_name, system_instruction)
@@ -0,0 +1,138 @@
+# theraphy_ai/report_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def report_key(expert_name: str, context_str: str) -> str:
+    """Content address of an analysis: hash of the expert name and the exact context string."""
+    digest = hashlib.sha256()
+    digest.update(expert_name.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(context_str.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _DiskStore:
+    """SQLite file shared by every worker process on the host (one connection per thread, WAL mode)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS expert_reports (key TEXT PRIMARY KEY, report TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, min_created_at: float) -> Optional[Tuple[str, float]]:
+        row = self._connection().execute(
+            "SELECT report, created_at FROM expert_reports WHERE key = ? AND created_at >= ?", (key, min_created_at)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key: str, report: str, created_at: float):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO expert_reports (key, report, created_at) VALUES (?, ?, ?)", (key, report, created_at)
+        )
+
+    def prune(self, min_created_at: float):
+        self._connection().execute("DELETE FROM expert_reports WHERE created_at < ?", (min_created_at,))
+
+
+class ReportCache:
+    """
+    LRU + TTL cache for expert analysis reports, bounded by the total size of the cached reports.
+    With `disk_path` set, misses fall through to a local SQLite store shared across worker processes.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttl_seconds: float = 600, disk_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()  # key -> (report, created_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = _DiskStore(disk_path) if disk_path else None
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remember(self, key: str, report: str, created_at: float):
+        size = len(key) + len(report.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[key] = (report, created_at, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                report, created_at, size = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return report
+                del self._entries[key]
+                self._bytes -= size
+
+        if self._disk is not None:
+            row = self._disk.get(key, now - self.ttl_seconds)
+            if row is not None:
+                with self._lock:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, report: str):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, report, created_at)
+        if self._disk is not None:
+            self._disk.put(key, report, created_at)
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 500:
+                self._puts_since_prune = 0
+                self._disk.prune(created_at - self.ttl_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
@@ -0,0 +1,243 @@
+# theraphy_ai/resilience.py
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Exception class names / message fragments that mean "slow down" (HTTP 429 and quota errors).
+_RATE_LIMIT_ERRORS = ("ResourceExhausted", "TooManyRequests")
+_RATE_LIMIT_MARKERS = ("429", "rate limit", "quota")
+# Transient server-side failures that are worth retrying as well.
+_TRANSIENT_ERRORS = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded")
+# Other signs that the model itself is unhealthy (5xx and transport timeouts); with the above, these open breakers.
+_SERVER_ERRORS = ("ServerError", "BadGateway", "GatewayTimeout", "TimeoutError", "ReadTimeout", "ConnectTimeout")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    if type(error).__name__ in _RATE_LIMIT_ERRORS:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _RATE_LIMIT_MARKERS)
+
+def is_retryable_error(error: Exception) -> bool:
+    return is_rate_limit_error(error) or type(error).__name__ in _TRANSIENT_ERRORS
+
+def is_model_failure(error: Exception) -> bool:
+    """Whether the error says the model is unhealthy; client errors such as InvalidArgument say nothing about it."""
+    return is_retryable_error(error) or type(error).__name__ in _SERVER_ERRORS
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+
+class DeadlinePassed(TimeoutError):
+    """Raised when a call cannot start before its deadline; nothing was sent to the model."""
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit on in-flight calls: every success raises the limit by 1/limit (about +1 per full window),
+    a rate-limit error halves it. Only throttles of calls started after the last decrease shrink the limit,
+    so one burst of 429s counts as a single congestion signal.
+    """
+
+    def __init__(self, initial: float, minimum: float = 1, maximum: float = 64, backoff_ratio: float = 0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff_ratio = backoff_ratio
+        self.limit = max(minimum, min(maximum, initial))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Waits until a call may start; yields the call's start time."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield time.monotonic()
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            previous = int(self.limit)
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if int(self.limit) > previous:
+                self._cond.notify()
+
+    def on_throttle(self, started: float):
+        with self._cond:
+            if started < self._last_decrease:
+                return
+            self.limit = max(self.minimum, self.limit * self.backoff_ratio)
+            self._last_decrease = time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker. `failure_threshold` consecutive model failures (see is_model_failure) open it; while open every call fails fast.
+    After `reset_timeout` seconds a single probe call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probe_in_flight):
+                self.rejected += 1
+                raise CircuitOpenError("circuit breaker is open; skipping the call")
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = True
+
+    def release(self):
+        """Ends a call that never reached the model without judging the model (frees a half-open probe)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class GeminiCallGuard:
+    """
+    Shared wrapper for model calls: adaptive concurrency limit, exponential backoff with full jitter on
+    rate-limit and transient errors, and a circuit breaker per model name.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: float = 16,
+        max_concurrency: float = 64,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.limit = AdaptiveConcurrencyLimit(initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model_name)
+            if breaker is None:
+                breaker = self._breakers[model_name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, model_name: str, request: Callable[[], T], deadline: Optional[float] = None) -> T:
+        """
+        Runs `request()` under the guard; raises CircuitOpenError or the last error once retries are used up.
+        With a `deadline` (time.monotonic()), no retry is started whose backoff would end past it.
+        """
+        breaker = self.breaker(model_name)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            with self.limit.slot() as started:
+                with self._lock:
+                    self.calls += 1
+                try:
+                    result = request()
+                except Exception as e:
+                    error = e
+                else:
+                    error = None
+            if error is None:
+                self.limit.on_success()
+                breaker.record_success()
+                return result
+            if isinstance(error, DeadlinePassed):
+                breaker.release()
+                raise error
+
+            throttled = is_rate_limit_error(error)
+            with self._lock:
+                self.failures += 1
+                self.throttled += throttled
+            if is_model_failure(error):
+                breaker.record_failure()
+            else:
+                # e.g. an oversized or invalid prompt: one caller's bad request must not open the breaker for everyone
+                breaker.release()
+            if throttled:
+                self.limit.on_throttle(started)
+            if attempt >= self.max_retries or not is_retryable_error(error):
+                raise error
+            delay = self.backoff_delay(attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise error
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            breakers = {name: breaker.stats() for name, breaker in self._breakers.items()}
+            counters = {"calls": self.calls, "retries": self.retries, "throttled": self.throttled, "failures": self.failures}
+        return {
+            "concurrency_limit": round(self.limit.limit, 2),
+            "in_flight": self.limit.in_flight,
+            **counters,
+            "breakers": breakers,
+        }
+
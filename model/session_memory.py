@@ -1,55 +1,86 @@
+import os
+import threading
 from typing import List, Dict, Optional, Tuple
 
-# Simple in-memory storage
-_history_store: Dict[str, List[Dict[str, str]]] = {}
-_user_profile_store: Dict[str, Dict] = {}
-_counseling_state_store: Dict[str, Dict] = {} # Stores counseling state (phase, turn_count)
-_selected_experts_store: Dict[str, List[str]] = {} # Stores the list of selected experts for the session
+from history import History
+from session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
 
+# Storage backend, created on first use so settings from .env are already loaded.
+# SESSION_STORE_BACKEND: "sqlite" (durable, bounded memory) or "memory" (process-local dicts)
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
 
-def load_history(session_id: str) -> List[Dict[str, str]]:
-    """Loads the entire conversation history for a session ID."""
-    history = _history_store.get(session_id, [])
-    print(f"\n[Memory] Loading history for session '{session_id}'. ({len(history)} messages total)")
-    return history
 
-def save_history(session_id: str, history: List[Dict[str, str]]):
-    """Saves (overwrites) the conversation history for a session ID."""
-    print(f"[Memory] Saving new history for session '{session_id}'. ({len(history)} messages total)")
-    _history_store[session_id] = history
+def _create_store() -> SessionStore:
+    backend = os.getenv("SESSION_STORE_BACKEND", "sqlite")
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+            max_resident=int(os.getenv("SESSION_MAX_RESIDENT", "1000")),
+            idle_ttl=float(os.getenv("SESSION_IDLE_TTL_SEC", "900")),
+            flush_interval=float(os.getenv("SESSION_FLUSH_INTERVAL_SEC", "1.0")),
+            retention=float(os.getenv("SESSION_RETENTION_SEC", "0")),
+        )
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND: {backend}")
+
+def get_store() -> SessionStore:
+    """Returns the process-wide session store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store()
+    return _store
+
+def set_store(store: SessionStore):
+    """Replaces the session store (e.g. with InMemorySessionStore in tests and benchmarks)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.flush()
+        _store = store
+
+
+def load_history(session_id: str) -> History:
+    """Loads the conversation history for a session ID (messages support message["role"] / message["parts"])."""
+    return get_store().get(session_id, "history") or History()
+
+def append_turn(session_id: str, user_text: str, model_text: str):
+    """Appends one user/model exchange to the history in place (O(1), no copy of the existing history)."""
+    get_store().append(session_id, "history", [("user", user_text), ("model", model_text)])
 
 def save_user_profile(session_id: str, user_profile: Dict):
     """Saves the user profile information for a session ID."""
-    print(f"[Memory] Saving user profile for session '{session_id}'.")
-    _user_profile_store[session_id] = user_profile
+    get_store().set(session_id, "profile", user_profile)
 
 def load_user_profile(session_id: str) -> Optional[Dict]:
     """Loads the user profile information for a session ID."""
-    print(f"[Memory] Loading user profile for session '{session_id}'.")
-    return _user_profile_store.get(session_id)
+    return get_store().get(session_id, "profile")
 
 def load_counseling_state(session_id: str) -> Tuple[str, int]:
     """Loads the counseling state (phase, turn count)."""
-    state = _counseling_state_store.get(session_id, {"phase": "Exploration", "turn_count": 0})
-    print(f"[Memory] Loading state for session '{session_id}': {state}")
+    state = get_store().get(session_id, "state") or {"phase": "Exploration", "turn_count": 0}
     return state["phase"], state["turn_count"]
 
 def save_counseling_state(session_id: str, phase: str, turn_count: int):
     """Saves the counseling state (phase, turn count)."""
     state = {"phase": phase, "turn_count": turn_count}
-    print(f"[Memory] Saving state for session '{session_id}': {state}")
-    _counseling_state_store[session_id] = state
+    get_store().set(session_id, "state", state)
 
 def save_selected_experts(session_id: str, expert_names: List[str]):
     """Saves the list of selected experts for the session."""
-    print(f"[Memory] Saving selected experts for session '{session_id}': {expert_names}")
-    _selected_experts_store[session_id] = expert_names
+    get_store().set(session_id, "experts", expert_names)
 
 def load_selected_experts(session_id: str) -> Optional[List[str]]:
     """Loads the list of selected experts for the session."""
-    experts = _selected_experts_store.get(session_id)
-    if experts:
-        print(f"[Memory] Loading selected experts for session '{session_id}': {experts}")
-    else:
-        print(f"[Memory] No selected experts found for session '{session_id}'.")
-    return experts 
\ No newline at end of file
+    return get_store().get(session_id, "experts")
+
+def save_context_summary(session_id: str, summary_state: Dict):
+    """Saves the running summary of turns that fell out of the context window."""
+    get_store().set(session_id, "summary", summary_state)
+
+def load_context_summary(session_id: str) -> Optional[Dict]:
+    """Loads the running summary of turns that fell out of the context window."""
+    return get_store().get(session_id, "summary")
@@ -0,0 +1,300 @@
+# theraphy_ai/session_store.py
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set
+
+from history import History
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Per-session fields kept by session_memory
+SESSION_FIELDS = ("history", "profile", "state", "experts", "summary")
+# Fields held as compact objects (with extend(), to_json() and from_json()) instead of plain lists
+SESSION_FIELD_TYPES = {"history": History}
+
+
+def _new_value(field: str):
+    return SESSION_FIELD_TYPES.get(field, list)()
+
+def _encode(field: str, value: Any) -> str:
+    if field in SESSION_FIELD_TYPES:
+        value = value.to_json()
+    return json.dumps(value, ensure_ascii=False)
+
+def _decode(field: str, raw: str) -> Any:
+    value = json.loads(raw)
+    return SESSION_FIELD_TYPES[field].from_json(value) if field in SESSION_FIELD_TYPES else value
+
+
+class SessionStore:
+    """Storage backend behind the session_memory load_*/save_* functions."""
+
+    def get(self, session_id: str, field: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, session_id: str, field: str, value: Any):
+        raise NotImplementedError
+
+    def append(self, session_id: str, field: str, items: List[Any]):
+        """Appends to a list field in place (creating it if missing)."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persists any buffered writes. No-op for backends without write-behind."""
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class InMemorySessionStore(SessionStore):
+    """Unbounded, non-durable store (the original behaviour). Useful for tests and benchmarks."""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, session_id: str, field: str) -> Any:
+        return self._sessions.get(session_id, {}).get(field)
+
+    def set(self, session_id: str, field: str, value: Any):
+        self._sessions.setdefault(session_id, {})[field] = value
+
+    def append(self, session_id: str, field: str, items: List[Any]):
+        values = self._sessions.setdefault(session_id, {})
+        if field not in values:
+            values[field] = _new_value(field)
+        values[field].extend(items)
+
+    def stats(self) -> Dict[str, int]:
+        return {"resident_sessions": len(self._sessions)}
+
+
+def _lock_exclusively(path: str):
+    """Holds an exclusive lock on `<path>.lock` so a second process cannot open the same store (POSIX only)."""
+    if fcntl is None or path == ":memory:":
+        return None
+    lock_file = open(f"{path}.lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError(
+            f"Session store {path} is already open in another process; SQLiteSessionStore is single-process only."
+        )
+    return lock_file
+
+
+class _ResidentSession:
+    __slots__ = ("values", "last_access", "dirty")
+
+    def __init__(self, values: Dict[str, Any]):
+        self.values = values
+        self.last_access = time.monotonic()
+        self.dirty = False
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable store: an embedded SQLite database (WAL mode) fronted by an in-process LRU of resident sessions.
+    Writes only touch the LRU and are flushed to disk in batches by a background thread (write-behind).
+    Sessions idle for longer than `idle_ttl` are flushed and dropped from memory, and at most
+    `max_resident` sessions are kept in memory, so memory stays flat regardless of the session count.
+
+    Single process only: each process would keep its own resident copy and overwrite the other's rows,
+    so the database file is locked for the lifetime of the store (a second process fails to open it).
+    Multi-worker deployments need a shared backend instead.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_resident: int = 1000,
+        idle_ttl: float = 900,
+        flush_interval: float = 1.0,
+        retention: float = 0,
+    ):
+        self.path = path
+        self.max_resident = max_resident
+        self.idle_ttl = idle_ttl
+        self.retention = retention
+        self._lock_file = _lock_exclusively(path)
+        self._resident: "OrderedDict[str, _ResidentSession]" = OrderedDict()
+        # Sessions pushed out of the LRU before their latest changes reached the disk (dirty, or part of a
+        # flush still in progress); _load() takes them back from here instead of reading a stale row.
+        self._unwritten: Dict[str, _ResidentSession] = {}
+        self._writing: Set[str] = set()
+        self._lock = threading.RLock()
+        # Serializes flushes, so snapshots reach the disk in the order they were taken.
+        self._write_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)")
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        for field in SESSION_FIELDS:
+            if field not in existing:
+                self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {field} TEXT")
+        self._columns = ", ".join(SESSION_FIELDS)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)")
+        # Flushes write on their own connection so lookups never wait for a disk write.
+        self._write_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self.disk_reads = 0
+        self.disk_writes = 0
+        self.evictions = 0
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), name="session-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # --- resident cache ---
+
+    def _load(self, session_id: str) -> _ResidentSession:
+        session = self._resident.get(session_id)
+        if session is not None:
+            self._resident.move_to_end(session_id)
+            session.last_access = time.monotonic()
+            return session
+
+        session = self._unwritten.pop(session_id, None)
+        if session is None:
+            row = self._conn.execute(
+                f"SELECT {self._columns} FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self.disk_reads += 1
+            values = {field: _decode(field, raw) for field, raw in zip(SESSION_FIELDS, row) if raw is not None} if row else {}
+            session = _ResidentSession(values)
+        session.last_access = time.monotonic()
+        self._resident[session_id] = session
+        while len(self._resident) > self.max_resident:
+            self._evict(next(iter(self._resident)))
+        return session
+
+    def _evict(self, session_id: str):
+        session = self._resident.pop(session_id)
+        if session.dirty or session_id in self._writing:
+            self._unwritten[session_id] = session
+        self.evictions += 1
+
+    def _snapshot(self, sessions: Dict[str, _ResidentSession]) -> List[tuple]:
+        """Encodes the sessions' rows and marks them clean (called with self._lock held)."""
+        now = time.time()
+        rows = []
+        for session_id, session in sessions.items():
+            rows.append(
+                (session_id,) + tuple(
+                    _encode(field, session.values[field]) if field in session.values else None
+                    for field in SESSION_FIELDS
+                ) + (now,)
+            )
+            session.dirty = False
+        return rows
+
+    def _write(self, rows: List[tuple]):
+        conn = self._write_conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO sessions (session_id, {self._columns}, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in SESSION_FIELDS)}, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.disk_writes += len(rows)
+
+    # --- SessionStore API ---
+
+    def get(self, session_id: str, field: str) -> Any:
+        with self._lock:
+            return self._load(session_id).values.get(field)
+
+    def set(self, session_id: str, field: str, value: Any):
+        with self._lock:
+            session = self._load(session_id)
+            session.values[field] = value
+            session.dirty = True
+
+    def append(self, session_id: str, field: str, items: List[Any]):
+        with self._lock:
+            session = self._load(session_id)
+            if field not in session.values:
+                session.values[field] = _new_value(field)
+            session.values[field].extend(items)
+            session.dirty = True
+
+    def flush(self):
+        """Snapshots dirty sessions under the store lock, then writes them to disk without holding it."""
+        with self._write_lock:
+            with self._lock:
+                pending = {session_id: session for session_id, session in self._resident.items() if session.dirty}
+                pending.update(self._unwritten)
+                if not pending:
+                    return
+                rows = self._snapshot(pending)
+                self._writing.update(pending)
+            try:
+                self._write(rows)
+            except Exception:
+                with self._lock:
+                    for session in pending.values():
+                        session.dirty = True
+                raise
+            finally:
+                with self._lock:
+                    self._writing.difference_update(pending)
+                    # Evicted sessions are on disk now, unless they were changed since the snapshot.
+                    for session_id, session in pending.items():
+                        if self._unwritten.get(session_id) is session and not session.dirty:
+                            del self._unwritten[session_id]
+
+    def evict_idle(self):
+        """Flushes and drops sessions idle for longer than idle_ttl; purges disk rows past the retention period."""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [session_id for session_id, session in self._resident.items() if session.last_access < cutoff]
+            for session_id in idle:
+                self._evict(session_id)
+        self.flush()
+        if self.retention > 0:
+            with self._write_lock:
+                self._write_conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.retention,))
+
+    def _flush_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+                self.evict_idle()
+            except sqlite3.Error as e:
+                logger.warning(f"[Memory] Session flush failed: {e}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            dirty = sum(1 for session in self._resident.values() if session.dirty) + len(self._unwritten)
+            return {
+                "resident_sessions": len(self._resident),
+                "dirty_sessions": dirty,
+                "disk_reads": self.disk_reads,
+                "disk_writes": self.disk_writes,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,28 @@
+# Shared fixtures: run the pipeline against benchmark.py's Gemini stub with an in-memory session store.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """The main module with Gemini stubbed out, no rate limit and a fresh call guard."""
+    import google.generativeai as genai
+    from benchmark import StubGenerativeModel
+    from concurrency import TokenBucket
+    from resilience import GeminiCallGuard
+    import main
+
+    monkeypatch.setattr(genai, "GenerativeModel", StubGenerativeModel)
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    StubGenerativeModel.reset(latency_mean=0, latency_sigma=0.3, response_chars=120, error_rate=0.0)
+    main.model_pool.clear()
+    main.report_cache.clear()
+    monkeypatch.setattr(main, "_gemini_rate_limiter", TokenBucket(0))
+    monkeypatch.setattr(main, "_gemini_guard", GeminiCallGuard(max_retries=0))
+    return main
@@ -0,0 +1,39 @@
+import threading
+import time
+
+CHART = {"Main Conflict Source": "money and chores"}
+
+
+def test_first_reply_does_not_wait_for_team_selection(pipeline, monkeypatch):
+    release = threading.Event()
+    team = ["Gottman Method Expert", "Financial Psychology Expert"]
+
+    def slow_router(user_profile):
+        release.wait(5)
+        return team
+
+    monkeypatch.setattr(pipeline, "select_expert_team", slow_router)
+    started = time.monotonic()
+    reply, experts = pipeline.engine.respond_with_experts("routing-slow", "hello", CHART)
+
+    assert reply and experts == []
+    assert time.monotonic() - started < 2
+    assert pipeline.load_selected_experts("routing-slow") is None
+
+    # turn 2 waits for the background selection and runs the team it saved
+    release.set()
+    _, experts = pipeline.engine.respond_with_experts("routing-slow", "and then?")
+    assert experts == team
+    assert pipeline.load_selected_experts("routing-slow") == team
+    assert "routing-slow" not in pipeline._pending_routing
+
+
+def test_failed_team_selection_saves_the_default_team(pipeline, monkeypatch):
+    def broken_router(user_profile):
+        raise RuntimeError("router down")
+
+    monkeypatch.setattr(pipeline, "select_expert_team", broken_router)
+    pipeline.engine.respond("routing-broken", "hello", CHART)
+    pipeline._wait_for_routing("routing-broken", timeout=5)
+
+    assert pipeline.load_selected_experts("routing-broken") == pipeline.DEFAULT_EXPERT_TEAM
@@ -0,0 +1,35 @@
+import threading
+
+from benchmark import _retained_bytes, session_script
+from session_store import InMemorySessionStore
+
+
+def test_retained_bytes_tracks_the_store_contents_only():
+    store = InMemorySessionStore()
+    empty = _retained_bytes(store)
+    unrelated = ["x" * 100_000]
+
+    store.append("s1", "history", [("user", "a" * 5000), ("model", "b" * 5000)])
+
+    grown = _retained_bytes(store) - empty
+    assert 10_000 <= grown < 20_000
+    assert unrelated
+
+
+def test_session_scripts_do_not_depend_on_thread_interleaving():
+    expected = {index: session_script(7, index, 4) for index in range(8)}
+    seen = {}
+
+    def worker(index):
+        seen[index] = session_script(7, index, 4)
+
+    # reversed start order stands in for any scheduling of the session threads
+    threads = [threading.Thread(target=worker, args=(index,)) for index in reversed(range(8))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == expected
+    assert all(len(script) == 5 for script in expected.values())
+    assert len({tuple(script) for script in expected.values()}) > 1
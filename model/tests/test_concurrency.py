@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from concurrency import AsyncKeyedLock, KeyedLock
+
+
+def _run_holders(lock, keys, hold_seconds=0.05):
+    """Holds lock for each key from its own thread; returns the max number of holders seen per key (None: overall)."""
+    active = {None: 0}
+    peak = {}
+    guard = threading.Lock()
+
+    def worker(key):
+        with lock.hold(key):
+            with guard:
+                for name in (key, None):
+                    active[name] = active.get(name, 0) + 1
+                    peak[name] = max(peak.get(name, 0), active[name])
+            time.sleep(hold_seconds)
+            with guard:
+                active[key] -= 1
+                active[None] -= 1
+
+    threads = [threading.Thread(target=worker, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peak
+
+
+def test_keyed_lock_serializes_a_key_and_runs_keys_in_parallel():
+    lock = KeyedLock()
+    peak = _run_holders(lock, ["a", "a", "a", "b", "c", "d"])
+
+    assert {key: peak[key] for key in "abcd"} == {"a": 1, "b": 1, "c": 1, "d": 1}
+    assert peak[None] > 1
+    assert len(lock) == 0
+
+
+def test_keyed_lock_can_be_released_from_another_thread():
+    lock = KeyedLock()
+    holder = lock.hold("s")
+    holder.__enter__()
+    releaser = threading.Thread(target=holder.__exit__, args=(None, None, None))
+    releaser.start()
+    releaser.join()
+
+    with lock.hold("s"):
+        assert len(lock) == 1
+    assert len(lock) == 0
+
+
+def test_async_keyed_lock_serializes_a_key():
+    lock = AsyncKeyedLock()
+    order = []
+
+    async def turn(key, name):
+        async with lock.hold(key):
+            order.append(f"{name}+")
+            await asyncio.sleep(0.01)
+            order.append(f"{name}-")
+
+    async def main():
+        await asyncio.gather(turn("a", "a1"), turn("a", "a2"), turn("b", "b1"))
+
+    asyncio.run(main())
+    a_events = [event for event in order if event.startswith("a")]
+    assert a_events == ["a1+", "a1-", "a2+", "a2-"]
+    assert order.index("b1+") < order.index("a1-")
+    assert lock._locks == {}
+
+
+def test_engine_serializes_concurrent_turns_of_one_session(pipeline):
+    engine = pipeline.CounselingEngine()
+    questions = [f"question {i}" for i in range(6)]
+    threads = [threading.Thread(target=engine.respond, args=("locked-session", q)) for q in questions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    history = pipeline.load_history("locked-session")
+    roles = [message["role"] for message in history]
+    assert roles == ["user", "model"] * len(questions)
+    user_texts = [message["parts"][0] for message in history if message["role"] == "user"]
+    # every question lands in exactly one user message (the first turn wraps it in the intake prompt)
+    assert sorted(next(q for q in questions if text.endswith(q)) for text in user_texts) == questions
+    assert engine.active_sessions() == 0
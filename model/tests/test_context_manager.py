@@ -0,0 +1,61 @@
+from context_manager import build_context_window, estimate_tokens, fold_into_summary, summary_text, truncate_to_tokens
+from transcript import Transcript
+
+
+def _history(texts):
+    return [{"role": "user" if i % 2 == 0 else "model", "parts": [text]} for i, text in enumerate(texts)]
+
+
+def test_estimate_counts_hangul_per_character():
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("안녕하세요") == 5
+    assert estimate_tokens("요즘 abcd") == 2 + 2
+
+
+def test_korean_window_respects_the_budget():
+    history = _history(["남편과 돈 문제로 자주 다툽니다. " * 10 for _ in range(20)])
+    history_str, summary = build_context_window(history, Transcript(history), token_budget=400)
+
+    assert estimate_tokens(history_str) <= 400 + len(history)
+    assert summary["summarized_upto"] > 0
+
+
+def test_oversized_newest_message_is_truncated_to_the_budget():
+    history = _history(["가" * 1000])
+    history_str, _ = build_context_window(history, Transcript(history), token_budget=100)
+
+    assert estimate_tokens(history_str) <= 100
+    assert len(history_str) > 90
+
+
+def test_truncate_keeps_text_within_budget():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert estimate_tokens(truncate_to_tokens("한국어 text " * 50, 30)) <= 30
+
+
+def test_summary_keeps_more_than_the_first_sentence():
+    state = fold_into_summary(None, _history(["We fight about money. Mostly about rent. He says I overspend."]), 600)
+    assert state["lines"] == ["- user: We fight about money. Mostly about rent. He says I overspend."]
+
+
+def test_old_turns_are_compressed_into_topics_not_dropped():
+    topics = ["inheritance", "chores", "in-laws", "holidays", "savings", "rent", "vacation", "hobbies", "career", "parenting"]
+    state = None
+    for topic in topics:
+        turn = _history([f"We keep arguing about {topic}. It started last year.", f"Tell me more about the {topic} disagreement."])
+        state = fold_into_summary(state, turn, summary_token_budget=120)
+
+    text = summary_text(state)
+    assert estimate_tokens(text) <= 120
+    assert state["summarized_upto"] == 2 * len(topics)
+    # the newest turns keep their excerpts; the earliest survive as topic terms
+    assert "parenting" in state["lines"][-1]
+    assert text.startswith("- earlier topics:") and "inheritance" in text.splitlines()[0]
+    assert all(topic.split("-")[0] in text for topic in topics)
+
+
+def test_summary_state_from_before_topics_still_folds():
+    legacy = {"lines": ["- user: hello"], "summarized_upto": 1}
+    assert summary_text(legacy) == "- user: hello"
+    state = fold_into_summary(legacy, _history(["next"]), 600)
+    assert state["lines"] == ["- user: hello", "- user: next"] and state["topics"] == {}
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from resilience import GeminiCallGuard
+
+
+class ServiceUnavailable(Exception):
+    """Named like the google.api_core error the guard treats as transient."""
+
+
+def test_guard_does_not_retry_past_deadline():
+    guard = GeminiCallGuard(max_retries=5, backoff_base=1.0, backoff_max=1.0)
+    guard.backoff_delay = lambda attempt: 1.0
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise ServiceUnavailable("unavailable")
+
+    started = time.monotonic()
+    with pytest.raises(ServiceUnavailable):
+        guard.call("m", request, deadline=time.monotonic() + 0.5)
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_expert_requests_carry_the_remaining_deadline(pipeline, monkeypatch):
+    seen = []
+
+    class Model:
+        model_name = "models/gemini-1.5-flash"
+
+        def generate_content(self, prompt, request_options=None, **kwargs):
+            seen.append(request_options["timeout"])
+            return type("Response", (), {"text": "report"})()
+
+    monkeypatch.setattr(pipeline, "get_model", lambda *args: Model())
+    deadline = time.monotonic() + 10
+    reports = pipeline._fan_out_expert_analysis({"CBT Expert": "p", "EFT Expert": "q"}, "context", deadline)
+
+    assert set(reports) == {"CBT Expert", "EFT Expert"}
+    assert len(seen) == 2 and all(9 < timeout <= 10 for timeout in seen)
+
+
+def test_calls_queued_past_the_deadline_are_skipped(pipeline, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    class Model:
+        model_name = "models/gemini-1.5-flash"
+
+        def generate_content(self, prompt, **kwargs):
+            calls.append(prompt)
+            release.wait(2)
+            return type("Response", (), {"text": "report"})()
+
+    monkeypatch.setattr(pipeline, "get_model", lambda *args: Model())
+    result = pipeline._run_single_expert_analysis("CBT Expert", "p", "late", time.monotonic() - 1)
+    assert result["report"].startswith(pipeline.ANALYSIS_ERROR_PREFIX)
+    assert calls == []
+
+    reports = pipeline._fan_out_expert_analysis({"CBT Expert": "p"}, "slow", time.monotonic() + 0.1)
+    release.set()
+    assert reports == {}
+
+
+def test_failed_expert_calls_count_as_missed(pipeline, monkeypatch):
+    class Model:
+        model_name = "models/gemini-1.5-flash"
+
+        def __init__(self, failing):
+            self.failing = failing
+
+        def generate_content(self, prompt, **kwargs):
+            if self.failing:
+                raise ServiceUnavailable("unavailable")
+            return type("Response", (), {"text": "report"})()
+
+    monkeypatch.setattr(pipeline, "get_model", lambda name, prompt=None: Model(prompt == "bad"))
+    experts = {"CBT Expert": "good", "EFT Expert": "bad"}
+    assert pipeline._fan_out_expert_analysis(experts, "context", time.monotonic() + 5) == {"CBT Expert": "report"}
+
+    monkeypatch.setattr(pipeline, "ALL_EXPERTS", experts)
+    monkeypatch.setattr(pipeline, "load_selected_experts", lambda session_id: list(experts))
+    for mode in ("parallel", "sequential"):
+        monkeypatch.setattr(pipeline, "EXPERT_EXECUTION_MODE", mode)
+        reports, missed = pipeline.run_expert_analysis("failing-expert", "history", f"question for {mode}")
+        assert reports == {"CBT Expert": "report"} and missed == ["EFT Expert"]
+
+
+def test_rate_limited_call_gives_up_at_the_deadline(pipeline, monkeypatch):
+    from concurrency import TokenBucket
+    from resilience import DeadlinePassed
+
+    bucket = TokenBucket(1, capacity=1)
+    assert bucket.acquire(deadline=time.monotonic() + 5)
+    started = time.monotonic()
+    assert not bucket.acquire(deadline=time.monotonic() + 0.2)
+    assert time.monotonic() - started < 0.1
+
+    monkeypatch.setattr(pipeline, "_gemini_rate_limiter", bucket)
+    calls = []
+    with pytest.raises(DeadlinePassed):
+        pipeline._call_gemini("m", lambda: calls.append(1), deadline=time.monotonic() + 0.2)
+    assert calls == []
+    assert pipeline._gemini_guard.breaker("m").stats()["consecutive_failures"] == 0
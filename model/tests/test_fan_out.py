@@ -0,0 +1,69 @@
+import threading
+import time
+
+EXPERTS = {"CBT Expert": "cbt", "EFT Expert": "eft", "Gottman Method Expert": "gottman"}
+
+
+def _model_factory(delays, calls=None):
+    """get_model replacement whose expert answers after delays[system prompt] seconds (a list is used call by call)."""
+    lock = threading.Lock()
+
+    class Model:
+        model_name = "models/gemini-1.5-flash"
+
+        def __init__(self, prompt):
+            self.prompt = prompt
+
+        def generate_content(self, context, **kwargs):
+            with lock:
+                if calls is not None:
+                    calls.append(self.prompt)
+                delay = delays[self.prompt]
+                if isinstance(delay, list):
+                    delay = delay.pop(0)
+            time.sleep(delay)
+            return type("Response", (), {"text": f"{self.prompt} report"})()
+
+    return lambda name, prompt=None: Model(prompt)
+
+
+def test_experts_run_concurrently(pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "get_model", _model_factory({prompt: 0.3 for prompt in EXPERTS.values()}))
+    started = time.monotonic()
+    reports = pipeline._fan_out_expert_analysis(EXPERTS, "context", time.monotonic() + 5)
+
+    assert set(reports) == set(EXPERTS)
+    assert time.monotonic() - started < 0.8  # one call's latency, not the sum of three
+
+
+def test_reports_follow_selection_order_not_completion_order(pipeline, monkeypatch):
+    # the first selected expert finishes last
+    monkeypatch.setattr(pipeline, "get_model", _model_factory({"cbt": 0.2, "eft": 0.1, "gottman": 0.0}))
+    monkeypatch.setattr(pipeline, "ALL_EXPERTS", EXPERTS)
+    monkeypatch.setattr(pipeline, "load_selected_experts", lambda session_id: list(EXPERTS))
+    monkeypatch.setattr(pipeline, "EXPERT_EXECUTION_MODE", "parallel")
+
+    reports, missed = pipeline.run_expert_analysis("fan-out-order", "history", "question")
+    assert list(reports) == list(EXPERTS) and missed == []
+    assert reports["CBT Expert"] == "cbt report"
+
+
+def test_late_expert_is_missed_without_holding_up_the_turn(pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "get_model", _model_factory({"cbt": 0.0, "eft": 1.0, "gottman": 0.0}))
+    started = time.monotonic()
+    reports = pipeline._fan_out_expert_analysis(EXPERTS, "context", time.monotonic() + 0.3)
+
+    assert set(reports) == {"CBT Expert", "Gottman Method Expert"}
+    assert time.monotonic() - started < 0.8
+
+
+def test_straggler_is_hedged_and_the_first_answer_wins(pipeline, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, "get_model", _model_factory({"cbt": 0.0, "eft": [2.0, 0.0], "gottman": 0.0}, calls))
+    monkeypatch.setattr(pipeline, "_hedge_delay", lambda: 0.1)
+    started = time.monotonic()
+    reports = pipeline._fan_out_expert_analysis(EXPERTS, "context", time.monotonic() + 5)
+
+    assert set(reports) == set(EXPERTS)
+    assert time.monotonic() - started < 1.5
+    assert calls.count("eft") == 2 and calls.count("cbt") == 1
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from history import History, Message
+
+
+def _texts(messages):
+    return [message["parts"][0] for message in messages]
+
+
+def test_messages_read_like_the_old_dicts():
+    history = History.from_messages([{"role": "user", "parts": ["hi", "there"]}, {"role": "model", "parts": ["hello"]}])
+    message = history[0]
+
+    assert isinstance(message, Message)
+    assert (message["role"], message["parts"]) == ("user", ["hi there"])
+    assert message.to_dict() == {"role": "user", "parts": ["hi there"]}
+    assert history[-1]["role"] == "model"
+    with pytest.raises(KeyError):
+        message["text"]
+    with pytest.raises(KeyError):
+        history.append("system", "unknown role")
+
+
+def test_ring_buffer_keeps_absolute_indices():
+    history = History(max_messages=3)
+    history.extend(("user" if i % 2 == 0 else "model", f"m{i}") for i in range(7))
+
+    assert (len(history), history.first_index) == (7, 4)
+    assert _texts(history) == ["m4", "m5", "m6"]
+    assert history[4]["parts"][0] == "m4" and history[-1]["parts"][0] == "m6"
+    # slices are absolute too and skip what was dropped
+    assert _texts(history[2:6]) == ["m4", "m5"]
+    assert _texts(history[-2:]) == ["m5", "m6"]
+    with pytest.raises(IndexError):
+        history[3]
+    with pytest.raises(IndexError):
+        history[7]
+
+
+def test_uncapped_history_keeps_everything():
+    history = History(max_messages=0)
+    history.extend(("user", str(i)) for i in range(100))
+    assert history.first_index == 0 and len(history) == 100
+
+
+def test_json_round_trip_is_compact_and_lossless():
+    history = History(max_messages=4)
+    history.extend([("user", "q1"), ("model", "a1"), ("user", "q2"), ("model", "a2"), ("user", "우리 q3")])
+    data = json.loads(json.dumps(history.to_json()))
+
+    assert data == {"first_index": 1, "roles": "1010", "texts": ["a1", "q2", "a2", "우리 q3"]}
+    restored = History.from_json(data)
+    assert (len(restored), restored.first_index) == (5, 1)
+    assert [m.to_dict() for m in restored] == [m.to_dict() for m in history]
+
+
+def test_rows_written_before_the_compact_format_still_load():
+    legacy = [{"role": "user", "parts": ["hi"]}, {"role": "model", "parts": ["hello"]}]
+    restored = History.from_json(legacy)
+    assert [m.to_dict() for m in restored] == legacy
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+import model_pool as pool_module
+from model_pool import ModelPool
+
+
+class _CountingModel:
+    built = []
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        _CountingModel.built.append((model_name, system_instruction))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    _CountingModel.built = []
+    monkeypatch.setattr(pool_module.genai, "GenerativeModel", _CountingModel)
+    return ModelPool()
+
+
+def test_each_pair_is_built_once_and_shared(pool):
+    first = pool.get("gemini-1.5-flash", "expert a")
+    assert pool.get("gemini-1.5-flash", "expert a") is first
+    assert pool.get("gemini-1.5-flash", "expert b") is not first
+    assert pool.get("gemini-2.5-flash", "expert a") is not first
+    assert pool.get("gemini-1.5-flash") is pool.get("gemini-1.5-flash", None)
+
+    assert len(_CountingModel.built) == 4
+    stats = pool.stats()
+    assert (stats["models"], stats["hits"], stats["misses"]) == (4, 2, 4)
+
+
+def test_warm_up_builds_ahead_of_the_first_request(pool):
+    pool.warm_up([("gemini-1.5-flash", "a"), ("gemini-1.5-flash", "b"), ("gemini-1.5-flash", "a")])
+    assert len(_CountingModel.built) == 2
+    pool.get("gemini-1.5-flash", "b")
+    assert pool.stats()["hits"] == 2
+
+
+def test_concurrent_lookups_build_once_and_count_exactly(pool):
+    gate = threading.Barrier(8, timeout=5)
+    seen = []
+
+    def worker():
+        gate.wait()
+        for _ in range(500):
+            seen.append(pool.get("gemini-1.5-flash", "shared"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(_CountingModel.built) == 1 and len({id(model) for model in seen}) == 1
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"]) == (3999, 1)
+
+
+def test_configure_runs_once_per_key(pool, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pool_module.genai, "configure", lambda api_key: calls.append(api_key))
+    pool.configure("key-1")
+    pool.configure("key-1")
+    pool.configure("key-2")
+    assert calls == ["key-1", "key-2"]
+
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        ModelPool().configure()
+
+
+def test_clear_resets_models_and_counters(pool):
+    pool.get("gemini-1.5-flash", "a")
+    pool.clear()
+    assert pool.stats() == {"models": 0, "hits": 0, "misses": 0, "hit_rate": 0.0}
@@ -0,0 +1,94 @@
+import json
+import time
+
+EXPERTS = {"CBT Expert": "cbt prompt", "EFT Expert": "eft prompt", "Gottman Method Expert": "gottman prompt"}
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+def _fake_models(pipeline, monkeypatch, panel_answer):
+    """Routes get_model to fakes; returns the list of ("panel" | expert system prompt) requests made."""
+    requests = []
+
+    class Model:
+        def __init__(self, system_prompt):
+            self.system_prompt = system_prompt
+
+        def generate_content(self, prompt, generation_config=None, **kwargs):
+            if generation_config and generation_config.get("response_mime_type") == "application/json":
+                requests.append("panel")
+                return _Response(panel_answer(self.system_prompt))
+            requests.append(self.system_prompt)
+            return _Response(f"solo report for {self.system_prompt}")
+
+    monkeypatch.setattr(pipeline, "get_model", lambda model_name, system_prompt=None: Model(system_prompt))
+    return requests
+
+
+def _names_in(system_prompt):
+    return [name for name in EXPERTS if f"### {name}" in system_prompt]
+
+
+def test_panel_answer_is_validated_against_the_team(pipeline):
+    parse = pipeline._parse_panel_reports
+    expected = ["CBT Expert", "EFT Expert"]
+    assert parse("not json", expected) == {}
+    assert parse('["CBT Expert"]', expected) == {}
+    answer = {"CBT Expert": "  report  ", "EFT Expert": "   ", "Unknown Expert": "x"}
+    assert parse(json.dumps(answer), expected) == {"CBT Expert": "report"}
+    assert parse(json.dumps({"CBT Expert": 3, "EFT Expert": "ok"}), expected) == {"EFT Expert": "ok"}
+
+
+def test_whole_team_is_answered_by_one_request(pipeline, monkeypatch):
+    requests = _fake_models(pipeline, monkeypatch, lambda system: json.dumps({name: f"panel {name}" for name in _names_in(system)}))
+    reports = pipeline._run_panel_analysis(EXPERTS, "context", time.monotonic() + 10)
+
+    assert requests == ["panel"]
+    assert reports == {name: f"panel {name}" for name in EXPERTS}
+
+
+def test_missing_sections_fall_back_to_individual_requests(pipeline, monkeypatch):
+    requests = _fake_models(pipeline, monkeypatch, lambda system: json.dumps({"CBT Expert": "panel cbt"}))
+    reports = pipeline._run_panel_analysis(EXPERTS, "context", time.monotonic() + 10)
+
+    assert requests[0] == "panel"
+    assert sorted(requests[1:]) == ["eft prompt", "gottman prompt"]
+    assert reports == {"CBT Expert": "panel cbt", "EFT Expert": "solo report for eft prompt", "Gottman Method Expert": "solo report for gottman prompt"}
+
+
+def test_failed_panel_request_falls_back_to_the_fan_out(pipeline, monkeypatch):
+    requests = _fake_models(pipeline, monkeypatch, lambda system: "{ truncated")
+    reports = pipeline._run_panel_analysis(EXPERTS, "context", time.monotonic() + 10)
+
+    assert requests.count("panel") == 1 and len(requests) == 4
+    assert set(reports) == set(EXPERTS)
+
+
+def test_cached_reports_are_left_out_of_the_panel(pipeline, monkeypatch):
+    panels = []
+
+    def answer(system):
+        panels.append(_names_in(system))
+        return json.dumps({name: f"panel {name}" for name in _names_in(system)})
+
+    _fake_models(pipeline, monkeypatch, answer)
+    pipeline.report_cache.put(pipeline.report_key("CBT Expert", "context"), "cached cbt")
+    reports = pipeline._run_panel_analysis(EXPERTS, "context", time.monotonic() + 10)
+    again = pipeline._run_panel_analysis(EXPERTS, "context", time.monotonic() + 10)
+
+    assert panels == [["EFT Expert", "Gottman Method Expert"]]
+    assert reports["CBT Expert"] == "cached cbt" and again == reports
+
+
+def test_single_call_mode_reports_in_selection_order(pipeline, monkeypatch):
+    team = ["Gottman Method Expert", "CBT Expert"]
+    requests = _fake_models(pipeline, monkeypatch, lambda system: json.dumps({name: f"panel {name}" for name in reversed(_names_in(system))}))
+    monkeypatch.setattr(pipeline, "EXPERT_EXECUTION_MODE", "single_call")
+    monkeypatch.setattr(pipeline, "load_selected_experts", lambda session_id: team)
+
+    reports, missed = pipeline.run_expert_analysis("panel-session", "history", "question")
+    assert list(reports) == team and missed == []
+    assert requests == ["panel"]
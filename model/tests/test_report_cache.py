@@ -0,0 +1,89 @@
+import time
+
+from report_cache import ReportCache, report_key
+
+
+def test_key_covers_the_expert_and_the_exact_context():
+    assert report_key("CBT Expert", "context") == report_key("CBT Expert", "context")
+    assert report_key("CBT Expert", "context") != report_key("EFT Expert", "context")
+    assert report_key("CBT Expert", "context") != report_key("CBT Expert", "context ")
+    # the separator keeps the name/context boundary from shifting
+    assert report_key("ab", "c") != report_key("a", "bc")
+
+
+def test_least_recently_used_reports_are_evicted_by_size():
+    entry_size = len(report_key("e", "0")) + 100
+    cache = ReportCache(max_bytes=3 * entry_size)
+    keys = [report_key("e", str(i)) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, "x" * 100)
+    assert cache.get(keys[0]) is not None  # now the most recently used
+
+    cache.put(keys[3], "x" * 100)
+    assert cache.get(keys[1]) is None
+    assert all(cache.get(key) is not None for key in (keys[0], keys[2], keys[3]))
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 3 * entry_size and stats["evictions"] == 1
+
+
+def test_report_larger_than_the_budget_is_not_cached():
+    cache = ReportCache(max_bytes=64)
+    cache.put("k", "x" * 100)
+    assert cache.get("k") is None and cache.stats()["bytes"] == 0
+
+
+def test_expired_reports_are_dropped():
+    cache = ReportCache(ttl_seconds=0.01)
+    cache.put("k", "report")
+    assert cache.get("k") == "report"
+    time.sleep(0.02)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_disk_store_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "reports.db")
+    worker_a, worker_b = ReportCache(disk_path=path), ReportCache(disk_path=path)
+    worker_a.put("k", "report")
+
+    assert worker_b.get("k") == "report"
+    assert worker_b.get("k") == "report"
+    assert (worker_b.stats()["disk_hits"], worker_b.stats()["hits"]) == (1, 1)
+
+
+def test_expired_disk_rows_are_not_served(tmp_path):
+    path = str(tmp_path / "reports.db")
+    ReportCache(disk_path=path).put("k", "report")
+    time.sleep(0.02)
+    assert ReportCache(ttl_seconds=0.01, disk_path=path).get("k") is None
+
+
+def test_repeated_analysis_is_served_from_the_cache(pipeline, monkeypatch):
+    calls = []
+    original = pipeline._run_single_expert_analysis
+
+    def counting(*args):
+        calls.append(args[2])
+        return original(*args)
+
+    monkeypatch.setattr(pipeline, "_run_single_expert_analysis", counting)
+    deadline = time.monotonic() + 10
+    first = pipeline._run_cached_expert_analysis("CBT Expert", "prompt", "same context", deadline)
+    second = pipeline._run_cached_expert_analysis("CBT Expert", "prompt", "same context", deadline)
+    pipeline._run_cached_expert_analysis("CBT Expert", "prompt", "other context", deadline)
+
+    assert first == second
+    assert calls == ["same context", "other context"]
+
+
+def test_failed_analysis_is_not_cached(pipeline):
+    from benchmark import StubGenerativeModel
+
+    StubGenerativeModel.reset(error_rate=1.0)
+    deadline = time.monotonic() + 10
+    failed = pipeline._run_cached_expert_analysis("CBT Expert", "prompt", "context", deadline)
+    assert failed["report"].startswith(pipeline.ANALYSIS_ERROR_PREFIX)
+
+    StubGenerativeModel.reset(error_rate=0.0)
+    retried = pipeline._run_cached_expert_analysis("CBT Expert", "prompt", "context", deadline)
+    assert not retried["report"].startswith(pipeline.ANALYSIS_ERROR_PREFIX)
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from resilience import AdaptiveConcurrencyLimit, CircuitBreaker, CircuitOpenError, GeminiCallGuard
+
+
+class ResourceExhausted(Exception):
+    """Named like the google.api_core 429 error."""
+
+
+class InternalServerError(Exception):
+    """Named like the google.api_core 500 error."""
+
+
+class InvalidArgument(Exception):
+    """Named like the google.api_core 400 error."""
+
+
+def _guard(**options):
+    guard = GeminiCallGuard(**options)
+    guard.backoff_delay = lambda attempt: 0.0
+    return guard
+
+
+def _failing(errors, result="ok"):
+    """Request that raises each of `errors` in turn, then returns `result`."""
+    remaining = list(errors)
+
+    def request():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    return request
+
+
+def test_rate_limited_call_is_retried_and_shrinks_the_limit():
+    guard = _guard(initial_concurrency=16, max_retries=2)
+    assert guard.call("m", _failing([ResourceExhausted("429")])) == "ok"
+    stats = guard.stats()
+    assert (stats["calls"], stats["retries"], stats["throttled"]) == (2, 1, 1)
+    assert stats["concurrency_limit"] < 16
+
+
+def test_non_retryable_error_is_raised_without_retry():
+    guard = _guard(max_retries=3)
+    with pytest.raises(ValueError):
+        guard.call("m", _failing([ValueError("bad prompt")]))
+    assert guard.stats()["calls"] == 1
+
+
+def test_one_burst_of_throttles_halves_the_limit_once():
+    limit = AdaptiveConcurrencyLimit(16)
+    started = [time.monotonic() for _ in range(5)]
+    for start in started:
+        limit.on_throttle(start)
+    assert limit.limit == 8
+    limit.on_throttle(time.monotonic())
+    assert limit.limit == 4
+
+
+def test_limit_bounds_in_flight_calls():
+    limit = AdaptiveConcurrencyLimit(2)
+    peak = []
+    gate = threading.Barrier(2, timeout=5)
+
+    def call():
+        with limit.slot():
+            peak.append(limit.in_flight)
+            if len(peak) <= 2:
+                gate.wait()
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2 and limit.in_flight == 0
+
+
+def test_breaker_opens_then_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_open_breaker_fails_fast_per_model():
+    guard = _guard(max_retries=0, failure_threshold=1)
+    with pytest.raises(InternalServerError):
+        guard.call("broken", _failing([InternalServerError("boom")]))
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        guard.call("broken", lambda: calls.append(1))
+    assert calls == []
+    assert guard.call("healthy", lambda: "ok") == "ok"
+
+
+def test_client_errors_do_not_open_the_breaker():
+    guard = _guard(max_retries=0, failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(InvalidArgument):
+            guard.call("m", _failing([InvalidArgument("request payload size exceeds the limit")]))
+    assert guard.breaker("m").stats()["state"] == CircuitBreaker.CLOSED
+    assert guard.call("m", lambda: "ok") == "ok"
+    assert guard.stats()["failures"] == 5
+
+
+def test_client_error_during_half_open_frees_the_probe():
+    guard = _guard(max_retries=0, failure_threshold=1, reset_timeout=0.01)
+    with pytest.raises(InternalServerError):
+        guard.call("m", _failing([InternalServerError("down")]))
+    time.sleep(0.02)
+    with pytest.raises(InvalidArgument):
+        guard.call("m", _failing([InvalidArgument("bad")]))
+    assert guard.call("m", lambda: "ok") == "ok"
+
+
+def test_counters_are_exact_under_concurrent_calls():
+    guard = _guard(initial_concurrency=64, max_retries=1, failure_threshold=10**6)
+
+    def worker():
+        for _ in range(200):
+            guard.call("m", _failing([InternalServerError("blip")]))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = guard.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (3200, 1600, 1600)
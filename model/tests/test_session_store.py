@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from history import History
+from session_store import SQLiteSessionStore
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(**options):
+        options.setdefault("flush_interval", 3600)
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), **options)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_values_survive_reopening(make_store):
+    store = make_store()
+    store.set("s1", "profile", {"name": "a"})
+    store.append("s1", "history", [("user", "hi"), ("model", "hello")])
+    store.close()
+
+    reopened = make_store()
+    assert reopened.get("s1", "profile") == {"name": "a"}
+    history = reopened.get("s1", "history")
+    assert isinstance(history, History)
+    assert [(m["role"], m["parts"][0]) for m in history] == [("user", "hi"), ("model", "hello")]
+
+
+def test_dirty_sessions_evicted_before_a_flush_are_not_lost(make_store):
+    store = make_store(max_resident=2)
+    for i in range(5):
+        store.set(f"s{i}", "state", {"turn_count": i})
+    assert store.stats()["resident_sessions"] == 2
+    assert store.stats()["disk_writes"] == 0
+    assert store.get("s0", "state") == {"turn_count": 0}
+
+    store.flush()
+    assert store.stats()["dirty_sessions"] == 0
+    assert [store.get(f"s{i}", "state") for i in range(5)] == [{"turn_count": i} for i in range(5)]
+
+
+def test_flush_writes_without_holding_the_store_lock(make_store, monkeypatch):
+    store = make_store()
+    store.set("s1", "state", {"turn_count": 1})
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(rows):
+        writing.set()
+        release.wait(5)
+        write(rows)
+
+    monkeypatch.setattr(store, "_write", slow_write)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    reader = threading.Thread(target=lambda: (store.set("s2", "state", {"turn_count": 2}), store.get("s1", "state")))
+    reader.start()
+    reader.join(1)
+    blocked = reader.is_alive()
+    release.set()
+    flusher.join(5)
+    reader.join(5)
+    assert not blocked
+    store.flush()
+    assert store.stats()["dirty_sessions"] == 0
+
+
+def test_session_evicted_during_a_flush_is_read_back_from_memory(make_store, monkeypatch):
+    store = make_store(max_resident=1)
+    store.set("s1", "state", {"turn_count": 1})
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(rows):
+        writing.set()
+        release.wait(5)
+        write(rows)
+
+    monkeypatch.setattr(store, "_write", slow_write)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5)
+    store.get("s2", "state")  # pushes s1 out while its row is still being written
+    assert store.get("s1", "state") == {"turn_count": 1}
+    release.set()
+    flusher.join(5)
+
+
+def test_idle_sessions_are_flushed_and_dropped(make_store):
+    store = make_store(idle_ttl=0)
+    store.set("s1", "state", {"turn_count": 3})
+    store.evict_idle()
+    assert store.stats()["resident_sessions"] == 0
+    assert store.stats()["dirty_sessions"] == 0
+    assert store.get("s1", "state") == {"turn_count": 3}
+
+
+def test_second_store_cannot_open_the_same_file(make_store):
+    make_store()
+    with pytest.raises(RuntimeError, match="single-process"):
+        make_store()
@@ -0,0 +1,99 @@
+from context_manager import estimate_tokens
+from history import History
+from transcript import Transcript, TranscriptCache
+
+
+def _messages(count):
+    texts = ["hello", "우리 부부는 돈 문제로 자주 다퉈요.", "tell me more about that", "", "a " * 40]
+    return [{"role": ("user", "model")[i % 2], "parts": [f"{texts[i % len(texts)]} {i}"]} for i in range(count)]
+
+
+def _lines(messages):
+    return [f"{m['role']}: {m['parts'][0]}" for m in messages]
+
+
+def test_offsets_match_rendered_text():
+    messages = _messages(12)
+    transcript = Transcript(messages)
+    lines = _lines(messages)
+
+    assert len(transcript) == 12
+    for start in range(13):
+        for end in range(start, 13):
+            rendered = "\n".join(lines[start:end])
+            assert transcript.render(start, end) == rendered
+            assert transcript.tokens(start, end) == sum(estimate_tokens(line) for line in lines[start:end])
+            # chars counts a newline per line, so it is the rendered length plus one for a non-empty range
+            assert transcript.chars(start, end) == (len(rendered) + 1 if end > start else 0)
+
+
+def test_window_start_matches_a_linear_scan():
+    messages = _messages(15)
+    transcript = Transcript(messages)
+    lines = _lines(messages)
+
+    def expected(budget, floor, max_messages):
+        lowest = max(floor, 0 if max_messages is None else len(lines) - max_messages)
+        for start in range(lowest, len(lines) + 1):
+            if sum(estimate_tokens(line) for line in lines[start:]) <= budget:
+                return start
+
+    for budget in (0, 5, 12, 40, 10_000):
+        for floor in (0, 3, 9):
+            for max_messages in (None, 4, 20):
+                assert transcript.window_start(budget, floor=floor, max_messages=max_messages) == expected(budget, floor, max_messages)
+
+
+def test_trim_keeps_absolute_indices_and_offsets():
+    messages = _messages(10)
+    transcript = Transcript(messages)
+    tokens_before = transcript.tokens(6, 10)
+    transcript.trim(4)
+
+    assert transcript.first_index == 4 and len(transcript) == 10
+    assert transcript.line(4) == _lines(messages)[4]
+    assert transcript.tokens(6, 10) == tokens_before
+    assert transcript.render(8) == "\n".join(_lines(messages)[8:])
+    assert transcript.window_start(10_000) == 4
+
+
+def test_cache_appends_only_new_messages():
+    cache = TranscriptCache()
+    history = History.from_messages(_messages(4))
+    first = cache.get("s", history)
+    kept = first._lines[0]
+
+    history.append("user", "follow-up question")
+    history.append("model", "answer")
+    second = cache.get("s", history)
+
+    assert second is first and len(second) == 6
+    assert second._lines[0] is kept  # earlier lines are not re-rendered
+    assert second.line(5) == "model: answer"
+
+
+def test_cache_follows_the_ring_buffer_and_rebuilds_on_rewrite():
+    cache = TranscriptCache()
+    history = History.from_messages(_messages(6), max_messages=4)
+    transcript = cache.get("s", history)
+    assert (transcript.first_index, len(transcript)) == (2, 6)
+
+    history.extend([("user", "q"), ("model", "a")])
+    transcript = cache.get("s", history)
+    assert (transcript.first_index, len(transcript)) == (4, 8)
+    assert transcript.render(4) == "\n".join(f"{m['role']}: {m['parts'][0]}" for m in history[4:])
+
+    # a shorter history (e.g. a reset session) is rebuilt instead of appended to
+    rebuilt = cache.get("s", History.from_messages(_messages(2)))
+    assert rebuilt is not transcript and len(rebuilt) == 2
+
+
+def test_cache_is_bounded_lru():
+    cache = TranscriptCache(max_sessions=2)
+    history = _messages(2)
+    a = cache.get("a", history)
+    cache.get("b", history)
+    assert cache.get("a", history) is a
+    cache.get("c", history)
+
+    assert set(cache._transcripts) == {"a", "c"}
@@ -0,0 +1,64 @@
+import pytest
+
+import agents
+from triage import TeamDecisionCache, TriageClassifier, normalize_profile
+
+ROSTER = {
+    "CBT Expert": agents.CBT_EXPERT_PROMPT,
+    "EFT Expert": agents.EFT_EXPERT_PROMPT,
+    "Gottman Method Expert": agents.GOTTMAN_METHOD_EXPERT_PROMPT,
+    "Solution-Focused Expert": agents.SOLUTION_FOCUSED_EXPERT_PROMPT,
+    "Financial Psychology Expert": agents.FINANCIAL_PSYCHOLOGY_EXPERT_PROMPT,
+    "Psychiatrist": agents.PSYCHIATRIST_PROMPT,
+    "OB/GYN Expert": agents.OBGYN_EXPERT_PROMPT,
+    "Urologist Expert": agents.UROLOGIST_EXPERT_PROMPT,
+    "Lawyer Expert": agents.LAWYER_EXPERT_PROMPT,
+}
+
+
+@pytest.fixture(scope="module")
+def triage():
+    return TriageClassifier(ROSTER, core_team=["CBT Expert", "EFT Expert", "Gottman Method Expert"])
+
+
+@pytest.mark.parametrize("chart, lead", [
+    ("We keep arguing about money and debt, he hides his spending", "Financial Psychology Expert"),
+    ("I feel lonely and disconnected, he is cold and distant", "EFT Expert"),
+    ("He hides debt and now wants a divorce and custody of the kids", "Lawyer Expert"),
+])
+def test_clear_charts_pick_a_team_locally(triage, chart, lead):
+    team = triage.select(chart)
+    assert team[0] == lead
+    assert 3 <= len(team) <= 5
+
+
+@pytest.mark.parametrize("chart", [
+    "",
+    "things are hard",
+    # a single matching word is not enough evidence
+    "stress",
+    "we have some issues and I feel things are off lately",
+    # many unrelated topics: the similarity is spread over most of the roster
+    "change plan future love money sex legal depression",
+])
+def test_ambiguous_charts_go_to_the_llm_router(triage, chart):
+    assert triage.select(chart) is None
+
+
+def test_team_wider_than_max_team_is_ambiguous():
+    triage = TriageClassifier(ROSTER, min_top_share=0, relative_cutoff=0.01, max_team=2)
+    assert triage.select("money debt divorce custody lonely distant") is None
+
+
+def test_team_is_topped_up_from_the_core_team(triage):
+    team = triage.select("divorce custody lawyer")
+    assert team[0] == "Lawyer Expert"
+    assert set(team[1:]) <= {"CBT Expert", "EFT Expert", "Gottman Method Expert"}
+
+
+def test_team_cache_keys_ignore_case_and_key_order():
+    cache = TeamDecisionCache(max_entries=1)
+    cache.put(normalize_profile({"a": "Money", "b": 1}), ["CBT Expert"])
+    assert cache.get(normalize_profile({"b": 1, "a": "money"})) == ["CBT Expert"]
+    cache.put(normalize_profile({"c": 2}), ["EFT Expert"])
+    assert cache.get(normalize_profile({"a": "money", "b": 1})) is None
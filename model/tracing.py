@@ -0,0 +1,174 @@
+# theraphy_ai/tracing.py
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Iterator, List, Optional, TypeVar
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+T = TypeVar("T")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms: float):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS_MS)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets, cumulative = {}, 0
+        for bound, count in zip(list(LATENCY_BUCKETS_MS) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum_ms": round(self.total, 1), "buckets": buckets}
+
+
+class Span:
+    __slots__ = ("name", "attrs", "outcome", "start", "duration_ms")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.outcome = "ok"
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_ms": round(self.duration_ms, 2), "outcome": self.outcome, **self.attrs}
+
+
+class _Trace:
+    __slots__ = ("trace_id", "started_at", "spans", "lock")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def _activate(trace: _Trace):
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+class Tracer:
+    """
+    Aggregates pipeline spans into per-stage latency histograms, outcome counts and prompt sizes.
+    Inside `trace()`, spans are also collected into a per-request trace (kept in a small ring buffer
+    and optionally appended as JSON lines to `dump_path`).
+    """
+
+    def __init__(self, recent_traces: int = 50, dump_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        self._outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._prompt_chars: Dict[str, int] = defaultdict(int)
+        self._recent = deque(maxlen=recent_traces)
+        self.dump_path = dump_path
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        span = Span(name, attrs)
+        try:
+            yield span
+        except BaseException:
+            span.outcome = "error"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span.start) * 1000
+            self._record(span)
+
+    def _record(self, span: Span):
+        with self._lock:
+            self._histograms[span.name].observe(span.duration_ms)
+            self._outcomes[span.name][span.outcome] += 1
+            self._prompt_chars[span.name] += span.attrs.get("prompt_chars", 0)
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace.lock:
+                trace.spans.append(span.to_dict())
+
+    @contextmanager
+    def trace(self, trace_id: str):
+        trace = _Trace(trace_id)
+        try:
+            with _activate(trace):
+                yield trace
+        finally:
+            self._finish(trace)
+
+    def trace_stream(self, trace_id: str, chunks: Generator[T, None, None]) -> Iterator[T]:
+        """
+        trace() for a generator. The trace is only made current while `chunks` runs, never across a yield:
+        consumers such as Starlette advance a generator from a fresh context copy on each step.
+        """
+        trace = _Trace(trace_id)
+        try:
+            while True:
+                with _activate(trace):
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        return
+                yield chunk
+        finally:
+            with _activate(trace):
+                chunks.close()
+            self._finish(trace)
+
+    def _finish(self, trace: _Trace):
+        record = {"trace_id": trace.trace_id, "started_at": trace.started_at, "spans": trace.spans}
+        self._recent.append(record)
+        if self.dump_path:
+            with self._lock, open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def recent_traces(self) -> List[Dict[str, Any]]:
+        return list(self._recent)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    **histogram.snapshot(),
+                    "outcomes": dict(self._outcomes[name]),
+                    "prompt_chars_total": self._prompt_chars[name],
+                }
+                for name, histogram in self._histograms.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._outcomes.clear()
+            self._prompt_chars.clear()
+            self._recent.clear()
+
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit() that carries the caller's trace into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
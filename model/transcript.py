@@ -0,0 +1,98 @@
+# theraphy_ai/transcript.py
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from context_manager import estimate_tokens, message_text
+
+
+class Transcript:
+    """
+    Append-only serialized conversation of one session. Each message is rendered to its prompt line once,
+    and cumulative character/token offsets let any recent window be measured and sliced without re-rendering.
+    Indices are absolute message indices of the session's history; lines before `first_index` have been trimmed.
+    """
+
+    __slots__ = ("_lines", "_char_offsets", "_token_offsets", "first_index")
+
+    def __init__(self, history: Optional[List[Dict]] = None):
+        self._lines: List[str] = []
+        self._char_offsets = [0]
+        self._token_offsets = [0]
+        self.first_index = getattr(history, "first_index", 0)
+        for message in history or []:
+            self.append(message)
+
+    def append(self, message: Dict):
+        line = f"{message['role']}: {message_text(message)}"
+        self._lines.append(line)
+        self._char_offsets.append(self._char_offsets[-1] + len(line) + 1)  # +1 for the joining newline
+        self._token_offsets.append(self._token_offsets[-1] + estimate_tokens(line))
+
+    def __len__(self) -> int:
+        return self.first_index + len(self._lines)
+
+    def line(self, index: int) -> str:
+        return self._lines[index - self.first_index]
+
+    def tokens(self, start: int, end: Optional[int] = None) -> int:
+        end = len(self) if end is None else end
+        return self._token_offsets[end - self.first_index] - self._token_offsets[start - self.first_index]
+
+    def chars(self, start: int, end: Optional[int] = None) -> int:
+        end = len(self) if end is None else end
+        return self._char_offsets[end - self.first_index] - self._char_offsets[start - self.first_index]
+
+    def window_start(self, token_budget: int, floor: int = 0, max_messages: Optional[int] = None) -> int:
+        """Earliest index >= floor such that messages [index:] fit in `token_budget` (binary search)."""
+        end = len(self._lines)
+        lowest = max(floor - self.first_index, 0)
+        if max_messages is not None:
+            lowest = max(lowest, end - max_messages)
+        target = self._token_offsets[end] - token_budget
+        return self.first_index + max(lowest, bisect_left(self._token_offsets, target, lowest, end))
+
+    def render(self, start: int, end: Optional[int] = None) -> str:
+        end = None if end is None else end - self.first_index
+        return "\n".join(self._lines[start - self.first_index:end])
+
+    def trim(self, first_index: int):
+        """Drops lines before `first_index` (offsets stay cumulative, so differences remain valid)."""
+        drop = first_index - self.first_index
+        if drop > 0:
+            del self._lines[:drop]
+            del self._char_offsets[:drop]
+            del self._token_offsets[:drop]
+            self.first_index = first_index
+
+
+class TranscriptCache:
+    """
+    Process-local LRU of per-session transcripts. A cached transcript is caught up with the stored
+    history by appending only the messages it has not seen, so each turn costs O(new messages).
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._transcripts: "OrderedDict[str, Transcript]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, history: List[Dict]) -> Transcript:
+        with self._lock:
+            transcript = self._transcripts.get(session_id)
+            if transcript is not None:
+                self._transcripts.move_to_end(session_id)
+        first_index = getattr(history, "first_index", 0)
+        if transcript is None or len(transcript) > len(history) or len(transcript) < first_index:
+            transcript = Transcript(history)
+        else:
+            for message in history[len(transcript):]:
+                transcript.append(message)
+            transcript.trim(first_index)
+        with self._lock:
+            self._transcripts[session_id] = transcript
+            self._transcripts.move_to_end(session_id)
+            while len(self._transcripts) > self.max_sessions:
+                self._transcripts.popitem(last=False)
+        return transcript
@@ -0,0 +1,166 @@
+# theraphy_ai/triage.py
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Extra vocabulary per expert, on top of the words in its system prompt.
+# Users describe problems in everyday words ("money", "divorce") that the prompts rarely use.
+EXPERT_TRIAGE_KEYWORDS = {
+    "CBT Expert": "thoughts thinking negative overthinking worry worried blame assumptions beliefs anger angry stress stressed self-esteem insecure jealous jealousy",
+    "EFT Expert": "emotional emotions feelings feel lonely loneliness disconnected distant attachment affection ignored hurt neglected withdraw withdrawn cold love connection unloved",
+    "Gottman Method Expert": "conflict conflicts fight fights fighting argue argument arguments criticism contempt defensive stonewalling communication housework chores respect resentment resentful",
+    "Solution-Focused Expert": "solution solutions change goal goals practical fix improve steps future plan routine schedule",
+    "Financial Psychology Expert": "money financial finances spending spend debt debts income dual-income salary budget savings shopping expenses loan loans mortgage invest investment",
+    "Psychiatrist": "depression depressed anxiety anxious panic addiction addicted alcohol drinking gambling insomnia medication suicidal mental impulsive disorder trauma",
+    "OB/GYN Expert": "pregnancy pregnant postpartum baby birth menopause fertility infertility ivf miscarriage period hormones hormonal menstrual",
+    "Urologist Expert": "erectile impotence prostate testosterone sexual sex libido performance",
+    "Lawyer Expert": "divorce separation separate custody lawyer legal court assets property alimony abuse violence prenup",
+}
+
+_KEYWORD_WEIGHT = 3
+_TOKEN = re.compile(r"[a-z][a-z\-/]+")
+_STOPWORDS = frozenset(
+    "the and for are but not you your with this that from have has had was were will would can could should "
+    "their they them his her she him its our out all any how what when who why which into about over only "
+    "each other than then there these those such very just also more most some been being does did doing "
+    # Boilerplate shared by the expert prompts and by almost every user description
+    "issue issues problem problems relationship relationships couple partner user conversation analysis analyze "
+    "perspective report concise clear paragraph title guidelines focus solely provide".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 2 and token not in _STOPWORDS]
+
+def normalize_profile(user_profile: Dict) -> str:
+    """Stable cache key for a user profile: case, whitespace and key order do not matter."""
+    canonical = json.dumps(user_profile or {}, sort_keys=True, ensure_ascii=False, default=str)
+    canonical = " ".join(canonical.lower().split())
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def profile_text(user_profile: Dict) -> str:
+    return " ".join(str(value) for value in (user_profile or {}).values())
+
+
+class TriageClassifier:
+    """
+    TF-IDF similarity between the user's initial chart and each expert's description
+    (system prompt plus triage keywords). `select()` returns a team only when the signal is clear.
+    """
+
+    def __init__(
+        self,
+        roster: Dict[str, str],
+        keywords: Dict[str, str] = EXPERT_TRIAGE_KEYWORDS,
+        core_team: Optional[List[str]] = None,
+        min_score: float = 0.1,
+        min_terms: int = 2,
+        min_top_share: float = 0.35,
+        relative_cutoff: float = 0.25,
+        min_team: int = 3,
+        max_team: int = 5,
+    ):
+        self.core_team = core_team or []
+        self.min_score = min_score
+        self.min_terms = min_terms
+        self.min_top_share = min_top_share
+        self.relative_cutoff = relative_cutoff
+        self.min_team = min_team
+        self.max_team = max_team
+
+        documents = {}
+        for name, prompt in roster.items():
+            counts = Counter(tokenize(prompt))
+            for token in tokenize(keywords.get(name, "")):
+                counts[token] += _KEYWORD_WEIGHT
+            documents[name] = counts
+
+        document_frequency = Counter(token for counts in documents.values() for token in counts)
+        total = len(documents)
+        self._idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        self._vectors = {name: self._normalize({t: c * self._idf[t] for t, c in counts.items()}) for name, counts in documents.items()}
+
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def _query(self, text: str) -> Counter:
+        return Counter(token for token in tokenize(text) if token in self._idf)
+
+    def score(self, text: str) -> List[Tuple[str, float]]:
+        """Cosine similarity of `text` against every expert, highest first."""
+        return self._score(self._query(text))
+
+    def _score(self, counts: Counter) -> List[Tuple[str, float]]:
+        query = self._normalize({token: count * self._idf[token] for token, count in counts.items()})
+        scores = [
+            (name, sum(weight * vector.get(token, 0.0) for token, weight in query.items()))
+            for name, vector in self._vectors.items()
+        ]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    def select(self, text: str) -> Optional[List[str]]:
+        """
+        Returns the team when confident, or None when the chart is ambiguous:
+        fewer than `min_terms` distinct words match any expert, the best score is below `min_score`,
+        the best expert holds less than `min_top_share` of the total similarity (the signal is spread
+        over many experts), or more than `max_team` experts are within `relative_cutoff` of the best.
+        The team is every expert within `relative_cutoff` of the best score, topped up to `min_team`
+        from `core_team` (best-scoring first).
+        """
+        counts = self._query(text)
+        if len(counts) < self.min_terms:
+            return None
+        scores = self._score(counts)
+        top = scores[0][1]
+        if top < self.min_score or top < self.min_top_share * sum(score for _, score in scores):
+            return None
+        cutoff = top * self.relative_cutoff
+        team = [name for name, score in scores if score >= cutoff]
+        if len(team) > self.max_team:
+            return None
+        for name, _ in scores:
+            if len(team) >= self.min_team:
+                break
+            if name in self.core_team and name not in team:
+                team.append(name)
+        if len(team) < self.min_team:
+            return None
+        return team
+
+
+class TeamDecisionCache:
+    """Bounded LRU of routing decisions keyed by normalized profile."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            team = self._entries.get(key)
+            if team is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(team)
+
+    def put(self, key: str, team: List[str]):
+        with self._lock:
+            self._entries[key] = list(team)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}